@@ -0,0 +1,45 @@
+from logging.config import fileConfig
+from alembic import context
+from app.core.config import configs
+from app.models.database import Base, engine
+# import every model so autogenerate sees the whole schema
+from app.models import patient, employee, study, result, template, activity, job
+
+config = context.config
+if config.config_file_name is not None and config.attributes.get("connection") is None:
+    fileConfig(config.config_file_name, disable_existing_loggers=False)
+
+target_metadata = Base.metadata
+
+
+def run_migrations_offline() -> None:
+    context.configure(
+        url=configs.SQLALCHEMY_DATABASE_URL,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    # the application passes its own (locked) connection, see app.models.database.run_migrations
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        # one transaction per revision so alembic owns them and autocommit blocks work
+        context.configure(connection=connection, target_metadata=target_metadata, transaction_per_migration=True)
+        with context.begin_transaction():
+            context.run_migrations()
+        return
+
+    with engine.connect() as connection:
+        context.configure(connection=connection, target_metadata=target_metadata)
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
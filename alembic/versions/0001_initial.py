@@ -0,0 +1,167 @@
+"""initial schema
+
+The schema as created by Base.metadata.create_all before migrations were
+introduced. Databases created that way are stamped at this revision.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '0001'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+gender_enum = postgresql.ENUM('male', 'female', 'other', name='genderenum', create_type=False)
+status_enum = postgresql.ENUM('new', 'in_progress', 'completed', 'archived', name='statusenum', create_type=False)
+role_enum = postgresql.ENUM('admin', 'manager', 'user', name='roleenum', create_type=False)
+occupation_enum = postgresql.ENUM('doctor', 'employee', name='occupationenum', create_type=False)
+result_type_enum = postgresql.ENUM('template', 'llm', 'custom', name='resulttypeenum', create_type=False)
+activity_enum = postgresql.ENUM('view', 'edit', 'submit', 'archive', 'unarchive', 'assign', 'unassign', 'delete', 'create', name='activityenum', create_type=False)
+
+enums = [gender_enum, status_enum, role_enum, occupation_enum, result_type_enum, activity_enum]
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    for enum in enums:
+        enum.create(bind, checkfirst=True)
+
+    op.create_table(
+        'employees',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('username', sa.String(), nullable=True),
+        sa.Column('password', sa.String(), nullable=True),
+        sa.Column('employee_name', sa.String(), nullable=True),
+        sa.Column('role', role_enum, nullable=True),
+        sa.Column('type', occupation_enum, nullable=True),
+        sa.Column('age', sa.Integer(), nullable=True),
+        sa.Column('birth_date', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('gender', gender_enum, nullable=True),
+        sa.Column('phone_number', sa.String(), nullable=True),
+        sa.Column('email', sa.String(), nullable=True),
+        sa.Column('is_deleted', sa.Boolean(), nullable=True),
+        sa.Column('employee_id', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['employee_id'], ['employees.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_employees_id', 'employees', ['id'])
+    op.create_index('ix_employees_username', 'employees', ['username'], unique=True)
+
+    op.create_table(
+        'patients',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('patient_name', sa.String(), nullable=True),
+        sa.Column('age', sa.Integer(), nullable=True),
+        sa.Column('birth_date', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('gender', gender_enum, nullable=True),
+        sa.Column('phone_number', sa.String(), nullable=True),
+        sa.Column('email', sa.String(), nullable=True),
+        sa.Column('employee_id', sa.Integer(), nullable=True),
+        sa.Column('is_deleted', sa.Boolean(), nullable=True),
+        sa.ForeignKeyConstraint(['employee_id'], ['employees.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_patients_id', 'patients', ['id'])
+    op.create_index('ix_patients_patient_name', 'patients', ['patient_name'])
+
+    op.create_table(
+        'templates',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('template_name', sa.String(), nullable=True),
+        sa.Column('template_path', sa.String(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('used_count', sa.Integer(), nullable=True),
+        sa.Column('last_edited_at', sa.DateTime(), nullable=True),
+        sa.Column('last_view_at', sa.DateTime(), nullable=True),
+        sa.Column('doctor_id', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['doctor_id'], ['employees.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_templates_id', 'templates', ['id'])
+    op.create_index('ix_templates_template_name', 'templates', ['template_name'])
+
+    op.create_table(
+        'studies',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('study_name', sa.String(), nullable=True),
+        sa.Column('notes', sa.String(), nullable=True),
+        sa.Column('status', status_enum, nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.Column('severity', sa.Float(), nullable=True),
+        sa.Column('xray_path', sa.String(), nullable=True),
+        sa.Column('resized_xray_path', sa.String(), nullable=True),
+        sa.Column('xray_type', sa.String(), nullable=True),
+        sa.Column('is_archived', sa.Boolean(), nullable=True),
+        sa.Column('is_deleted', sa.Boolean(), nullable=True),
+        sa.Column('last_view_at', sa.DateTime(), nullable=True),
+        sa.Column('last_edited_at', sa.DateTime(), nullable=True),
+        sa.Column('patient_id', sa.Integer(), nullable=False),
+        sa.Column('doctor_id', sa.Integer(), nullable=True),
+        sa.Column('employee_id', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['doctor_id'], ['employees.id']),
+        sa.ForeignKeyConstraint(['employee_id'], ['employees.id']),
+        sa.ForeignKeyConstraint(['patient_id'], ['patients.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_studies_id', 'studies', ['id'])
+    op.create_index('ix_studies_study_name', 'studies', ['study_name'])
+
+    op.create_table(
+        'results',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('result_name', sa.String(), nullable=True),
+        sa.Column('type', result_type_enum, nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('confidence', postgresql.ARRAY(sa.Float()), nullable=True),
+        sa.Column('labels', postgresql.ARRAY(sa.Integer()), nullable=True),
+        sa.Column('xray_path', sa.String(), nullable=True),
+        sa.Column('report_path', sa.String(), nullable=True),
+        sa.Column('heatmap_path', sa.String(), nullable=True),
+        sa.Column('region_path', sa.String(), nullable=True),
+        sa.Column('region_sentence_path', sa.String(), nullable=True),
+        sa.Column('last_view_at', sa.DateTime(), nullable=True),
+        sa.Column('last_edited_at', sa.DateTime(), nullable=True),
+        sa.Column('is_ready', sa.Boolean(), nullable=True),
+        sa.Column('study_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['study_id'], ['studies.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_results_id', 'results', ['id'])
+
+    op.create_table(
+        'activities',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('activity_type', activity_enum, nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('study_id', sa.Integer(), nullable=True),
+        sa.Column('employee_id', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['employee_id'], ['employees.id']),
+        sa.ForeignKeyConstraint(['study_id'], ['studies.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_activities_id', 'activities', ['id'])
+
+
+def downgrade() -> None:
+    op.drop_table('activities')
+    op.drop_table('results')
+    op.drop_table('studies')
+    op.drop_table('templates')
+    op.drop_table('patients')
+    op.drop_table('employees')
+
+    bind = op.get_bind()
+    for enum in reversed(enums):
+        enum.drop(bind, checkfirst=True)
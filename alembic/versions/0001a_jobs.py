@@ -0,0 +1,64 @@
+"""jobs
+
+The jobs table run by the worker and the job status mirrored on the
+results. Databases stamped at 0001 before it existed get it here; the
+ones where create_all already added the jobs table only get the missing
+results.job_status column.
+
+Revision ID: 0001a
+Revises: 0001
+Create Date: 2026-10-17 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '0001a'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+job_type_enum = postgresql.ENUM('heatmap', 'llm', 'denoise', 'severities', name='jobtypeenum', create_type=False)
+job_status_enum = postgresql.ENUM('queued', 'running', 'completed', 'failed', name='jobstatusenum', create_type=False)
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    job_type_enum.create(bind, checkfirst=True)
+    job_status_enum.create(bind, checkfirst=True)
+
+    inspector = sa.inspect(bind)
+    if 'job_status' not in [column['name'] for column in inspector.get_columns('results')]:
+        op.add_column('results', sa.Column('job_status', job_status_enum, nullable=True))
+
+    if 'jobs' not in inspector.get_table_names():
+        op.create_table(
+            'jobs',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('type', job_type_enum, nullable=False),
+            sa.Column('status', job_status_enum, nullable=True),
+            sa.Column('xray_path', sa.String(), nullable=True),
+            sa.Column('attempts', sa.Integer(), nullable=True),
+            sa.Column('error', sa.String(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('started_at', sa.DateTime(), nullable=True),
+            sa.Column('finished_at', sa.DateTime(), nullable=True),
+            sa.Column('result_id', sa.Integer(), nullable=True),
+            sa.ForeignKeyConstraint(['result_id'], ['results.id'], ondelete='SET NULL'),
+            sa.PrimaryKeyConstraint('id'),
+        )
+        op.create_index('ix_jobs_id', 'jobs', ['id'])
+        op.create_index('ix_jobs_status', 'jobs', ['status'])
+
+
+def downgrade() -> None:
+    op.drop_table('jobs')
+    op.drop_column('results', 'job_status')
+
+    bind = op.get_bind()
+    job_status_enum.drop(bind, checkfirst=True)
+    job_type_enum.drop(bind, checkfirst=True)
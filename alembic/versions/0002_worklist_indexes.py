@@ -0,0 +1,51 @@
+"""worklist indexes
+
+Composite and partial indexes matching the StudyRepository,
+ResultRepository and ActivityRepository queries: the worklists filter
+non deleted studies by status, doctor or patient and page through them
+ordered by (sort column, id).
+
+The indexes are built concurrently, outside a transaction, so the
+upgrade run at startup does not block writes to large tables.
+
+Revision ID: 0002
+Revises: 0001a
+Create Date: 2026-10-17 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001a'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        # GET /studies: status filter on non deleted studies, sorted by date or severity
+        op.create_index('ix_studies_status_created_at', 'studies', ['status', 'created_at', 'id'], postgresql_where=sa.text('is_deleted = false'), postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_studies_status_severity', 'studies', ['status', 'severity', 'id'], postgresql_where=sa.text('is_deleted = false'), postgresql_concurrently=True, if_not_exists=True)
+        # assigned studies and the per doctor counters
+        op.create_index('ix_studies_doctor_id_status', 'studies', ['doctor_id', 'status', 'created_at', 'id'], postgresql_concurrently=True, if_not_exists=True)
+        # patient studies
+        op.create_index('ix_studies_patient_id_created_at', 'studies', ['patient_id', 'created_at', 'id'], postgresql_concurrently=True, if_not_exists=True)
+        # results of a study, optionally by type
+        op.create_index('ix_results_study_id_type', 'results', ['study_id', 'type'], postgresql_concurrently=True, if_not_exists=True)
+        # activities of a doctor, optionally by type, newest first
+        op.create_index('ix_activities_employee_id_type_created_at', 'activities', ['employee_id', 'activity_type', 'created_at', 'id'], postgresql_concurrently=True, if_not_exists=True)
+        op.create_index('ix_activities_employee_id_created_at', 'activities', ['employee_id', 'created_at', 'id'], postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_activities_employee_id_created_at', table_name='activities', postgresql_concurrently=True)
+        op.drop_index('ix_activities_employee_id_type_created_at', table_name='activities', postgresql_concurrently=True)
+        op.drop_index('ix_results_study_id_type', table_name='results', postgresql_concurrently=True)
+        op.drop_index('ix_studies_patient_id_created_at', table_name='studies', postgresql_concurrently=True)
+        op.drop_index('ix_studies_doctor_id_status', table_name='studies', postgresql_concurrently=True)
+        op.drop_index('ix_studies_status_severity', table_name='studies', postgresql_concurrently=True)
+        op.drop_index('ix_studies_status_created_at', table_name='studies', postgresql_concurrently=True)
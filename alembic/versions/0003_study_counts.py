@@ -0,0 +1,76 @@
+"""study counts
+
+Counter table of studies per (status, doctor) for the dashboard, kept
+exact by triggers on studies so every writer (repositories, seeds, bulk
+updates) updates it in the same transaction.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+status_enum = postgresql.ENUM('new', 'in_progress', 'completed', 'archived', name='statusenum', create_type=False)
+
+
+def upgrade() -> None:
+    op.create_table(
+        'study_counts',
+        sa.Column('status', status_enum, nullable=False),
+        sa.Column('doctor_id', sa.Integer(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('status', 'doctor_id'),
+    )
+
+    op.execute("""
+        CREATE FUNCTION study_counts_update() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.status IS NOT NULL THEN
+                UPDATE study_counts SET count = count - 1
+                WHERE status = OLD.status AND doctor_id = COALESCE(OLD.doctor_id, 0);
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.status IS NOT NULL THEN
+                INSERT INTO study_counts (status, doctor_id, count)
+                VALUES (NEW.status, COALESCE(NEW.doctor_id, 0), 1)
+                ON CONFLICT (status, doctor_id) DO UPDATE SET count = study_counts.count + 1;
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER studies_count_insert_delete AFTER INSERT OR DELETE ON studies
+        FOR EACH ROW EXECUTE FUNCTION study_counts_update()
+    """)
+    op.execute("""
+        CREATE TRIGGER studies_count_update AFTER UPDATE OF status, doctor_id ON studies
+        FOR EACH ROW
+        WHEN (OLD.status IS DISTINCT FROM NEW.status OR OLD.doctor_id IS DISTINCT FROM NEW.doctor_id)
+        EXECUTE FUNCTION study_counts_update()
+    """)
+
+    # backfill, the triggers hold a lock on studies until commit so no write is missed or counted twice
+    op.execute("""
+        INSERT INTO study_counts (status, doctor_id, count)
+        SELECT status, COALESCE(doctor_id, 0), count(*) FROM studies
+        WHERE status IS NOT NULL
+        GROUP BY status, COALESCE(doctor_id, 0)
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER studies_count_update ON studies")
+    op.execute("DROP TRIGGER studies_count_insert_delete ON studies")
+    op.execute("DROP FUNCTION study_counts_update()")
+    op.drop_table('study_counts')
@@ -0,0 +1,33 @@
+"""study xray metadata
+
+SHA-256, size and dimensions of the uploaded X-ray, recorded while the
+upload is streamed to disk.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('studies', sa.Column('xray_sha256', sa.String(length=64), nullable=True))
+    op.add_column('studies', sa.Column('xray_size', sa.BigInteger(), nullable=True))
+    op.add_column('studies', sa.Column('xray_width', sa.Integer(), nullable=True))
+    op.add_column('studies', sa.Column('xray_height', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('studies', 'xray_height')
+    op.drop_column('studies', 'xray_width')
+    op.drop_column('studies', 'xray_size')
+    op.drop_column('studies', 'xray_sha256')
@@ -0,0 +1,37 @@
+"""study pyramid
+
+Image pyramid generated once per upload by the derivatives job: the
+derivative paths recorded on the study, the derivatives job type and
+the study a job works on.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # allowed in a transaction since postgres 12, the value is only used after the commit
+    op.execute("ALTER TYPE jobtypeenum ADD VALUE IF NOT EXISTS 'derivatives'")
+
+    op.add_column('studies', sa.Column('pyramid_paths', sa.JSON(), nullable=True))
+    op.add_column('jobs', sa.Column('study_id', sa.Integer(), nullable=True))
+    op.create_foreign_key('jobs_study_id_fkey', 'jobs', 'studies', ['study_id'], ['id'], ondelete='SET NULL')
+
+
+def downgrade() -> None:
+    op.drop_constraint('jobs_study_id_fkey', 'jobs', type_='foreignkey')
+    op.drop_column('jobs', 'study_id')
+    op.drop_column('studies', 'pyramid_paths')
+    # postgres cannot drop an enum value, only the jobs using it
+    op.execute("DELETE FROM jobs WHERE type = 'derivatives'")
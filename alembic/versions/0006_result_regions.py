@@ -0,0 +1,32 @@
+"""result regions
+
+Regions (boxes and labels), region sentences and report text of the LLM
+results stored on the row, next to the text files they are also written to.
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('results', sa.Column('regions', postgresql.JSONB(), nullable=True))
+    op.add_column('results', sa.Column('region_sentences', postgresql.JSONB(), nullable=True))
+    op.add_column('results', sa.Column('report_text', sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('results', 'report_text')
+    op.drop_column('results', 'region_sentences')
+    op.drop_column('results', 'regions')
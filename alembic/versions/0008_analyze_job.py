@@ -0,0 +1,29 @@
+"""analyze job
+
+Job type of the combined report and denoise model call, which uploads
+the X-ray once instead of once per endpoint.
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # allowed in a transaction since postgres 12, the value is only used after the commit
+    op.execute("ALTER TYPE jobtypeenum ADD VALUE IF NOT EXISTS 'analyze'")
+
+
+def downgrade() -> None:
+    # postgres cannot drop an enum value, only the jobs using it
+    op.execute("DELETE FROM jobs WHERE type = 'analyze'")
@@ -0,0 +1,49 @@
+"""pending job uniqueness
+
+At most one queued or running job of a type per result, and one queued
+job of a type per study, so repeated requests reuse the pending job
+instead of calling the model twice. Existing duplicates are failed
+first, keeping the oldest pending job.
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-17 00:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute("""
+        UPDATE jobs SET status = 'failed', error = 'Duplicate of a pending job', finished_at = now() at time zone 'utc'
+        WHERE id IN (
+            SELECT id FROM (
+                SELECT id, row_number() OVER (PARTITION BY result_id, type ORDER BY id) AS position
+                FROM jobs WHERE result_id IS NOT NULL AND status IN ('queued', 'running')
+            ) pending WHERE position > 1
+        )
+    """)
+    op.execute("""
+        UPDATE jobs SET status = 'failed', error = 'Duplicate of a pending job', finished_at = now() at time zone 'utc'
+        WHERE id IN (
+            SELECT id FROM (
+                SELECT id, row_number() OVER (PARTITION BY study_id, type ORDER BY id) AS position
+                FROM jobs WHERE study_id IS NOT NULL AND result_id IS NULL AND status = 'queued'
+            ) queued WHERE position > 1
+        )
+    """)
+    op.create_index('uq_jobs_pending_result', 'jobs', ['result_id', 'type'], unique=True, postgresql_where=sa.text("status IN ('queued', 'running')"))
+    op.create_index('uq_jobs_queued_study', 'jobs', ['study_id', 'type'], unique=True, postgresql_where=sa.text("status = 'queued' AND result_id IS NULL"))
+
+
+def downgrade() -> None:
+    op.drop_index('uq_jobs_queued_study', table_name='jobs')
+    op.drop_index('uq_jobs_pending_result', table_name='jobs')
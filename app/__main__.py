@@ -0,0 +1,8 @@
+import uvicorn
+from app.core.config import configs
+
+# python -m app runs the API. Processes started with spawn (the image pool)
+# do not re-import a package __main__, so they never load app.main.
+if __name__ == "__main__":
+    # uvicorn.run("app.main:app", host="0.0.0.0", port=configs.PORT) # for docker
+    uvicorn.run("app.main:app", host="127.0.0.1", port=configs.PORT)
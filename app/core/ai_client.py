@@ -0,0 +1,287 @@
+import asyncio
+import mimetypes
+import os
+import random
+import time
+import httpx
+from contextlib import ExitStack
+from typing import Dict, List, Optional, Set
+from app.core.config import configs
+from app.core.metrics import metrics
+
+# answers of an overloaded or restarting model server, worth retrying
+TRANSIENT_STATUS_CODES = {429, 502, 503, 504}
+
+
+class CircuitOpenError(Exception):
+    """
+    Raised without calling the model while the circuit of its endpoint is open.
+
+    Attributes:
+        retry_after (float): Seconds until the circuit lets a probe through.
+    """
+    def __init__(self, endpoint: str, retry_after: float):
+        super().__init__(f"AI model endpoint {endpoint} is unavailable, retry in {retry_after:.0f} s")
+        self.retry_after = retry_after
+
+
+class ModelResponseError(Exception):
+    """
+    Raised for an answer of the model other than 200.
+
+    Attributes:
+        status_code (int): The status of the answer.
+        transient (bool): Whether the status is one of TRANSIENT_STATUS_CODES, worth
+            retrying later. Other statuses, 4xx included, fail the same way again.
+    """
+    def __init__(self, endpoint: str, status_code: int):
+        super().__init__(f"AI model endpoint {endpoint} answered {status_code}")
+        self.status_code = status_code
+        self.transient = status_code in TRANSIENT_STATUS_CODES
+
+
+class CircuitBreaker:
+    """
+    Consecutive failure circuit breaker of one model endpoint.
+
+    After `threshold` consecutive failures the circuit opens and calls fail
+    fast for `cooldown` seconds. Then a single probe call is let through
+    (half open): its success closes the circuit, its failure opens it again.
+    Only used from the event loop, so it needs no lock.
+
+    Attributes:
+        threshold (int): Consecutive failures that open the circuit.
+        cooldown (float): Seconds the circuit stays open before a probe.
+        failures (int): Current run of consecutive failures.
+        opened_at (Optional[float]): Monotonic time the circuit opened, None while closed.
+        probing (bool): Whether the probe call is in flight.
+    """
+    def __init__(self, threshold: int, cooldown: float):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.probing = False
+
+    def allow(self) -> bool:
+        if self.opened_at is None:
+            return True
+        if not self.probing and self.retry_after() == 0:
+            self.probing = True
+            return True
+        return False
+
+    def retry_after(self) -> float:
+        if self.opened_at is None:
+            return 0.0
+        return max(0.0, self.opened_at + self.cooldown - time.monotonic())
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.probing or self.failures >= self.threshold:
+            self.opened_at = time.monotonic()
+            self.probing = False
+
+    def release(self) -> None:
+        # the call ended without an answer of the model, let the next one probe
+        self.probing = False
+
+
+class AIModelClient:
+    """
+    Application-lifetime async HTTP client for the AI model server.
+
+    One keep-alive connection pool is shared by every inference call and each
+    endpoint gets its own concurrency limit, so a slow endpoint cannot take all
+    the connections. Files are streamed from disk in the multipart body and
+    their handles are closed as soon as the request is sent.
+
+    Connection errors and transient statuses are retried with exponential
+    backoff and jitter, and every endpoint has a circuit breaker so calls
+    fail fast while the model is down. Requests, errors, retries, rejections,
+    latency, in flight calls and the circuit state are exported per endpoint
+    as ai.<endpoint>.* metrics.
+
+    Attributes:
+        client (httpx.AsyncClient): The pooled client, set by `start`.
+        semaphores (Dict[str, asyncio.Semaphore]): Concurrency limit per endpoint.
+        breakers (Dict[str, CircuitBreaker]): Circuit breaker per endpoint.
+        in_flight (Dict[str, int]): Calls holding a slot per endpoint.
+        unsupported (Set[str]): Endpoints the model server answered 404/405 for, not called again by this process.
+    """
+    def __init__(self):
+        self.client: Optional[httpx.AsyncClient] = None
+        self.semaphores: Dict[str, asyncio.Semaphore] = {}
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.in_flight: Dict[str, int] = {}
+        self.unsupported: Set[str] = set()
+
+    async def start(self) -> None:
+        """
+        Open the connection pool, called once from the application lifespan.
+        """
+        if self.client is not None:
+            return
+        self.client = httpx.AsyncClient(
+            base_url=configs.AI_MODEL_URL,
+            limits=httpx.Limits(
+                max_connections=configs.AI_MAX_CONNECTIONS,
+                max_keepalive_connections=configs.AI_MAX_KEEPALIVE_CONNECTIONS,
+            ),
+            timeout=httpx.Timeout(
+                connect=configs.AI_CONNECT_TIMEOUT,
+                read=configs.AI_READ_TIMEOUT,
+                write=configs.AI_WRITE_TIMEOUT,
+                pool=configs.AI_POOL_TIMEOUT,
+            ),
+        )
+        # semaphores are bound to the running event loop, create them here
+        self.semaphores = {}
+
+    async def close(self) -> None:
+        """
+        Close the connection pool, called once when the application shuts down.
+        """
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    def supports(self, endpoint: str) -> bool:
+        """
+        Whether an optional endpoint may exist on the model server.
+
+        Args:
+            endpoint (str): The endpoint path.
+
+        Returns:
+            bool: False once mark_unsupported was called for it.
+        """
+        return endpoint not in self.unsupported
+
+    def mark_unsupported(self, endpoint: str) -> None:
+        """
+        Remember that the model server has no such endpoint, so callers use
+        their fallback without a failed round trip until the process restarts.
+
+        Args:
+            endpoint (str): The endpoint path.
+        """
+        if endpoint not in self.unsupported:
+            self.unsupported.add(endpoint)
+            metrics.inc(f"{self._metric_name(endpoint)}.unsupported")
+
+    def _semaphore(self, endpoint: str) -> asyncio.Semaphore:
+        if endpoint not in self.semaphores:
+            self.semaphores[endpoint] = asyncio.Semaphore(int(configs.AI_ENDPOINT_CONCURRENCY))
+        return self.semaphores[endpoint]
+
+    def _breaker(self, endpoint: str) -> CircuitBreaker:
+        if endpoint not in self.breakers:
+            breaker = CircuitBreaker(int(configs.AI_BREAKER_THRESHOLD), float(configs.AI_BREAKER_COOLDOWN))
+            self.breakers[endpoint] = breaker
+            self.in_flight[endpoint] = 0
+            name = self._metric_name(endpoint)
+            metrics.gauge(f"{name}.in_flight", lambda: self.in_flight[endpoint])
+            metrics.gauge(f"{name}.circuit_open", lambda: int(breaker.opened_at is not None))
+        return self.breakers[endpoint]
+
+    @staticmethod
+    def _metric_name(endpoint: str) -> str:
+        return "ai." + endpoint.strip("/").replace("/", ".")
+
+    @staticmethod
+    def _backoff(attempt: int, response: Optional[httpx.Response] = None) -> float:
+        # the server knows best when it is overloaded
+        retry_after = response.headers.get("retry-after") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), float(configs.AI_RETRY_BACKOFF_MAX))
+        # full jitter spreads the retries of calls that failed together
+        return random.uniform(0, min(float(configs.AI_RETRY_BACKOFF_MAX), float(configs.AI_RETRY_BACKOFF) * 2 ** attempt))
+
+    async def post_files(self, endpoint: str, paths: List[str], field: str = "image") -> httpx.Response:
+        """
+        Upload one or more files from disk to an AI model endpoint.
+
+        Connection errors and 429/502/503/504 answers are retried up to
+        configs.AI_RETRIES times. Read timeouts are not: the model may still
+        be working on the request, the job is retried later instead.
+
+        Args:
+            endpoint (str): The endpoint path, e.g. "/x_reporto/report".
+            paths (List[str]): The files to upload.
+            field (str): The multipart field name used for every file.
+
+        Returns:
+            httpx.Response: The model server response, the last one if every attempt was transient.
+
+        Raises:
+            CircuitOpenError: If the circuit of the endpoint is open.
+            httpx.TransportError: If the last attempt failed to reach the model.
+        """
+        if self.client is None:
+            raise RuntimeError("AI model client is not started")
+
+        breaker = self._breaker(endpoint)
+        name = self._metric_name(endpoint)
+        retries = int(configs.AI_RETRIES)
+        for attempt in range(retries + 1):
+            if not breaker.allow():
+                metrics.inc(f"{name}.rejected")
+                raise CircuitOpenError(endpoint, breaker.retry_after())
+
+            response = None
+            try:
+                response = await self._post(endpoint, paths, field)
+            except httpx.ReadTimeout:
+                breaker.record_failure()
+                metrics.inc(f"{name}.errors")
+                raise
+            except httpx.TransportError:
+                breaker.record_failure()
+                metrics.inc(f"{name}.errors")
+                if attempt == retries:
+                    raise
+            except BaseException:
+                # a missing file, a cancelled job or an undecodable answer says nothing
+                # about the model, but must not leave a probe in flight forever
+                breaker.release()
+                raise
+            else:
+                if response.status_code not in TRANSIENT_STATUS_CODES:
+                    # any other answer, 4xx included, shows the model server is up
+                    breaker.record_success()
+                    return response
+                breaker.record_failure()
+                metrics.inc(f"{name}.errors")
+                if attempt == retries:
+                    return response
+
+            metrics.inc(f"{name}.retries")
+            await asyncio.sleep(self._backoff(attempt, response))
+
+    async def _post(self, endpoint: str, paths: List[str], field: str) -> httpx.Response:
+        name = self._metric_name(endpoint)
+        async with self._semaphore(endpoint):
+            self.in_flight[endpoint] += 1
+            start = time.perf_counter()
+            try:
+                with ExitStack() as stack:
+                    files = [
+                        (field, (os.path.basename(path), stack.enter_context(open(path, "rb")), mimetypes.guess_type(path)[0] or "application/octet-stream"))
+                        for path in paths
+                    ]
+                    return await self.client.post(endpoint, files=files)
+            finally:
+                elapsed = time.perf_counter() - start
+                self.in_flight[endpoint] -= 1
+                metrics.inc(f"{name}.requests")
+                metrics.inc(f"{name}.latency_seconds", elapsed)
+                metrics.max(f"{name}.latency_max_seconds", elapsed)
+
+
+ai_client = AIModelClient()
@@ -0,0 +1,103 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+from app.core.config import configs
+from app.core.metrics import metrics
+
+
+class TTLCache:
+    """
+    Thread safe in-process LRU cache whose entries expire after a TTL.
+
+    Each process keeps its own copy, so explicit invalidation only reaches
+    the process doing it; the TTL bounds how stale the other processes can be.
+    Hits and misses are counted as cache.<name>.hit|miss with a
+    cache.<name>.hit_rate gauge.
+
+    Attributes:
+        name (str): The cache name used in the metrics.
+        maxsize (int): The maximum number of entries, least recently used first out.
+        ttl (float): The default time to live of an entry, in seconds.
+    """
+    def __init__(self, name: str, maxsize: int, ttl: float):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        metrics.gauge(f"cache.{name}.hit_rate", self.hit_rate)
+        metrics.gauge(f"cache.{name}.size", lambda: len(self.entries))
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Look up an entry.
+
+        Args:
+            key (Hashable): The entry key.
+
+        Returns:
+            Optional[Any]: The cached value, or None if missing or expired.
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self.entries.move_to_end(key)
+                self.hits += 1
+                hit = True
+            else:
+                if entry is not None:
+                    del self.entries[key]
+                self.misses += 1
+                hit = False
+        metrics.inc(f"cache.{self.name}.{'hit' if hit else 'miss'}")
+        return entry[1] if hit else None
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """
+        Store an entry.
+
+        Args:
+            key (Hashable): The entry key.
+            value (Any): The value, None values are not cached.
+            ttl (Optional[float]): Time to live in seconds, the cache TTL if None.
+        """
+        if value is None:
+            return
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0:
+            return
+        with self.lock:
+            self.entries[key] = (time.monotonic() + ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        """
+        Invalidate an entry.
+
+        Args:
+            key (Hashable): The entry key.
+        """
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def clear(self) -> None:
+        """
+        Invalidate all the entries.
+        """
+        with self.lock:
+            self.entries.clear()
+
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+# decoded JWT payloads keyed by the SHA-256 of the token
+token_cache = TTLCache("token", int(configs.AUTH_CACHE_SIZE), float(configs.AUTH_CACHE_TTL))
+# (role, type) of the employees keyed by employee id, invalidated by EmployeeService
+employee_cache = TTLCache("employee", int(configs.AUTH_CACHE_SIZE), float(configs.AUTH_CACHE_TTL))
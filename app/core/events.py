@@ -0,0 +1,184 @@
+import asyncio
+import json
+import select
+import threading
+from datetime import datetime
+from typing import Dict, Optional, Set, Tuple
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from app.core.config import configs
+from app.core.metrics import metrics
+from app.models.database import engine
+
+# Postgres channel carrying the result events of every process
+CHANNEL = "result_events"
+NOTIFY = text("SELECT pg_notify(:channel, :payload)")
+# NOTIFY payloads are limited to 8000 bytes
+MAX_DETAIL_LENGTH = 1000
+
+
+def event_payload(result_id: int, state: str, job_type: Optional[str] = None, detail: Optional[str] = None) -> str:
+    event = {"result_id": result_id, "state": state, "job_type": job_type, "at": datetime.utcnow().isoformat()}
+    if detail:
+        event["detail"] = detail[:MAX_DETAIL_LENGTH]
+    return json.dumps(event)
+
+
+def notify(db: Session, result_id: Optional[int], state: str, job_type: Optional[str] = None, detail: Optional[str] = None) -> None:
+    """
+    Queue a result event in the current transaction of a session.
+
+    Postgres delivers it to the listeners when the transaction commits and
+    drops it on rollback, so the event never runs ahead of the data.
+
+    Args:
+        db (Session): The session whose transaction carries the event.
+        result_id (Optional[int]): The result the event is about, nothing is sent if None.
+        state (str): The new state (queued, running, sent, stored, completed, failed).
+        job_type (Optional[str]): The kind of job causing the transition.
+        detail (Optional[str]): Extra information such as the error of a failed job.
+    """
+    if result_id is None:
+        return
+    db.execute(NOTIFY, {"channel": CHANNEL, "payload": event_payload(result_id, state, job_type, detail)})
+    metrics.inc("events.published")
+
+
+def publish(result_id: Optional[int], state: str, job_type: Optional[str] = None, detail: Optional[str] = None) -> None:
+    """
+    Send a result event right away on its own pooled connection.
+
+    Args:
+        result_id (Optional[int]): The result the event is about, nothing is sent if None.
+        state (str): The new state (queued, running, sent, stored, completed, failed).
+        job_type (Optional[str]): The kind of job causing the transition.
+        detail (Optional[str]): Extra information such as the error of a failed job.
+    """
+    if result_id is None:
+        return
+    try:
+        with engine.begin() as connection:
+            connection.execute(NOTIFY, {"channel": CHANNEL, "payload": event_payload(result_id, state, job_type, detail)})
+        metrics.inc("events.published")
+    except Exception as e:
+        # events only spare the clients a poll, never fail the job over one
+        print(f"Publishing the {state} event of result {result_id} failed: {e}")
+        metrics.inc("events.publish_errors")
+
+
+class EventBroker:
+    """
+    In-process pub/sub of result events fed by Postgres LISTEN/NOTIFY.
+
+    The API, the worker and the services publish with pg_notify, so every
+    API process receives the events of all of them. A single background
+    thread per process holds a dedicated LISTEN connection and fans each
+    event out to the asyncio queues of the streams subscribed to its
+    result, whatever the number of open streams.
+
+    Attributes:
+        queue_size (int): Events buffered per subscriber, further ones are dropped.
+        subscribers (Dict[int, Set[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]]]): Subscribed queues per result.
+    """
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self.lock = threading.Lock()
+        self.subscribers: Dict[int, Set[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]]] = {}
+        self.stopped = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+        metrics.gauge("events.subscribers", lambda: sum(len(queues) for queues in self.subscribers.values()))
+
+    def subscribe(self, result_id: int) -> asyncio.Queue:
+        """
+        Subscribe to the events of a result, from the event loop of the caller.
+
+        Args:
+            result_id (int): The ID of the result.
+
+        Returns:
+            asyncio.Queue: The queue receiving the events as dicts.
+        """
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        with self.lock:
+            self.subscribers.setdefault(result_id, set()).add((asyncio.get_running_loop(), queue))
+        return queue
+
+    def unsubscribe(self, result_id: int, queue: asyncio.Queue) -> None:
+        """
+        Stop delivering the events of a result to a queue.
+
+        Args:
+            result_id (int): The ID of the result.
+            queue (asyncio.Queue): The queue returned by subscribe.
+        """
+        with self.lock:
+            queues = self.subscribers.get(result_id, set())
+            queues.difference_update({entry for entry in queues if entry[1] is queue})
+            if not queues:
+                self.subscribers.pop(result_id, None)
+
+    def dispatch(self, event: dict) -> None:
+        with self.lock:
+            queues = list(self.subscribers.get(event.get("result_id"), ()))
+        for loop, queue in queues:
+            loop.call_soon_threadsafe(self.put, queue, event)
+
+    def put(self, queue: asyncio.Queue, event: dict) -> None:
+        try:
+            queue.put_nowait(event)
+            metrics.inc("events.delivered")
+        except asyncio.QueueFull:
+            # a stalled client, it resynchronizes from the result on reconnect
+            metrics.inc("events.dropped")
+
+    def listen(self) -> None:
+        cargs, cparams = engine.dialect.create_connect_args(engine.url)
+        connection = engine.dialect.dbapi.connect(*cargs, **cparams)
+        try:
+            connection.autocommit = True
+            with connection.cursor() as cursor:
+                cursor.execute(f"LISTEN {CHANNEL}")
+            while not self.stopped.is_set():
+                if not select.select([connection], [], [], 1.0)[0]:
+                    continue
+                connection.poll()
+                while connection.notifies:
+                    notification = connection.notifies.pop(0)
+                    try:
+                        self.dispatch(json.loads(notification.payload))
+                    except ValueError:
+                        metrics.inc("events.invalid")
+        finally:
+            connection.close()
+
+    def run(self) -> None:
+        while not self.stopped.is_set():
+            try:
+                self.listen()
+            except Exception as e:
+                print(f"Result events listener failed, reconnecting: {e}")
+                metrics.inc("events.listener_errors")
+                self.stopped.wait(1.0)
+
+    def start(self) -> None:
+        """
+        Start the listener thread, called once from the application lifespan.
+        """
+        if self.thread is not None:
+            return
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self.run, name="result-events", daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop the listener thread and close its connection.
+        """
+        if self.thread is None:
+            return
+        self.stopped.set()
+        self.thread.join()
+        self.thread = None
+
+
+event_broker = EventBroker(int(configs.EVENTS_QUEUE_SIZE))
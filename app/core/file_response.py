@@ -0,0 +1,105 @@
+import hashlib
+import os
+from email.utils import formatdate, parsedate_to_datetime
+from functools import lru_cache
+from typing import Optional
+from fastapi import HTTPException, Request, status
+from fastapi.responses import FileResponse, Response
+
+# a year, the longest max-age caches are expected to honour
+IMMUTABLE_CACHE_CONTROL = "private, max-age=31536000, immutable"
+
+
+def file_response(request: Request, path: str, media_type: Optional[str] = None, headers: Optional[dict] = None,
+                  digest: Optional[str] = None, immutable: bool = False) -> Response:
+    """
+    Serve a file with a strong ETag and Last-Modified, answering conditional
+    requests whose validators still match with 304 Not Modified.
+
+    Range requests (single and multiple ranges, If-Range) are answered with
+    206 Partial Content by FileResponse, which compares If-Range with the
+    ETag set here.
+
+    Args:
+        request (Request): The incoming request, for its conditional headers.
+        path (str): The file to serve.
+        media_type (Optional[str]): The media type, guessed from the path if None.
+        headers (Optional[dict]): Extra response headers.
+        digest (Optional[str]): The content hash of the file when it is stored
+            on the row, otherwise the file is hashed once per modification.
+        immutable (bool): The URL is content addressed, clients may cache the
+            file for a year without revalidating.
+
+    Returns:
+        Response: A FileResponse, or an empty 304 response.
+
+    Raises:
+        HTTPException: If the file does not exist.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found")
+    if not os.path.isfile(path):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found")
+
+    etag = f'"{digest or file_digest(path, stat.st_mtime_ns, stat.st_size)}"'
+    validators = {
+        "ETag": etag,
+        "Last-Modified": formatdate(stat.st_mtime, usegmt=True),
+        "Cache-Control": IMMUTABLE_CACHE_CONTROL if immutable else "no-cache",
+        "Accept-Ranges": "bytes",
+    }
+    validators.update(headers or {})
+
+    if is_not_modified(request, etag, stat.st_mtime):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=validators)
+    return FileResponse(path, media_type=media_type, headers=validators, stat_result=stat)
+
+
+@lru_cache(maxsize=4096)
+def file_digest(path: str, mtime_ns: int, size: int) -> str:
+    """
+    Hash a file, memoized on its modification time and size so a
+    rewritten file is hashed again.
+
+    Args:
+        path (str): The file to hash.
+        mtime_ns (int): The modification time of the file, part of the memo key.
+        size (int): The size of the file, part of the memo key.
+
+    Returns:
+        str: The SHA-256 of the file content.
+    """
+    sha = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def is_not_modified(request: Request, etag: str, mtime: float) -> bool:
+    """
+    Check the conditional request headers against the current validators.
+
+    Args:
+        request (Request): The incoming request.
+        etag (str): The current ETag of the file, quoted.
+        mtime (float): The modification time of the file.
+
+    Returns:
+        bool: True if the client copy is still fresh.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-None-Match takes precedence over If-Modified-Since and uses the weak comparison
+        tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is not None:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
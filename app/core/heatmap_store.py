@@ -0,0 +1,109 @@
+import ast
+import os
+from functools import lru_cache
+from typing import Tuple
+import numpy as np
+
+# Heatmap stacks of shape (labels, 7, 7) with values in [0, 1], one .npy file
+# per result. They are stored as float16: a quarter of the float64 the model
+# returns, and their error is well below the 1/255 step of the colormap
+# lookup. The .npy layout is a fixed header followed by the C ordered array,
+# so a single label is read at its offset without the rest.
+
+HEATMAP_DTYPE = np.float16
+
+
+def file_path(heatmap_path: str) -> str:
+    # Result.heatmap_path is stored without the .npy extension np.save adds
+    return heatmap_path if heatmap_path.endswith(".npy") else heatmap_path + ".npy"
+
+
+def save(heatmap_path: str, heatmaps) -> str:
+    """
+    Save a heatmap stack as float16, replacing the previous file at once.
+
+    Args:
+        heatmap_path (str): The path of the stack, with or without the .npy extension.
+        heatmaps: The heatmap stack, a nested list or an array of shape (labels, 7, 7).
+
+    Returns:
+        str: The path of the written file.
+    """
+    path = file_path(heatmap_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp.npy"
+    np.save(tmp_path, np.asarray(heatmaps, dtype=HEATMAP_DTYPE))
+    os.replace(tmp_path, path)
+    return path
+
+
+def load(heatmap_path: str) -> np.ndarray:
+    """
+    Open a heatmap stack as a read only memory map.
+
+    Stacks saved before the float16 format (float64) are read the same way.
+
+    Args:
+        heatmap_path (str): The path of the stack, with or without the .npy extension.
+
+    Returns:
+        np.ndarray: The memory mapped stack of shape (labels, 7, 7).
+    """
+    return np.load(file_path(heatmap_path), mmap_mode="r")
+
+
+def load_label(heatmap_path: str, label: int) -> np.ndarray:
+    """
+    Read the heatmap of a single label at its offset in the file.
+
+    Args:
+        heatmap_path (str): The path of the stack, with or without the .npy extension.
+        label (int): The label index.
+
+    Returns:
+        np.ndarray: The (7, 7) float32 heatmap of the label.
+
+    Raises:
+        IndexError: If the label is not in the stack.
+        ValueError: If the file is not a .npy file.
+    """
+    with open(file_path(heatmap_path), "rb") as file:
+        magic = file.read(8)
+        if not magic.startswith(b"\x93NUMPY"):
+            raise ValueError(f"{heatmap_path} is not a .npy file")
+        # the header length is 2 bytes in version 1.0, 4 bytes afterwards
+        length_size = 2 if magic[6] == 1 else 4
+        header_length = int.from_bytes(file.read(length_size), "little")
+        shape, fortran_order, dtype = parse_header(file.read(header_length))
+        if fortran_order:
+            return np.array(load(heatmap_path)[label], dtype=np.float32)
+        if not 0 <= label < shape[0]:
+            raise IndexError(f"Label {label} out of range for {shape[0]} labels")
+
+        label_size = int(np.prod(shape[1:])) * dtype.itemsize
+        file.seek(8 + length_size + header_length + label * label_size)
+        return np.frombuffer(file.read(label_size), dtype=dtype).reshape(shape[1:]).astype(np.float32)
+
+
+@lru_cache(maxsize=64)
+def parse_header(header: bytes) -> Tuple[tuple, bool, np.dtype]:
+    # every stack of a shape and dtype has the same header, parse it once
+    fields = ast.literal_eval(header.decode("latin1"))
+    return fields["shape"], fields["fortran_order"], np.dtype(fields["descr"])
+
+
+def convert(heatmap_path: str) -> bool:
+    """
+    Rewrite a heatmap stack saved in another dtype as float16.
+
+    Args:
+        heatmap_path (str): The path of the stack, with or without the .npy extension.
+
+    Returns:
+        bool: True if the file was rewritten, False if it already was float16.
+    """
+    heatmaps = load(heatmap_path)
+    if heatmaps.dtype == HEATMAP_DTYPE:
+        return False
+    save(heatmap_path, np.array(heatmaps))
+    return True
@@ -0,0 +1,103 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Optional
+import cv2
+from app.core.config import configs
+from app.core.metrics import metrics
+
+
+def init_worker() -> None:
+    # one OpenCV thread per process, the pool already spreads the work over the cores
+    cv2.setNumThreads(1)
+
+
+class ImagePool:
+    """
+    Process pool running the OpenCV/albumentations work of the services
+    (app.core.images) on every core instead of the GIL bound thread that
+    serves the request or the worker job.
+
+    The tasks take and return paths and small arrays: the processes decode
+    the X-ray from disk and write their outputs to disk, so no decoded image
+    crosses the process boundary. The processes are spawned, not forked from
+    the multi threaded server, on the first task.
+
+    Attributes:
+        workers (int): The number of processes.
+        executor (Optional[ProcessPoolExecutor]): The processes, started on first use.
+    """
+    def __init__(self, workers: int):
+        self.workers = workers
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        metrics.gauge("image_pool.in_flight", lambda: self.in_flight)
+
+    def submit(self, function: Callable, *args):
+        """
+        Queue a task on the pool, starting the processes if needed.
+
+        Args:
+            function (Callable): A module level function of app.core.images.
+            *args: Its arguments, pickled to the process.
+
+        Returns:
+            concurrent.futures.Future: The future of the result.
+        """
+        with self.lock:
+            if self.executor is None:
+                self.executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=init_worker,
+                )
+            self.in_flight += 1
+        metrics.inc(f"image_pool.{function.__name__}")
+        future = self.executor.submit(function, *args)
+        future.add_done_callback(self.task_done)
+        return future
+
+    def task_done(self, future) -> None:
+        with self.lock:
+            self.in_flight -= 1
+
+    def run(self, function: Callable, *args) -> Any:
+        """
+        Run a task on the pool and wait for its result, from a sync caller.
+
+        Args:
+            function (Callable): A module level function of app.core.images.
+            *args: Its arguments.
+
+        Returns:
+            Any: The function result, its exceptions are raised here.
+        """
+        return self.submit(function, *args).result()
+
+    async def run_async(self, function: Callable, *args) -> Any:
+        """
+        Run a task on the pool without blocking the event loop.
+
+        Args:
+            function (Callable): A module level function of app.core.images.
+            *args: Its arguments.
+
+        Returns:
+            Any: The function result, its exceptions are raised here.
+        """
+        return await asyncio.wrap_future(self.submit(function, *args))
+
+    def shutdown(self) -> None:
+        """
+        Stop the processes once their tasks are done.
+        """
+        with self.lock:
+            executor, self.executor = self.executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+image_pool = ImagePool(int(configs.IMAGE_WORKERS) or os.cpu_count() or 1)
@@ -0,0 +1,230 @@
+from typing import List, Optional
+import albumentations as A
+import cv2
+import math
+import numpy as np
+import os
+import shutil
+from app.core.uploads import image_info, HEADER_SIZE
+
+# Decoding and the CPU bound image work of the services. The functions taking
+# and returning paths run in the image process pool, see app.core.image_pool.
+
+# longest side of the pyramid levels generated for each X-ray, besides the full image
+PYRAMID_SIZES = (224, 512, 1024)
+# side of the deep zoom tiles
+TILE_SIZE = 256
+
+HEATMAP_IMAGE_SIZE = 224
+HEATMAP_ALPHA = 0.35
+
+# built once instead of on every projection
+resize_and_pad_transform = A.Compose([
+    A.LongestMaxSize(max_size=HEATMAP_IMAGE_SIZE, interpolation=cv2.INTER_AREA),
+    A.PadIfNeeded(min_height=HEATMAP_IMAGE_SIZE, min_width=HEATMAP_IMAGE_SIZE, border_mode=cv2.BORDER_CONSTANT, value=0)
+])
+
+# the "jet" colormap as a (256, 3) BGR lookup table, so a whole heatmap stack is colored with one indexing operation
+JET_LUT = cv2.applyColorMap(np.arange(256, dtype=np.uint8).reshape(256, 1), cv2.COLORMAP_JET).reshape(256, 3)
+
+# JPEG scale factors libjpeg can decode to directly from the DCT coefficients
+REDUCED_COLOR = {2: cv2.IMREAD_REDUCED_COLOR_2, 4: cv2.IMREAD_REDUCED_COLOR_4, 8: cv2.IMREAD_REDUCED_COLOR_8}
+REDUCED_GRAYSCALE = {2: cv2.IMREAD_REDUCED_GRAYSCALE_2, 4: cv2.IMREAD_REDUCED_GRAYSCALE_4, 8: cv2.IMREAD_REDUCED_GRAYSCALE_8}
+
+
+def decode_image(path: str, min_size: Optional[int] = None, color: bool = False) -> Optional[np.ndarray]:
+    """
+    Decode an image file at the lowest resolution that still serves a target size.
+
+    JPEGs are decoded with the largest DCT domain reduction (1/2, 1/4 or 1/8)
+    that keeps the longest side at least min_size, which skips most of the
+    inverse DCT work and never allocates the full resolution image. Single
+    channel images (X-rays) are decoded as grayscale, a third of the memory
+    of the BGR decode, and converted to BGR after the reduction when color
+    is requested.
+
+    Args:
+        path (str): The image file.
+        min_size (Optional[int]): The smallest longest side the caller resizes to, None for full resolution.
+        color (bool): Return a 3 channel BGR image even for grayscale sources.
+
+    Returns:
+        Optional[np.ndarray]: The decoded image, None if it cannot be read.
+    """
+    with open(path, "rb") as file:
+        info = image_info(file.read(HEADER_SIZE))
+    is_jpeg = info is not None and path.lower().endswith((".jpg", ".jpeg"))
+    grayscale = info is not None and info[2] == 1
+
+    flags = cv2.IMREAD_GRAYSCALE if grayscale else cv2.IMREAD_COLOR
+    if is_jpeg and min_size:
+        factor = reduction_factor(max(info[0], info[1]), min_size)
+        if factor > 1:
+            flags = (REDUCED_GRAYSCALE if grayscale else REDUCED_COLOR)[factor]
+
+    img = cv2.imread(path, flags)
+    if img is not None and color and img.ndim == 2:
+        img = cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
+    return img
+
+
+def reduction_factor(longest_side: int, min_size: int) -> int:
+    """
+    Pick the largest JPEG scale factor keeping the longest side at least min_size.
+
+    Args:
+        longest_side (int): The longest side of the full image.
+        min_size (int): The smallest acceptable longest side.
+
+    Returns:
+        int: 1, 2, 4 or 8.
+    """
+    for factor in (8, 4, 2):
+        # libjpeg rounds the scaled dimensions up
+        if -(-longest_side // factor) >= min_size:
+            return factor
+    return 1
+
+
+def tile_max_level(width: int, height: int) -> int:
+    # deep zoom levels halve the image down to 1x1 at level 0
+    return math.ceil(math.log2(max(width, height, 1)))
+
+
+def build_derivatives(xray_path: str) -> Optional[dict]:
+    """
+    Generate the image pyramid and the deep zoom tiles of an X-ray.
+
+    The X-ray is decoded once, as grayscale for grayscale X-rays, and each
+    level is resized from the next larger one (never upscaled), then padded
+    to a square like the model input. The files are written next to the
+    X-ray and renamed into place, so concurrent downloads never see a
+    partial file.
+
+    Args:
+        xray_path (str): The path to the X-ray image, named xray.jpg.
+
+    Returns:
+        Optional[dict]: "paths" with the path of each pyramid level keyed by size,
+            "full" for the X-ray itself and "tiles" for the tiles directory, and
+            the "width" and "height" of the X-ray. None if it cannot be read.
+    """
+    # the tiles need the full resolution, a reduced decode would not do
+    img = decode_image(xray_path)
+    if img is None:
+        return None
+    height, width = img.shape[:2]
+
+    paths = {"full": xray_path, "tiles": build_tiles(xray_path, img)}
+    for size in sorted(PYRAMID_SIZES, reverse=True):
+        if max(img.shape[:2]) > size:
+            img = A.LongestMaxSize(max_size=size, interpolation=cv2.INTER_AREA)(image=img)["image"]
+        padded = A.PadIfNeeded(min_height=size, min_width=size, border_mode=cv2.BORDER_CONSTANT, value=0)(image=img)["image"]
+
+        path = xray_path.replace("xray.jpg", f"xray_{size}.jpg")
+        tmp_path = f"{path}.{os.getpid()}.tmp.jpg"
+        cv2.imwrite(tmp_path, padded)
+        os.replace(tmp_path, path)
+        paths[str(size)] = path
+    return {"paths": paths, "width": width, "height": height}
+
+
+def build_tiles(xray_path: str, img: np.ndarray) -> str:
+    """
+    Cut an X-ray into the 256x256 JPEG tiles of a deep zoom pyramid.
+
+    Level max_level is the full resolution image and each level below
+    halves it, down to level 0 of a single pixel, as expected by deep zoom
+    viewers. Level images are resized from the next larger level. The tiles
+    are written to a new directory that replaces the previous one at once.
+
+    Args:
+        xray_path (str): The path to the X-ray image, the tiles go next to it.
+        img (np.ndarray): The decoded full resolution X-ray.
+
+    Returns:
+        str: The tiles directory, tiles are stored as {level}/{x}_{y}.jpg.
+    """
+    tiles_dir = os.path.join(os.path.dirname(xray_path), "tiles")
+    tmp_dir = f"{tiles_dir}.{os.getpid()}.tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    height, width = img.shape[:2]
+    max_level = tile_max_level(width, height)
+    for level in range(max_level, -1, -1):
+        scale = 2 ** (max_level - level)
+        level_width, level_height = math.ceil(width / scale), math.ceil(height / scale)
+        if img.shape[1] != level_width or img.shape[0] != level_height:
+            img = cv2.resize(img, (level_width, level_height), interpolation=cv2.INTER_AREA)
+
+        os.makedirs(os.path.join(tmp_dir, str(level)))
+        for y in range(0, level_height, TILE_SIZE):
+            for x in range(0, level_width, TILE_SIZE):
+                tile = img[y:y + TILE_SIZE, x:x + TILE_SIZE]
+                cv2.imwrite(os.path.join(tmp_dir, str(level), f"{x // TILE_SIZE}_{y // TILE_SIZE}.jpg"), tile)
+
+    # swap the directories, the previous tiles are removed afterwards
+    old_dir = f"{tiles_dir}.{os.getpid()}.old"
+    if os.path.isdir(tiles_dir):
+        os.replace(tiles_dir, old_dir)
+    os.replace(tmp_dir, tiles_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    return tiles_dir
+
+
+def render_heatmap_overlays(xray_path: str, heatmaps, paths: List[str]) -> List[str]:
+    """
+    Blend every heatmap label onto the X-ray in a single pass and save the overlays.
+
+    The X-ray is decoded once at a reduced JPEG scale just above the overlay
+    size, and the (8, 7, 7) heatmap stack is resized, colored and blended
+    as one array instead of label by label.
+
+    Args:
+        xray_path (str): The path to the X-ray image.
+        heatmaps: The heatmap stack of shape (8, 7, 7) with values in [0, 1].
+        paths (List[str]): The path of the overlay of each label.
+
+    Returns:
+        List[str]: The paths of the blended images, indexed by label.
+    """
+    xray = decode_image(xray_path, HEATMAP_IMAGE_SIZE, color=True)
+    image_resized = resize_and_pad_transform(image=xray)["image"] # (224, 224, 3)
+
+    # resize all labels at once with the labels as channels (224, 224, 8)
+    stack = np.asarray(heatmaps, dtype=np.float32).transpose(1, 2, 0)
+    stack_resized = cv2.resize(stack, (HEATMAP_IMAGE_SIZE, HEATMAP_IMAGE_SIZE))
+
+    # color map every label through the lookup table (224, 224, 8, 3)
+    colored = JET_LUT[np.uint8(255 * stack_resized)]
+
+    # weighted sum 1*img + 0.35*heatmap, rounded and saturated like cv2.addWeighted
+    blended = image_resized[:, :, None, :].astype(np.float32) + HEATMAP_ALPHA * colored
+    blended = np.clip(np.rint(blended), 0, 255).astype(np.uint8)
+
+    for label, path in enumerate(paths):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        cv2.imwrite(path, blended[:, :, label])
+    return paths
+
+
+def save_decoded(content: bytes, path: str) -> str:
+    """
+    Decode an encoded image and save it in the format of the path extension.
+
+    Args:
+        content (bytes): The encoded image.
+        path (str): The destination path, its directories are created.
+
+    Returns:
+        str: The path.
+
+    Raises:
+        ValueError: If the content is not a decodable image.
+    """
+    img = cv2.imdecode(np.frombuffer(content, np.uint8), cv2.IMREAD_COLOR)
+    if img is None:
+        raise ValueError("Image could not be decoded")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    cv2.imwrite(path, img)
+    return path
@@ -0,0 +1,140 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+from app.core.config import configs
+from app.core.metrics import metrics
+
+
+class InferenceCache:
+    """
+    Content-addressed on-disk cache of AI model outputs.
+
+    Entries are keyed by the SHA-256 of the uploaded X-ray bytes, the model
+    endpoint and configs.AI_MODEL_VERSION, so the same image uploaded to two
+    studies (or re-run) is only sent to the model once per model version.
+
+    Attributes:
+        directory (str): Root directory of the cache entries.
+        digests (OrderedDict): Memoised file digests keyed by (path, size, mtime).
+    """
+    MAX_MEMOISED_DIGESTS = 1024
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.lock = threading.Lock()
+        self.digests: "OrderedDict[Tuple[str, int, int], str]" = OrderedDict()
+
+    def file_digest(self, path: str) -> str:
+        """
+        Compute the SHA-256 of a file, reading it in chunks.
+
+        Args:
+            path (str): The file to hash.
+
+        Returns:
+            str: The hex digest.
+        """
+        stat = os.stat(path)
+        memo_key = (path, stat.st_size, stat.st_mtime_ns)
+        with self.lock:
+            if memo_key in self.digests:
+                self.digests.move_to_end(memo_key)
+                return self.digests[memo_key]
+
+        sha = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                sha.update(chunk)
+        digest = sha.hexdigest()
+
+        with self.lock:
+            self.digests[memo_key] = digest
+            if len(self.digests) > self.MAX_MEMOISED_DIGESTS:
+                self.digests.popitem(last=False)
+        return digest
+
+    def _path(self, endpoint: str, digest: str, extension: str) -> str:
+        key = hashlib.sha256(f"{endpoint}|{configs.AI_MODEL_VERSION}|{digest}".encode()).hexdigest()
+        return os.path.join(self.directory, key[:2], key + extension)
+
+    def _count(self, endpoint: str, hit: bool) -> None:
+        name = endpoint.strip("/").replace("/", ".")
+        metrics.inc(f"inference_cache.{name}.{'hit' if hit else 'miss'}")
+
+    def _write(self, path: str, data: bytes) -> None:
+        # write to a temporary file first so readers never see a partial entry
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def get_json(self, endpoint: str, digest: str) -> Optional[dict]:
+        """
+        Look up a cached JSON model output.
+
+        Args:
+            endpoint (str): The model endpoint the output came from.
+            digest (str): The SHA-256 of the X-ray.
+
+        Returns:
+            Optional[dict]: The cached output, or None on a miss.
+        """
+        path = self._path(endpoint, digest, ".json")
+        try:
+            with open(path) as f:
+                output = json.load(f)
+        except (OSError, ValueError):
+            self._count(endpoint, False)
+            return None
+        self._count(endpoint, True)
+        return output
+
+    def put_json(self, endpoint: str, digest: str, output: dict) -> None:
+        """
+        Store a JSON model output.
+
+        Args:
+            endpoint (str): The model endpoint the output came from.
+            digest (str): The SHA-256 of the X-ray.
+            output (dict): The model output.
+        """
+        self._write(self._path(endpoint, digest, ".json"), json.dumps(output).encode())
+
+    def get_bytes(self, endpoint: str, digest: str) -> Optional[bytes]:
+        """
+        Look up a cached binary model output.
+
+        Args:
+            endpoint (str): The model endpoint the output came from.
+            digest (str): The SHA-256 of the X-ray.
+
+        Returns:
+            Optional[bytes]: The cached output, or None on a miss.
+        """
+        path = self._path(endpoint, digest, ".bin")
+        try:
+            with open(path, "rb") as f:
+                content = f.read()
+        except OSError:
+            self._count(endpoint, False)
+            return None
+        self._count(endpoint, True)
+        return content
+
+    def put_bytes(self, endpoint: str, digest: str, content: bytes) -> None:
+        """
+        Store a binary model output.
+
+        Args:
+            endpoint (str): The model endpoint the output came from.
+            digest (str): The SHA-256 of the X-ray.
+            content (bytes): The model output.
+        """
+        self._write(self._path(endpoint, digest, ".bin"), content)
+
+
+inference_cache = InferenceCache(configs.INFERENCE_CACHE_DIR)
@@ -0,0 +1,112 @@
+import glob
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict
+from app.core.config import configs
+
+
+class Metrics:
+    """
+    In-process counters and gauges.
+
+    Counters are incremented by the code that observes an event, gauges are
+    callables sampled when a snapshot is taken. Processes without an HTTP
+    server (the worker) dump their snapshot to configs.METRICS_DIR so the
+    API can expose it next to its own.
+
+    Attributes:
+        counters (Dict[str, float]): Monotonic counters by name.
+        gauges (Dict[str, Callable[[], float]]): Gauge samplers by name.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters: Dict[str, float] = {}
+        self.gauges: Dict[str, Callable[[], float]] = {}
+
+    def inc(self, name: str, value: float = 1) -> None:
+        """
+        Increment a counter.
+
+        Args:
+            name (str): The counter name, dot separated.
+            value (float): The amount to add.
+        """
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def max(self, name: str, value: float) -> None:
+        """
+        Keep the largest value seen for a counter.
+
+        Args:
+            name (str): The counter name, dot separated.
+            value (float): The observed value.
+        """
+        with self.lock:
+            self.counters[name] = max(self.counters.get(name, value), value)
+
+    def gauge(self, name: str, sampler: Callable[[], float]) -> None:
+        """
+        Register a gauge sampled on every snapshot.
+
+        Args:
+            name (str): The gauge name, dot separated.
+            sampler (Callable[[], float]): Returns the current value.
+        """
+        self.gauges[name] = sampler
+
+    def snapshot(self) -> dict:
+        """
+        Take a snapshot of all counters and gauges.
+
+        Returns:
+            dict: The counters and sampled gauges of this process.
+        """
+        with self.lock:
+            counters = dict(self.counters)
+        gauges = {}
+        for name, sampler in self.gauges.items():
+            try:
+                gauges[name] = sampler()
+            except Exception as e:
+                print(e)
+        return {"pid": os.getpid(), "time": time.time(), "counters": counters, "gauges": gauges}
+
+    def dump(self, name: str) -> None:
+        """
+        Write the snapshot of this process to configs.METRICS_DIR.
+
+        Args:
+            name (str): The process name used for the file, e.g. "worker".
+        """
+        os.makedirs(configs.METRICS_DIR, exist_ok=True)
+        path = os.path.join(configs.METRICS_DIR, f"{name}-{os.getpid()}.json")
+        with open(path + ".tmp", "w") as f:
+            json.dump(self.snapshot(), f)
+        os.replace(path + ".tmp", path)
+
+    def collect(self, max_age: float = 300) -> dict:
+        """
+        Combine the snapshot of this process with the recent dumps of other processes.
+
+        Args:
+            max_age (float): Ignore dumps older than this many seconds.
+
+        Returns:
+            dict: Snapshots keyed by process name.
+        """
+        snapshots = {"api": self.snapshot()}
+        for path in glob.glob(os.path.join(configs.METRICS_DIR, "*.json")):
+            try:
+                with open(path) as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if time.time() - snapshot.get("time", 0) <= max_age:
+                snapshots[os.path.basename(path)[:-len(".json")]] = snapshot
+        return snapshots
+
+
+metrics = Metrics()
@@ -0,0 +1,164 @@
+import base64
+import enum
+import json
+from datetime import datetime
+from typing import Any, List, Optional
+from fastapi import HTTPException, Response, status
+from sqlalchemy import DateTime, and_, or_
+from sqlalchemy.orm import Query
+
+
+def encode_cursor(values: List[Any]) -> str:
+    """
+    Encode the sort key values of the last row of a page into an opaque cursor.
+
+    Args:
+        values (List[Any]): The sort column value (if any) followed by the id.
+
+    Returns:
+        str: A URL safe cursor.
+    """
+    values = [
+        value.isoformat() if isinstance(value, datetime)
+        else value.name if isinstance(value, enum.Enum)
+        else value
+        for value in values
+    ]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> List[Any]:
+    """
+    Decode a cursor produced by encode_cursor.
+
+    Args:
+        cursor (str): The cursor sent by the client.
+
+    Returns:
+        List[Any]: The encoded values.
+
+    Raises:
+        HTTPException: If the cursor is malformed.
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    if not isinstance(values, list) or not values:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    return values
+
+
+def sort_column(model, sort: Optional[str]):
+    """
+    Resolve a sort parameter such as "-created_at" to a model column.
+
+    Args:
+        model: The SQLAlchemy model being listed.
+        sort (Optional[str]): The sort parameter, "-" prefixed for descending.
+
+    Returns:
+        The column, or None when no sort is requested.
+
+    Raises:
+        HTTPException: If the model has no such column.
+    """
+    if not sort:
+        return None
+    column = model.__table__.columns.get(sort.lstrip("-"))
+    if column is None:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Cannot sort by {sort.lstrip('-')}")
+    return getattr(model, column.key)
+
+
+def paginate(query: Query, model, sort: Optional[str], cursor: Optional[str]) -> Query:
+    """
+    Order a listing by the sort column with the id as tie breaker and, given a
+    cursor, keep only the rows after it (keyset pagination).
+
+    The ordering follows the PostgreSQL defaults (NULLs last ascending, first
+    descending) so the (column, id) indexes can serve both directions, and
+    rows with a NULL sort value are paged through like any other.
+
+    Args:
+        query (Query): The filtered listing query.
+        model: The SQLAlchemy model being listed.
+        sort (Optional[str]): The sort parameter, "-" prefixed for descending.
+        cursor (Optional[str]): The cursor returned with the previous page.
+
+    Returns:
+        Query: The ordered query, starting after the cursor.
+    """
+    column = sort_column(model, sort)
+    descending = bool(sort) and sort.startswith("-")
+
+    if column is None:
+        query = query.order_by(model.id.desc() if descending else model.id.asc())
+    elif descending:
+        query = query.order_by(column.desc(), model.id.desc())
+    else:
+        query = query.order_by(column.asc(), model.id.asc())
+
+    if not cursor:
+        return query
+
+    values = decode_cursor(cursor)
+    last_id = values[-1]
+    after_id = model.id < last_id if descending else model.id > last_id
+    if column is None:
+        return query.filter(after_id)
+
+    if len(values) != 2:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    value = values[0]
+    if value is not None and isinstance(column.type, DateTime):
+        try:
+            value = datetime.fromisoformat(value)
+        except (TypeError, ValueError):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+    if value is None:
+        if descending:
+            # NULLs come first, then every non NULL value
+            return query.filter(or_(and_(column.is_(None), after_id), column.isnot(None)))
+        # NULLs come last, only NULL rows remain
+        return query.filter(column.is_(None), after_id)
+
+    if descending:
+        return query.filter(or_(column < value, and_(column == value, after_id)))
+    return query.filter(or_(column > value, and_(column == value, after_id), column.is_(None)))
+
+
+def next_cursor(items: list, sort: Optional[str], limit: Optional[int]) -> Optional[str]:
+    """
+    Build the cursor of the page following items.
+
+    Args:
+        items (list): The rows of the current page.
+        sort (Optional[str]): The sort parameter the page was listed with.
+        limit (Optional[int]): The page size.
+
+    Returns:
+        Optional[str]: The cursor, or None if this was the last page.
+    """
+    if not items or not limit or len(items) < limit:
+        return None
+    last = items[-1]
+    if not sort:
+        return encode_cursor([last.id])
+    return encode_cursor([getattr(last, sort.lstrip("-")), last.id])
+
+
+def set_next_cursor(response: Response, items: list, sort: Optional[str], limit: Optional[int]) -> None:
+    """
+    Expose the cursor of the next page in the X-Next-Cursor header, if any.
+
+    Args:
+        response (Response): The response of the listing endpoint.
+        items (list): The rows of the current page.
+        sort (Optional[str]): The sort parameter the page was listed with.
+        limit (Optional[int]): The page size.
+    """
+    cursor = next_cursor(items, sort, limit)
+    if cursor:
+        response.headers["X-Next-Cursor"] = cursor
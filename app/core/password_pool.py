@@ -0,0 +1,93 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+import bcrypt
+from fastapi import HTTPException, status
+from app.core.config import configs
+from app.core.metrics import metrics
+
+
+class PasswordPool:
+    """
+    Dedicated bounded pool for bcrypt hashing and verification.
+
+    bcrypt is deliberately slow (hundreds of milliseconds of CPU) and
+    releases the GIL, so a thread pool sized to the CPU count runs the
+    hashes in parallel without occupying the request thread pool beyond
+    the wait. At most `workers + max_queue` hashes are accepted at once,
+    further calls fail fast with 503 instead of queueing behind a login
+    storm.
+
+    Attributes:
+        executor (ThreadPoolExecutor): The hashing threads.
+        slots (threading.BoundedSemaphore): Running plus queued hashes allowed.
+    """
+    def __init__(self, workers: int, max_queue: int):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self.slots = threading.BoundedSemaphore(workers + max_queue)
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        metrics.gauge("password_pool.in_flight", lambda: self.in_flight)
+
+    def run(self, function: Callable, *args) -> Any:
+        """
+        Run a function on the pool and wait for its result.
+
+        Args:
+            function (Callable): The hashing function.
+            *args: Its arguments.
+
+        Returns:
+            Any: The function result.
+
+        Raises:
+            HTTPException: 503 if the pool and its queue are full.
+        """
+        if not self.slots.acquire(blocking=False):
+            metrics.inc("password_pool.rejected")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Too many concurrent logins, please retry",
+                headers={"Retry-After": "1"},
+            )
+        with self.lock:
+            self.in_flight += 1
+        try:
+            return self.executor.submit(function, *args).result()
+        finally:
+            with self.lock:
+                self.in_flight -= 1
+            self.slots.release()
+
+    def hash(self, password: str) -> str:
+        """
+        Hash a password with a new salt.
+
+        Args:
+            password (str): The plaintext password.
+
+        Returns:
+            str: The bcrypt hash.
+        """
+        metrics.inc("password_pool.hashes")
+        return self.run(lambda: bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode())
+
+    def verify(self, password: str, hashed_password: str) -> bool:
+        """
+        Check a password against a bcrypt hash.
+
+        Args:
+            password (str): The plaintext password.
+            hashed_password (str): The stored hash.
+
+        Returns:
+            bool: True if they match.
+        """
+        metrics.inc("password_pool.verifications")
+        return self.run(bcrypt.checkpw, password.encode(), hashed_password.encode())
+
+
+workers = int(configs.PASSWORD_HASH_WORKERS) or os.cpu_count() or 1
+# a queued hash waits about (queue / workers) hash durations, keep that around a second
+password_pool = PasswordPool(workers, int(configs.PASSWORD_HASH_QUEUE) or 4 * workers)
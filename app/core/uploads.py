@@ -0,0 +1,124 @@
+import hashlib
+import os
+import struct
+import threading
+from typing import NamedTuple, Optional, Tuple
+from fastapi import HTTPException, UploadFile
+
+CHUNK_SIZE = 1024 * 1024
+# enough for the JPEG markers before the frame header, EXIF included
+HEADER_SIZE = 256 * 1024
+
+
+class SavedUpload(NamedTuple):
+    path: str
+    size: int
+    sha256: str
+    width: Optional[int]
+    height: Optional[int]
+
+
+def save_upload(file: UploadFile, path: str, max_bytes: int) -> SavedUpload:
+    """
+    Stream an uploaded file to disk in fixed size chunks.
+
+    The file is written to a temporary file next to path and renamed over it
+    once complete, so readers never see a partial file. The size limit is
+    enforced while copying, and the SHA-256 and the image dimensions (JPEG
+    and PNG headers) are computed in the same pass.
+
+    Args:
+        file (UploadFile): The uploaded file.
+        path (str): The destination path, its directories are created.
+        max_bytes (int): The maximum accepted size.
+
+    Returns:
+        SavedUpload: The path, size, SHA-256 and dimensions (None if not an image).
+
+    Raises:
+        HTTPException: 413 if the file is larger than max_bytes.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    sha = hashlib.sha256()
+    header = bytearray()
+    size = 0
+    try:
+        with open(tmp_path, "wb") as out:
+            while True:
+                chunk = file.file.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"File too large, the maximum size is {max_bytes // (1024 * 1024)} MB",
+                    )
+                sha.update(chunk)
+                if len(header) < HEADER_SIZE:
+                    header += chunk[:HEADER_SIZE - len(header)]
+                out.write(chunk)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    width, height = image_dimensions(bytes(header)) or (None, None)
+    return SavedUpload(path, size, sha.hexdigest(), width, height)
+
+
+def image_dimensions(header: bytes) -> Optional[Tuple[int, int]]:
+    """
+    Read the dimensions of a JPEG or PNG image from its first bytes.
+
+    Args:
+        header (bytes): The beginning of the file.
+
+    Returns:
+        Optional[Tuple[int, int]]: (width, height), or None if not found.
+    """
+    info = image_info(header)
+    return info[:2] if info else None
+
+
+def image_info(header: bytes) -> Optional[Tuple[int, int, int]]:
+    """
+    Read the dimensions and the number of channels of a JPEG or PNG image
+    from its first bytes.
+
+    Args:
+        header (bytes): The beginning of the file.
+
+    Returns:
+        Optional[Tuple[int, int, int]]: (width, height, channels), or None if not found.
+    """
+    if header.startswith(b"\x89PNG\r\n\x1a\n") and header[12:16] == b"IHDR":
+        width, height = struct.unpack(">II", header[16:24])
+        # gray, RGB, palette, gray + alpha, RGBA
+        channels = {0: 1, 2: 3, 3: 3, 4: 2, 6: 4}.get(header[25], 3) if len(header) > 25 else 3
+        return width, height, channels
+
+    if not header.startswith(b"\xff\xd8"):
+        return None
+    # walk the JPEG segments up to the start of frame
+    offset = 2
+    while offset + 10 <= len(header):
+        if header[offset] != 0xFF:
+            return None
+        marker = header[offset + 1]
+        if marker == 0xFF:
+            # fill byte
+            offset += 1
+            continue
+        if marker in (0x01, 0xD8) or 0xD0 <= marker <= 0xD7:
+            # markers without a length
+            offset += 2
+            continue
+        length = struct.unpack(">H", header[offset + 2:offset + 4])[0]
+        if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+            height, width = struct.unpack(">HH", header[offset + 5:offset + 9])
+            return width, height, header[offset + 9]
+        offset += 2 + length
+    return None
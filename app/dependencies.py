@@ -16,6 +16,8 @@ from app.services.study import StudyService
 from app.repository.activity import ActivityRepository
 from app.repository.result import ResultRepository
 from app.services.ai import AIService
+from app.repository.job import JobRepository
+from app.services.job import JobService
 
 
 def get_patient_repository(db: Session = Depends(get_db)) -> PatientRepository:
@@ -48,11 +50,17 @@ def get_activity_service(activity_repository: ActivityRepository = Depends(get_a
 def get_study_repository(db: Session = Depends(get_db)) -> StudyRepository:
     return StudyRepository(db)
 
-def get_study_service(study_repository: StudyRepository = Depends(get_study_repository), activity_repository: ActivityRepository= Depends(get_activity_repository)) -> StudyService:
-    return StudyService(study_repository,activity_repository)
+def get_job_repository(db: Session = Depends(get_db)) -> JobRepository:
+    return JobRepository(db)
+
+def get_study_service(study_repository: StudyRepository = Depends(get_study_repository), activity_repository: ActivityRepository= Depends(get_activity_repository), job_repository: JobRepository = Depends(get_job_repository)) -> StudyService:
+    return StudyService(study_repository,activity_repository,job_repository)
 
 def get_result_repository(db: Session = Depends(get_db)) -> ResultRepository:
     return ResultRepository(db)
 
 def get_ai_service(study_repository: StudyRepository = Depends(get_study_repository), result_repository: ResultRepository = Depends(get_result_repository), activity_repository: ActivityRepository= Depends(get_activity_repository)) -> AIService:
-    return AIService(study_repository,result_repository,activity_repository)
\ No newline at end of file
+    return AIService(study_repository,result_repository,activity_repository)
+
+def get_job_service(job_repository: JobRepository = Depends(get_job_repository)) -> JobService:
+    return JobService(job_repository)
\ No newline at end of file
@@ -6,18 +6,45 @@ from typing import Optional
 from sqlalchemy.orm import Session
 from fastapi import Depends
 from app.middleware.authentication import security
-from app.models import patient, employee, study, result, template, activity
-from app.routers.v1 import patient, employee, authentication, template, study, activity, result
+from app.models import patient, employee, study, result, template, activity, job
+from app.routers.v1 import patient, employee, authentication, template, study, activity, result, metrics
 from app.models.database import engine, Base, create_database_if_not_exists
 from app.core.config import configs
 from fastapi.middleware.cors import CORSMiddleware
+from contextlib import asynccontextmanager
+from anyio import to_thread
+from app.core.ai_client import ai_client
+from app.services.view_tracker import view_tracker
+from app.core.image_pool import image_pool
+from app.core.events import event_broker
 
 
 
-create_database_if_not_exists()
 # Base.metadata.create_all(bind=engine)
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # create and migrate the database here rather than on import, so processes
+    # importing this module (spawned image pool workers) never touch it
+    create_database_if_not_exists()
+
+    # route handlers are sync (database, bcrypt, OpenCV, file IO) and run on this bounded thread pool
+    # sized to the database pool by default, so no handler thread waits for a connection
+    to_thread.current_default_thread_limiter().total_tokens = int(configs.THREADPOOL_SIZE) or int(configs.DB_POOL_SIZE) + int(configs.DB_MAX_OVERFLOW)
+
+    # one pooled AI model client for the lifetime of the application
+    await ai_client.start()
+    # batched last_view_at updates and view activities
+    view_tracker.start()
+    # LISTEN for the result events of all processes and fan them out to the event streams
+    event_broker.start()
+    yield
+    event_broker.stop()
+    view_tracker.stop()
+    await ai_client.close()
+    image_pool.shutdown()
+
+app = FastAPI(lifespan=lifespan)
 
 
 app.add_middleware(
@@ -41,6 +68,7 @@ app.include_router(template.router, prefix= prefix)
 app.include_router(study.router, prefix= prefix)
 app.include_router(activity.router, prefix= prefix)
 app.include_router(result.router, prefix= prefix)
+app.include_router(metrics.router, prefix= prefix)
 
 @app.get("/")
 async def index():
@@ -53,5 +81,6 @@ if __name__ == "__main__":
 
 '''
 Now, you can run the application using the following command:
-python app/main.py
+python -m app
+(python -m app.main also works, but its image pool processes re-import this module)
 '''
\ No newline at end of file
@@ -1,4 +1,6 @@
 # utils/auth.py
+import hashlib
+import time
 from fastapi import HTTPException, Security, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import JWTError, jwt
@@ -6,32 +8,42 @@ from app.schemas.authentication import TokenData
 from app.dependencies import get_employee_repository 
 from app.repository.employee import EmployeeRepository
 from app.core.config import configs
+from app.core.cache import token_cache, employee_cache
 
 security = HTTPBearer()
 
 def decrypt_token(token: str) -> TokenData:
-    try:
-        payload = jwt.decode(token, configs.SECRET_KEY, algorithms=[configs.ALGORITHM])
-        print("payload", payload)
+    # decoded payloads are cached by token hash until the token expires
+    token_key = hashlib.sha256(token.encode()).digest()
+    payload = token_cache.get(token_key)
+    if payload is None:
+        try:
+            payload = jwt.decode(token, configs.SECRET_KEY, algorithms=[configs.ALGORITHM])
+        except JWTError:
+            raise HTTPException(status_code=401, detail=f"Unauthorized, token invalid")
         username = payload.get("username",None)
         if username is None:
             raise  HTTPException(status_code=401, detail=f"Unauthorized, user not found")
-        token_data = TokenData(**payload)
-    except JWTError:
-        print("error")
-        raise HTTPException(status_code=401, detail=f"Unauthorized, token invalid")
-    return token_data
+        expires_in = payload["exp"] - time.time() if "exp" in payload else None
+        token_cache.set(token_key, payload, expires_in)
+    return TokenData(**payload)
 
 def get_current_user(credentials: HTTPAuthorizationCredentials = Security(security), employee_repo: EmployeeRepository = Depends(get_employee_repository)):
     token = credentials.credentials
     user =  decrypt_token(token)
 
-    employee = employee_repo.show(user.id)
-    user.type = employee.type
-    if user.role != employee.role:
-        raise HTTPException(status_code=401, detail="Unauthorized, user role does not match")
-
+    # role and type of the employee, invalidated by EmployeeService on update/delete
+    employee = employee_cache.get(user.id)
     if employee is None:
-        raise HTTPException(status_code=401, detail="Employee not found")
+        employee = employee_repo.show(user.id)
+        if employee is None:
+            raise HTTPException(status_code=401, detail="Employee not found")
+        employee = (employee.role, employee.type)
+        employee_cache.set(user.id, employee)
+
+    role, employee_type = employee
+    if user.role != role:
+        raise HTTPException(status_code=401, detail="Unauthorized, user role does not match")
+    user.type = employee_type
     return user
 
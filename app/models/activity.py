@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Enum, ForeignKey, Boolean, DateTime
+from sqlalchemy import Column, Integer, String, Enum, ForeignKey, Boolean, DateTime, Index
 from sqlalchemy.orm import relationship
 from app.models.database import Base
 from app.models.enums import ActivityEnum
@@ -7,6 +7,10 @@ import datetime
 
 class Activity(Base):
     __tablename__ = "activities"
+    __table_args__ = (
+        Index("ix_activities_employee_id_type_created_at", "employee_id", "activity_type", "created_at", "id"),
+        Index("ix_activities_employee_id_created_at", "employee_id", "created_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     activity_type = Column(Enum(ActivityEnum), default=ActivityEnum.view)
@@ -37,3 +37,16 @@ class ActivityEnum(str, Enum):
     create = "create"
 
 
+class JobTypeEnum(str, Enum):
+    heatmap = "heatmap"
+    llm = "llm"
+    denoise = "denoise"
+    severities = "severities"
+    derivatives = "derivatives"
+    analyze = "analyze"
+
+class JobStatusEnum(str, Enum):
+    queued = "queued"
+    running = "running"
+    completed = "completed"
+    failed = "failed"
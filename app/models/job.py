@@ -0,0 +1,34 @@
+from sqlalchemy import Column, Integer, String, Enum, ForeignKey, DateTime, Index, text
+from sqlalchemy.orm import relationship
+from app.models.database import Base
+from app.models.enums import JobTypeEnum, JobStatusEnum
+import datetime
+
+
+class Job(Base):
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # one pending job of a type per result, a repeated POST /run_* reuses it
+        Index("uq_jobs_pending_result", "result_id", "type", unique=True, postgresql_where=text("status IN ('queued', 'running')")),
+        # one queued job of a type per study, a running one may have read a replaced X-ray
+        Index("uq_jobs_queued_study", "study_id", "type", unique=True, postgresql_where=text("status = 'queued' AND result_id IS NULL")),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    type = Column(Enum(JobTypeEnum), nullable=False)
+    status = Column(Enum(JobStatusEnum), default=JobStatusEnum.queued, index=True)
+    xray_path = Column(String)
+    attempts = Column(Integer, default=0)
+    error = Column(String)
+    created_at = Column(DateTime, default = datetime.datetime.utcnow)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+    # requeued jobs are not claimed before this time
+    run_after = Column(DateTime)
+
+    # jobs survive the deletion of their result so the history is kept
+    result_id = Column(Integer, ForeignKey("results.id", ondelete="SET NULL"), nullable=True)
+    result = relationship("Result", back_populates="jobs", lazy="noload")
+
+    # set for the jobs working on the study X-ray rather than a result
+    study_id = Column(Integer, ForeignKey("studies.id", ondelete="SET NULL"), nullable=True)
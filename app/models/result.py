@@ -1,12 +1,16 @@
-from sqlalchemy import Column, Integer, String, Enum, ForeignKey, Boolean, DateTime, ARRAY, Float
+from sqlalchemy import Column, Integer, String, Text, Enum, ForeignKey, Boolean, DateTime, ARRAY, Float, Index
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from app.models.database import Base
-from app.models.enums import  ResultTypeEnum
+from app.models.enums import  ResultTypeEnum, JobStatusEnum
 import datetime
 
 
 class Result(Base):
     __tablename__ = "results"
+    __table_args__ = (
+        Index("ix_results_study_id_type", "study_id", "type"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     result_name = Column(String)
@@ -19,13 +23,20 @@ class Result(Base):
     heatmap_path = Column(String)
     region_path = Column(String)
     region_sentence_path = Column(String)
+    # parsed content of the report, region and region sentence files, see AIService.get_regions and app/scripts/backfill_regions.py
+    regions = Column(JSONB) # [{"label": int, "x": float, "y": float, "width": float, "height": float}]
+    region_sentences = Column(JSONB) # [str], one sentence per region
+    report_text = Column(Text)
     last_view_at = Column(DateTime, default = datetime.datetime.utcnow)
     last_edited_at = Column(DateTime, default = datetime.datetime.utcnow)
     is_ready = Column(Boolean, default=False)
+    job_status = Column(Enum(JobStatusEnum), default=None)
     study_id = Column(Integer, ForeignKey("studies.id"), nullable=False)
 
     study = relationship("Study", back_populates="results")
 
+    jobs = relationship("Job", back_populates="result", lazy="noload", passive_deletes=True)
+
 
 
     
\ No newline at end of file
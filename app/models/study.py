@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Enum, ForeignKey, Boolean, DateTime, Float
+from sqlalchemy import Column, Integer, BigInteger, String, Enum, ForeignKey, Boolean, DateTime, Float, Index, JSON, text
 from sqlalchemy.orm import relationship
 from app.models.database import Base
 from app.models.enums import StatusEnum
@@ -7,6 +7,13 @@ import datetime
 
 class Study(Base):
     __tablename__ = "studies"
+    # matched to the worklist queries, see alembic/versions/0002_worklist_indexes.py
+    __table_args__ = (
+        Index("ix_studies_status_created_at", "status", "created_at", "id", postgresql_where=text("is_deleted = false")),
+        Index("ix_studies_status_severity", "status", "severity", "id", postgresql_where=text("is_deleted = false")),
+        Index("ix_studies_doctor_id_status", "doctor_id", "status", "created_at", "id"),
+        Index("ix_studies_patient_id_created_at", "patient_id", "created_at", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     study_name = Column(String, index=True)
@@ -18,6 +25,13 @@ class Study(Base):
     xray_path = Column(String)
     resized_xray_path = Column(String)
     xray_type = Column(String) # This should be an Enum
+    # recorded while the upload is streamed to disk
+    xray_sha256 = Column(String(64))
+    xray_size = Column(BigInteger)
+    xray_width = Column(Integer)
+    xray_height = Column(Integer)
+    # {"224": path, "512": path, "1024": path, "full": path, "tiles": directory}, written by the derivatives job
+    pyramid_paths = Column(JSON)
     is_archived = Column(Boolean, default=False)
     is_deleted = Column(Boolean, default=False)
     last_view_at = Column(DateTime, default = datetime.datetime.utcnow)
@@ -41,4 +55,13 @@ class Study(Base):
     # doctor_last_edited = relationship("Doctor", foreign_keys=[last_edited_by])
     # doctor_last_viewed = relationship("Doctor", foreign_keys=[last_viewed_by])
 
-    
\ No newline at end of file
+    
+
+class StudyCount(Base):
+    # number of studies per (status, doctor), doctor_id 0 for unassigned studies.
+    # maintained by the studies_count triggers, see alembic/versions/0003_study_counts.py
+    __tablename__ = "study_counts"
+
+    status = Column(Enum(StatusEnum), primary_key=True)
+    doctor_id = Column(Integer, primary_key=True, default=0)
+    count = Column(Integer, nullable=False, default=0)
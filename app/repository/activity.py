@@ -2,6 +2,7 @@ from sqlalchemy.orm import Session
 from fastapi import HTTPException,status
 from app.models.activity import Activity
 from app.models.enums import ActivityEnum
+from app.core.pagination import paginate
 from typing import List, Optional
 
 
@@ -9,13 +10,13 @@ class ActivityRepository:
     def __init__(self, db: Session):
         self.db = db
 
-    def get_all(self,doctor_id: int,activity_type: ActivityEnum, limit: int, skip: int , sort: str) -> List[Activity]:
+    def get_all(self,doctor_id: int,activity_type: ActivityEnum, limit: int, skip: int , sort: str, cursor: Optional[str] = None) -> List[Activity]:
         # get all studies non deleted or archived
         query = self.db.query(Activity).filter(Activity.employee_id == doctor_id)
         if activity_type:
             query = query.filter(Activity.activity_type == activity_type)
-        if sort:
-            query = query.order_by(sort)
+        # order by the sort key and id, and continue after the cursor if any
+        query = paginate(query, Activity, sort, cursor)
         activities = query.offset(skip).limit(limit).all()
         return activities
     
@@ -2,6 +2,7 @@ from sqlalchemy.orm import Session
 from fastapi import HTTPException,status
 from app.models.employee import Employee
 from app.models.enums import OccupationEnum
+from app.core.pagination import paginate
 from typing import List, Optional
 
 
@@ -9,16 +10,12 @@ class EmployeeRepository:
     def __init__(self, db: Session):
         self.db = db
 
-    def get_all(self,type: OccupationEnum, limit: int, skip: int, sort: str) -> List[Employee]:
+    def get_all(self,type: OccupationEnum, limit: int, skip: int, sort: str, cursor: Optional[str] = None) -> List[Employee]:
         query = self.db.query(Employee)
         if type:
             query = query.filter(Employee.type == type)
-        if sort:
-            sort_key = sort.lstrip("-")
-            if sort.startswith("-"):
-                query = query.order_by(getattr(Employee,sort_key).desc())
-            else:
-                query = query.order_by(getattr(Employee,sort_key))
+        # order by the sort key and id, and continue after the cursor if any
+        query = paginate(query, Employee, sort, cursor)
         if limit:
             query = query.limit(limit)
         if skip:
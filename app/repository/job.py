@@ -0,0 +1,131 @@
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.models.job import Job
+from app.models.result import Result
+from app.models.enums import JobTypeEnum, JobStatusEnum
+from app.core import events
+from typing import List, Optional, Tuple
+from datetime import datetime, timedelta
+
+
+class JobRepository:
+    def __init__(self, db: Session):
+        self.db = db
+
+    def create(self,job: Job) -> Job:
+        self.db.add(job)
+        self._set_result_status(job, JobStatusEnum.queued)
+        self.db.commit()
+        self.db.refresh(job)
+        return job
+
+    def create_once(self, job: Job) -> Job:
+        # reuse the pending job doing the same work, the partial unique indexes settle races
+        pending = self.find_pending(job.type, job.result_id, job.study_id)
+        if pending is not None:
+            return pending
+        try:
+            return self.create(job)
+        except IntegrityError:
+            self.db.rollback()
+            return self.find_pending(job.type, job.result_id, job.study_id) or self.create(job)
+
+    def find_pending(self, type: JobTypeEnum, result_id: Optional[int] = None, study_id: Optional[int] = None) -> Optional[Job]:
+        query = self.db.query(Job).filter(Job.type == type)
+        if result_id is not None:
+            # a queued or running job already fills in the result
+            query = query.filter(Job.result_id == result_id, Job.status.in_([JobStatusEnum.queued, JobStatusEnum.running]))
+        else:
+            # a running job may have read a replaced X-ray, only a queued one covers a new request
+            query = query.filter(Job.study_id == study_id, Job.result_id.is_(None), Job.status == JobStatusEnum.queued)
+        return query.first()
+
+    def show(self,id:int) -> Optional[Job]:
+        job = self.db.query(Job).filter(Job.id == id).first()
+        if not job:
+            return None
+        return job
+
+    def claim(self, limit: int, types: List[JobTypeEnum] = None) -> List[Job]:
+        # lock the oldest queued jobs, skipping rows other workers already hold
+        now = datetime.utcnow()
+        query = self.db.query(Job).filter(Job.status == JobStatusEnum.queued, or_(Job.run_after.is_(None), Job.run_after <= now))
+        if types:
+            query = query.filter(Job.type.in_(types))
+        jobs = query.order_by(Job.id.asc()).limit(limit).with_for_update(skip_locked=True).all()
+
+        for job in jobs:
+            job.status = JobStatusEnum.running
+            job.started_at = now
+            job.attempts = (job.attempts or 0) + 1
+            self._set_result_status(job, JobStatusEnum.running)
+
+        # committing releases the row locks, the status change keeps them claimed
+        self.db.commit()
+        return jobs
+
+    def complete(self,job: Job) -> Job:
+        job.status = JobStatusEnum.completed
+        job.finished_at = datetime.utcnow()
+        job.error = None
+        self._set_result_status(job, JobStatusEnum.completed)
+        self.db.commit()
+        return job
+
+    def fail(self,job: Job, error: str) -> Job:
+        job.status = JobStatusEnum.failed
+        job.finished_at = datetime.utcnow()
+        job.error = error
+        self._set_result_status(job, JobStatusEnum.failed, error)
+        self.db.commit()
+        return job
+
+    def retry(self, job: Job, error: str, delay: float, count_attempt: bool = True) -> Job:
+        # back to the queue, not claimed again before the delay is over
+        job.status = JobStatusEnum.queued
+        job.run_after = datetime.utcnow() + timedelta(seconds=delay)
+        job.error = error
+        if not count_attempt:
+            job.attempts = max(0, (job.attempts or 0) - 1)
+        self._set_result_status(job, JobStatusEnum.queued, error)
+        self.db.commit()
+        return job
+
+    def heartbeat(self, ids: List[int]) -> None:
+        # the worker running these jobs is alive, keep requeue_stale away from them
+        self.db.query(Job).filter(Job.id.in_(ids), Job.status == JobStatusEnum.running).update({"started_at": datetime.utcnow()}, synchronize_session=False)
+        self.db.commit()
+
+    def requeue_stale(self, timeout: int, max_attempts: int) -> Tuple[int, int]:
+        # put back jobs whose worker died while running them, claim counted the attempt
+        now = datetime.utcnow()
+        deadline = now - timedelta(seconds=timeout)
+        jobs = self.db.query(Job).filter(Job.status == JobStatusEnum.running, Job.started_at < deadline).with_for_update(skip_locked=True).all()
+        failed = 0
+        for job in jobs:
+            if (job.attempts or 0) >= max_attempts:
+                # the job keeps killing its worker (e.g. a huge X-ray), stop running it
+                job.status = JobStatusEnum.failed
+                job.finished_at = now
+                job.error = "Worker died while running the job"
+                self._set_result_status(job, JobStatusEnum.failed, job.error)
+                failed += 1
+            elif job.result_id is None and self.find_pending(job.type, study_id=job.study_id) is not None:
+                # a newer upload queued the same study job, it replaces this one
+                job.status = JobStatusEnum.failed
+                job.finished_at = now
+                job.error = "Superseded by a queued job"
+                failed += 1
+            else:
+                job.status = JobStatusEnum.queued
+                self._set_result_status(job, JobStatusEnum.queued)
+        self.db.commit()
+        return len(jobs) - failed, failed
+
+    def _set_result_status(self, job: Job, job_status: JobStatusEnum, detail: Optional[str] = None) -> None:
+        if job.result_id is None:
+            return
+        self.db.query(Result).filter(Result.id == job.result_id).update({"job_status": job_status}, synchronize_session=False)
+        # delivered to the event streams when the transaction commits
+        events.notify(self.db, job.result_id, job_status.value, job.type.value, detail)
@@ -4,6 +4,7 @@ from app.models.result import Result
 from app.models.patient import Patient
 from app.models.enums import ResultTypeEnum
 from app.models.database import get_db
+from app.core.pagination import paginate
 from typing import List, Optional
 from datetime import datetime
 
@@ -12,7 +13,7 @@ class ResultRepository:
     def __init__(self, db: Session):
         self.db = db
 
-    def get_all(self, type: ResultTypeEnum, limit: int, skip: int, sort: str ) -> List[Result]:
+    def get_all(self, type: ResultTypeEnum, limit: int, skip: int, sort: str, cursor: Optional[str] = None) -> List[Result]:
         # get all studies non deleted or archived
         query = self.db.query(Result)
 
@@ -20,12 +21,8 @@ class ResultRepository:
             # filter by status and is_deleted
             query = query.filter(Result.type == type)
     
-        if sort:
-            sort_key = sort.lstrip("-")
-            if sort.startswith("-"):
-                query = query.order_by(getattr(Result,sort_key).desc())
-            else:
-                query = query.order_by(getattr(Result,sort_key).asc())
+        # order by the sort key and id, and continue after the cursor if any
+        query = paginate(query, Result, sort, cursor)
 
         studies = query.limit(limit).offset(skip).all()
         return studies
@@ -53,15 +50,9 @@ class ResultRepository:
     
     
     def show(self,id:int) ->  Optional[Result]:
-        # populate the patient
         result = self.db.query(Result).filter(Result.id == id).first()
         if not result:
             return None
-        
-        # update the last_view_at
-        result.last_view_at = datetime.utcnow()
-        self.db.commit()
-        self.db.refresh(result)
         return result
     
     def get_results_by_study(self,study_id:int) -> List[Result]:
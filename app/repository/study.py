@@ -1,8 +1,10 @@
+from sqlalchemy import func
 from sqlalchemy.orm import Session, joinedload, selectinload
 from fastapi import HTTPException,status
-from app.models.study import Study
-from app.models.patient import Patient
-from app.models.enums import StatusEnum
+from app.models.study import Study, StudyCount
+from app.models.job import Job
+from app.models.enums import StatusEnum, JobTypeEnum, JobStatusEnum
+from app.core.pagination import paginate
 from typing import List, Optional
 
 
@@ -10,7 +12,7 @@ class StudyRepository:
     def __init__(self, db: Session):
         self.db = db
 
-    def get_all(self, status: StatusEnum, limit: int, skip: int, sort: str ) -> List[Study]:
+    def get_all(self, status: StatusEnum, limit: int, skip: int, sort: str, cursor: Optional[str] = None) -> List[Study]:
         # get all studies non deleted or archived
         query = self.db.query(Study)
 
@@ -21,12 +23,8 @@ class StudyRepository:
             # filter by is_deleted
             query = query.filter(Study.is_deleted == False)
     
-        if sort:
-            sort_key = sort.lstrip("-")
-            if sort.startswith("-"):
-                query = query.order_by(getattr(Study,sort_key).desc())
-            else:
-                query = query.order_by(getattr(Study,sort_key).asc())
+        # order by the sort key and id, and continue after the cursor if any
+        query = paginate(query, Study, sort, cursor)
 
         studies = query.limit(limit).offset(skip).all()
         return studies
@@ -53,26 +51,21 @@ class StudyRepository:
     
     
     def show(self,id:int) ->  Optional[Study]:
-        # populate the patient
-        study = self.db.query(Study).filter(Study.id == id).first()
+        # populate the patient in the same round trip
+        study = self.db.query(Study).options(joinedload(Study.patient)).filter(Study.id == id).first()
         if not study:
             return None
-        
-        # request the patient to be loaded
-        patient = self.db.query(Patient).filter(Patient.id == study.patient_id).first()
-
-        # assign the patient to the study
-        study.patient = patient
         return study
     
-    def get_patient_studies(self,patient_id:int,status: StatusEnum, limit: int, skip: int, sort: str) -> List[Study]:
+    def has_pending_job(self, id: int, type: JobTypeEnum) -> bool:
+        # a queued or running job of the study, about to write its files
+        query = self.db.query(Job.id).filter(Job.study_id == id, Job.type == type, Job.status.in_([JobStatusEnum.queued, JobStatusEnum.running]))
+        return query.first() is not None
+
+    def get_patient_studies(self,patient_id:int,status: StatusEnum, limit: int, skip: int, sort: str, cursor: Optional[str] = None) -> List[Study]:
         query = self.db.query(Study).filter(Study.patient_id == patient_id, Study.is_deleted == False, Study.status != StatusEnum.archived)
-        if sort:
-            sort_key = sort.lstrip("-")
-            if sort.startswith("-"):
-                query = query.order_by(getattr(Study,sort_key).desc())
-            else:
-                query = query.order_by(getattr(Study,sort_key).asc())
+        # order by the sort key and id, and continue after the cursor if any
+        query = paginate(query, Study, sort, cursor)
         
         if status:
             query = query.filter(Study.status == status)
@@ -142,34 +135,38 @@ class StudyRepository:
         self.db.commit()
         return True, "Doctor unassigned successfully"
     
-    def get_assigned_studies(self,employee_id: int, status: StatusEnum, limit: int, skip: int, sort: str) -> List[Study]:
+    def get_assigned_studies(self,employee_id: int, status: StatusEnum, limit: int, skip: int, sort: str, cursor: Optional[str] = None) -> List[Study]:
 
         query = self.db.query(Study).filter(Study.doctor_id == employee_id, Study.is_deleted == False)
         if status:
             query = query.filter(Study.status == status)
 
-        if sort:
-            sort_key = sort.lstrip("-")
-            if sort.startswith("-"):
-                query = query.order_by(getattr(Study,sort_key).desc())
-            else:
-                query = query.order_by(getattr(Study,sort_key).asc())
+        # order by the sort key and id, and continue after the cursor if any
+        query = paginate(query, Study, sort, cursor)
 
         studies = query.limit(limit).offset(skip).all()
         # studies = self.db.query(Study).filter(Study.doctor_id == employee_id, Study.status.in_([StatusEnum.completed,StatusEnum.in_progress])).all()
         return studies
 
+    # the counts are read from the study_counts counter table kept by triggers on studies
+    def _count(self, *filters) -> int:
+        return self.db.query(func.coalesce(func.sum(StudyCount.count), 0)).filter(*filters).scalar()
+
     def get_new_studies_count(self):
-        return self.db.query(Study).filter(Study.status == StatusEnum.new).count()
+        return self._count(StudyCount.status == StatusEnum.new)
     
     def get_incomplete_studies_count(self):
         # get new and in progress studies
-        return self.db.query(Study).filter(Study.status == StatusEnum.in_progress).count()
+        return self._count(StudyCount.status == StatusEnum.in_progress)
         
 
     def get_pending_studies_count(self,doctor_id:int):
-        return self.db.query(Study).filter(Study.doctor_id == doctor_id, Study.status == StatusEnum.in_progress).count()
+        return self._count(StudyCount.doctor_id == doctor_id, StudyCount.status == StatusEnum.in_progress)
         
     
     def get_completed_studies_count(self,doctor_id:int):
-        return self.db.query(Study).filter(Study.doctor_id == doctor_id, Study.status == StatusEnum.completed).count()
+        return self._count(StudyCount.doctor_id == doctor_id, StudyCount.status == StatusEnum.completed)
+
+    def get_counts(self) -> List[StudyCount]:
+        # one row per (status, doctor), doctor_id 0 for unassigned studies
+        return self.db.query(StudyCount).filter(StudyCount.count > 0).all()
@@ -1,12 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, Security
+from fastapi import APIRouter, Depends, HTTPException, Security, Response
 from app.models import database
 from app.models.enums import ActivityEnum
 from app.schemas import activity as activity_schema, authentication as auth_schema
 from app.services.activity import ActivityService 
-from typing import List
+from typing import List, Optional
 from sqlalchemy.orm import Session
 from app.dependencies import get_activity_service
 from app.middleware.authentication import get_current_user, security
+from app.core.pagination import set_next_cursor
 
 # Create a new APIRouter instance
 router = APIRouter(
@@ -17,7 +18,7 @@ router = APIRouter(
 # Define a route for the patient list
 @router.get("/", dependencies=[Security(security)],
             response_model=List[activity_schema.Activity])
-async def read_activities(activity_type: ActivityEnum = None, limit: int = 10, skip: int = 0, sort: str = None,user: auth_schema.TokenData  = Depends(get_current_user), activity_Service: ActivityService = Depends(get_activity_service) ) -> List[activity_schema.Activity]:
+def read_activities(response: Response, activity_type: ActivityEnum = None, limit: int = 10, skip: int = 0, sort: str = None, cursor: Optional[str] = None, user: auth_schema.TokenData  = Depends(get_current_user), activity_Service: ActivityService = Depends(get_activity_service) ) -> List[activity_schema.Activity]:
     """
     Retrieve a list of activities, restricted to doctors only.
 
@@ -26,11 +27,12 @@ async def read_activities(activity_type: ActivityEnum = None, limit: int = 10, s
         limit (int): Maximum number of activities to return (default is 10).
         skip (int): Number of activities to skip (default is 0).
         sort (str): Sorting criteria for activities.
+        cursor (Optional[str]): The cursor from the X-Next-Cursor header of the previous page, to continue after it.
         user (auth_schema.TokenData): Current authenticated user.
         activity_service (ActivityService): Dependency for activity operations.
 
     Returns:
-        List[activity_schema.Activity]: A list of activities.
+        List[activity_schema.Activity]: A list of activities, with the cursor of the next page in the X-Next-Cursor header.
 
     Raises:
         HTTPException: If the user is not authorized (not a doctor).
@@ -39,12 +41,13 @@ async def read_activities(activity_type: ActivityEnum = None, limit: int = 10, s
     if user.type != "doctor":
         # raise error
         raise HTTPException(status_code=401, detail="Unauthorized, only doctors can view activities")
-    activities = activity_Service.get_all(user.id,activity_type, limit, skip, sort)
+    activities = activity_Service.get_all(user.id,activity_type, limit, skip, sort, cursor)
+    set_next_cursor(response, activities, sort, limit)
     return activities
 
 # Define a route for creating a new patient
 @router.post("/", dependencies=[Security(security)])
-async def create_activity(request: activity_schema.ActivityCreate, user: auth_schema.TokenData  = Depends(get_current_user), activity_Service: ActivityService = Depends(get_activity_service)) -> activity_schema.Activity:
+def create_activity(request: activity_schema.ActivityCreate, user: auth_schema.TokenData  = Depends(get_current_user), activity_Service: ActivityService = Depends(get_activity_service)) -> activity_schema.Activity:
     """
     Create a new activity.
 
@@ -62,7 +65,7 @@ async def create_activity(request: activity_schema.ActivityCreate, user: auth_sc
 
 # Define a route for retrieving a patient by ID
 @router.get("/{id}", dependencies=[Security(security)])
-async def read_activity(id: int,user: auth_schema.TokenData  = Depends(get_current_user), activity_Service: ActivityService = Depends(get_activity_service)) -> activity_schema.Activity:
+def read_activity(id: int,user: auth_schema.TokenData  = Depends(get_current_user), activity_Service: ActivityService = Depends(get_activity_service)) -> activity_schema.Activity:
     """
     Retrieve an activity by its ID.
 
@@ -84,7 +87,7 @@ async def read_activity(id: int,user: auth_schema.TokenData  = Depends(get_curre
 
 # Define a route for updating a patient by ID
 @router.put("/{id}", dependencies=[Security(security)] )
-async def update_activity(id: int, request: activity_schema.ActivityCreate,user: auth_schema.TokenData  = Depends(get_current_user), activity_Service: ActivityService = Depends(get_activity_service)) -> activity_schema.Activity:
+def update_activity(id: int, request: activity_schema.ActivityCreate,user: auth_schema.TokenData  = Depends(get_current_user), activity_Service: ActivityService = Depends(get_activity_service)) -> activity_schema.Activity:
     """
     Update an existing activity by its ID.
 
@@ -102,7 +105,7 @@ async def update_activity(id: int, request: activity_schema.ActivityCreate,user:
 
 # Define a route for deleting a patient by ID
 @router.delete("/{id}", dependencies=[Security(security)])
-async def delete_activity(id: int,user: auth_schema.TokenData  = Depends(get_current_user), activity_Service: ActivityService = Depends(get_activity_service)) -> bool:
+def delete_activity(id: int,user: auth_schema.TokenData  = Depends(get_current_user), activity_Service: ActivityService = Depends(get_activity_service)) -> bool:
     """
     Delete an activity by its ID.
 
@@ -14,7 +14,7 @@ router = APIRouter(
 
 # Define a route for the patient list
 @router.post("/signup")
-async def signup(request: authentication_schema.SignUp,authentication_service: AuthenticationService = Depends(get_authentication_service) ,employee_Service: EmployeeService = Depends(get_employee_service)) -> authentication_schema.Token:
+def signup(request: authentication_schema.SignUp,authentication_service: AuthenticationService = Depends(get_authentication_service) ,employee_Service: EmployeeService = Depends(get_employee_service)) -> authentication_schema.Token:
     """
     Register a new user and return an access token.
 
@@ -61,7 +61,7 @@ async def signup(request: authentication_schema.SignUp,authentication_service: A
 
 # Define a route for creating a new patient
 @router.post("/login")
-async def login(request: authentication_schema.Login,authentication_service: AuthenticationService = Depends(get_authentication_service), employee_Service: EmployeeService = Depends(get_employee_service)) -> authentication_schema.Token:
+def login(request: authentication_schema.Login,authentication_service: AuthenticationService = Depends(get_authentication_service), employee_Service: EmployeeService = Depends(get_employee_service)) -> authentication_schema.Token:
     """
     Authenticate a user and return an access token.
 
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, Security
+from fastapi import APIRouter, Depends, HTTPException, Security, Response
 from app.models import database
 from app.schemas import employee as employee_schema, authentication as auth_schema, error as error_schema
 from app.schemas import study as study_schema
@@ -6,7 +6,8 @@ from app.models.enums import OccupationEnum, StatusEnum
 from app.services.employee import EmployeeService
 from app.services.study import StudyService
 from app.services.authentication import AuthenticationService
-from typing import List, Union
+from typing import List, Optional, Union
+from app.core.pagination import set_next_cursor
 from sqlalchemy.orm import Session
 from app.middleware.authentication import get_current_user, security
 from app.dependencies import get_employee_service,get_study_service, get_authentication_service
@@ -22,7 +23,7 @@ router = APIRouter(
 @router.get("/me", dependencies=[Security(security)], response_model= employee_schema.EmployeeShow,
             responses={401: {"model": error_schema.Error},
                        200: {"description": "User retrieved successfully"}})
-async def read_me(user: auth_schema.TokenData  = Depends(get_current_user), employee_Service: EmployeeService = Depends(get_employee_service) ) -> employee_schema.EmployeeShow:
+def read_me(user: auth_schema.TokenData  = Depends(get_current_user), employee_Service: EmployeeService = Depends(get_employee_service) ) -> employee_schema.EmployeeShow:
     """
     Retrieve the currently authenticated user's employee details.
 
@@ -45,7 +46,7 @@ async def read_me(user: auth_schema.TokenData  = Depends(get_current_user), empl
             responses={400: {"model": error_schema.Error},
                        200: {"description": "Employees retrieved successfully"},
                        401: {"model": error_schema.Error}})
-async def read_employees(type: OccupationEnum = None ,limit: int = 10, skip: int = 0, sort: str = None,user: auth_schema.TokenData  = Depends(get_current_user), employee_Service: EmployeeService = Depends(get_employee_service) ) -> List[employee_schema.EmployeeShow]:
+def read_employees(response: Response, type: OccupationEnum = None ,limit: int = 10, skip: int = 0, sort: str = None, cursor: Optional[str] = None, user: auth_schema.TokenData  = Depends(get_current_user), employee_Service: EmployeeService = Depends(get_employee_service) ) -> List[employee_schema.EmployeeShow]:
     """
     Retrieve a list of employees with optional filters.
 
@@ -54,16 +55,18 @@ async def read_employees(type: OccupationEnum = None ,limit: int = 10, skip: int
     - limit (int): The number of employees to retrieve.
     - skip (int): The number of employees to skip.
     - sort (str): The field to sort by.
+    - cursor (Optional[str]): The cursor from the X-Next-Cursor header of the previous page, to continue after it.
     - user (auth_schema.TokenData): The current authenticated user.
     - employee_Service (EmployeeService): The employee service dependency.
 
     Returns:
-    - List[employee_schema.EmployeeShow]: A list of employees.
+    - List[employee_schema.EmployeeShow]: A list of employees, with the cursor of the next page in the X-Next-Cursor header.
 
     Raises:
     - HTTPException: If authentication fails or if the request is invalid.
     """
-    employees = employee_Service.get_all(type, limit, skip, sort)
+    employees = employee_Service.get_all(type, limit, skip, sort, cursor)
+    set_next_cursor(response, employees, sort, limit)
     return employees
 
 # Define a route for creating a new employee
@@ -72,7 +75,7 @@ async def read_employees(type: OccupationEnum = None ,limit: int = 10, skip: int
              responses={400: {"model": error_schema.Error},
                         201: {"description": "Employee created successfully"},
                         401: {"model": error_schema.Error}})
-async def create_employees(request: employee_schema.EmployeeCreate,user: auth_schema.TokenData  = Depends(get_current_user), authentication_service: AuthenticationService = Depends(get_authentication_service) ,employee_Service: EmployeeService = Depends(get_employee_service)) -> employee_schema.Employee:
+def create_employees(request: employee_schema.EmployeeCreate,user: auth_schema.TokenData  = Depends(get_current_user), authentication_service: AuthenticationService = Depends(get_authentication_service) ,employee_Service: EmployeeService = Depends(get_employee_service)) -> employee_schema.Employee:
     """
     Create a new employee.
 
@@ -117,7 +120,7 @@ async def create_employees(request: employee_schema.EmployeeCreate,user: auth_sc
             , responses={404: {"model": error_schema.Error},
                          200: {"description": "Employee retrieved successfully"},
                          401: {"model": error_schema.Error}})
-async def read_employee(employee_id: int,user: auth_schema.TokenData  = Depends(get_current_user), employee_Service: EmployeeService = Depends(get_employee_service)) -> employee_schema.EmployeeShow:
+def read_employee(employee_id: int,user: auth_schema.TokenData  = Depends(get_current_user), employee_Service: EmployeeService = Depends(get_employee_service)) -> employee_schema.EmployeeShow:
     """
     Retrieve a single employee by their ID.
 
@@ -143,7 +146,7 @@ async def read_employee(employee_id: int,user: auth_schema.TokenData  = Depends(
             , responses={404: {"model": error_schema.Error},
                          200: {"description": "Employee updated successfully"},
                          401: {"model": error_schema.Error}})
-async def update_employee(employee_id: int, request: employee_schema.EmployeeUpdate,user: auth_schema.TokenData  = Depends(get_current_user), employee_Service: EmployeeService = Depends(get_employee_service)) -> employee_schema.EmployeeShow:
+def update_employee(employee_id: int, request: employee_schema.EmployeeUpdate,user: auth_schema.TokenData  = Depends(get_current_user), employee_Service: EmployeeService = Depends(get_employee_service)) -> employee_schema.EmployeeShow:
     """
     Update an existing employee by their ID.
 
@@ -168,7 +171,7 @@ async def update_employee(employee_id: int, request: employee_schema.EmployeeUpd
                , responses={404: {"model": error_schema.Error},
                             204: {"description": "Employee deleted successfully"},
                             401: {"model": error_schema.Error}})
-async def delete_employee(employee_id: int,user: auth_schema.TokenData  = Depends(get_current_user), employee_Service: EmployeeService = Depends(get_employee_service)) -> bool:
+def delete_employee(employee_id: int,user: auth_schema.TokenData  = Depends(get_current_user), employee_Service: EmployeeService = Depends(get_employee_service)) -> bool:
     """
     Delete an employee by their ID.
 
@@ -196,7 +199,7 @@ async def delete_employee(employee_id: int,user: auth_schema.TokenData  = Depend
             , responses={404: {"model": error_schema.Error},
                          200: {"description": "Studies retrieved successfully"},
                          401: {"model": error_schema.Error}})
-async def read_employee_studies(employee_id: int,status: StatusEnum = None, limit: int = 10, skip: int = 0, sort: str = None, user: auth_schema.TokenData  = Depends(get_current_user), employee_Service: EmployeeService = Depends(get_employee_service), study_service: StudyService = Depends(get_study_service)) -> List[study_schema.StudyShow]:
+def read_employee_studies(employee_id: int, response: Response, status: StatusEnum = None, limit: int = 10, skip: int = 0, sort: str = None, cursor: Optional[str] = None, user: auth_schema.TokenData  = Depends(get_current_user), employee_Service: EmployeeService = Depends(get_employee_service), study_service: StudyService = Depends(get_study_service)) -> List[study_schema.StudyShow]:
     """
     Retrieve the studies assigned to a specific doctor by their employee ID.
 
@@ -206,6 +209,7 @@ async def read_employee_studies(employee_id: int,status: StatusEnum = None, limi
     - limit (int): The number of studies to retrieve.
     - skip (int): The number of studies to skip.
     - sort (str): The field to sort by.
+    - cursor (Optional[str]): The cursor from the X-Next-Cursor header of the previous page, to continue after it.
     - user (auth_schema.TokenData): The current authenticated user.
     - employee_Service (EmployeeService): The employee service dependency.
     - study_Service (StudyService): The study service dependency.
@@ -221,4 +225,6 @@ async def read_employee_studies(employee_id: int,status: StatusEnum = None, limi
         raise HTTPException(status_code=404, detail=f"Doctor with id {employee_id} not found")
     if employee.type != "doctor":
         raise HTTPException(status_code=400, detail="Employee is not a doctor")
-    return study_service.get_assigned_studies(employee.id, status, limit, skip, sort)
\ No newline at end of file
+    studies = study_service.get_assigned_studies(employee.id, status, limit, skip, sort, cursor)
+    set_next_cursor(response, studies, sort, limit)
+    return studies
\ No newline at end of file
@@ -0,0 +1,28 @@
+from fastapi import APIRouter, Depends, HTTPException, Security
+from app.schemas import authentication as auth_schema
+from app.middleware.authentication import get_current_user, security
+from app.core.metrics import metrics
+
+# Create a new APIRouter instance
+router = APIRouter(
+    tags=["Metrics"],
+    prefix="/metrics",
+)
+
+@router.get("/", dependencies=[Security(security)])
+def read_metrics(user: auth_schema.TokenData = Depends(get_current_user)) -> dict:
+    """
+    Retrieve the counters and gauges of the API process and the recent snapshots of the workers.
+
+    Args:
+        user (auth_schema.TokenData): Current authenticated user.
+
+    Returns:
+        dict: Metric snapshots keyed by process name.
+
+    Raises:
+        HTTPException: If the user is not an admin.
+    """
+    if user.role != "admin":
+        raise HTTPException(status_code=401, detail="You are not authorized to view metrics")
+    return metrics.collect()
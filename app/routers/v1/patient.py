@@ -1,10 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException, Security
+from fastapi import APIRouter, Depends, HTTPException, Security, Response
 from app.models import database
 from app.models.enums import StatusEnum
 from app.schemas import patient as patient_schema, authentication as auth_schema, study as study_schema
 from app.services.patient import PatientService
 from app.services.study import StudyService
-from typing import List
+from typing import List, Optional
+from app.core.pagination import set_next_cursor
 from sqlalchemy.orm import Session
 from app.dependencies import get_patient_service, get_study_service
 from app.middleware.authentication import get_current_user, security
@@ -17,7 +18,7 @@ router = APIRouter(
 
 # Define a route for the patient list
 @router.get("/", dependencies=[Security(security)])
-async def read_patients(limit: int = 10, skip: int = 0, sort: str = None,user: auth_schema.TokenData  = Depends(get_current_user), patient_service: PatientService = Depends(get_patient_service) ) -> List[patient_schema.Patient]:
+def read_patients(limit: int = 10, skip: int = 0, sort: str = None,user: auth_schema.TokenData  = Depends(get_current_user), patient_service: PatientService = Depends(get_patient_service) ) -> List[patient_schema.Patient]:
     """
     Retrieve a list of patients with optional pagination and sorting.
 
@@ -36,7 +37,7 @@ async def read_patients(limit: int = 10, skip: int = 0, sort: str = None,user: a
 
 # Define a route for creating a new patient
 @router.post("/", dependencies=[Security(security)])
-async def create_patient(request: patient_schema.PatientCreate, user: auth_schema.TokenData  = Depends(get_current_user), patient_service: PatientService = Depends(get_patient_service)) -> patient_schema.Patient:
+def create_patient(request: patient_schema.PatientCreate, user: auth_schema.TokenData  = Depends(get_current_user), patient_service: PatientService = Depends(get_patient_service)) -> patient_schema.Patient:
     """
     Create a new patient.
 
@@ -60,7 +61,7 @@ async def create_patient(request: patient_schema.PatientCreate, user: auth_schem
 
 # Define a route for retrieving a patient by ID
 @router.get("/{id}", dependencies=[Security(security)])
-async def read_patient(id: int,user: auth_schema.TokenData  = Depends(get_current_user), patient_service: PatientService = Depends(get_patient_service)) -> patient_schema.Patient:
+def read_patient(id: int,user: auth_schema.TokenData  = Depends(get_current_user), patient_service: PatientService = Depends(get_patient_service)) -> patient_schema.Patient:
     """
     Retrieve a patient by ID.
 
@@ -82,7 +83,7 @@ async def read_patient(id: int,user: auth_schema.TokenData  = Depends(get_curren
 
 # Define a route for updating a patient by ID
 @router.put("/{id}", dependencies=[Security(security)] )
-async def update_patient(id: int, request: patient_schema.PatientCreate,user: auth_schema.TokenData  = Depends(get_current_user), patient_service: PatientService = Depends(get_patient_service)) -> patient_schema.Patient:
+def update_patient(id: int, request: patient_schema.PatientCreate,user: auth_schema.TokenData  = Depends(get_current_user), patient_service: PatientService = Depends(get_patient_service)) -> patient_schema.Patient:
     """
     Update a patient by ID.
 
@@ -106,7 +107,7 @@ async def update_patient(id: int, request: patient_schema.PatientCreate,user: au
 
 # Define a route for deleting a patient by ID
 @router.delete("/{id}", dependencies=[Security(security)])
-async def delete_patient(id: int,user: auth_schema.TokenData  = Depends(get_current_user), patient_service: PatientService = Depends(get_patient_service)) -> bool:
+def delete_patient(id: int,user: auth_schema.TokenData  = Depends(get_current_user), patient_service: PatientService = Depends(get_patient_service)) -> bool:
     """
     Delete a patient by ID.
 
@@ -131,7 +132,7 @@ async def delete_patient(id: int,user: auth_schema.TokenData  = Depends(get_curr
 
 # get studies of a patient, with limit, skip and sort 
 @router.get("/{patient_id}/studies", dependencies=[Security(security)])
-async def read_patient_studies(patient_id: int,status: StatusEnum = None, limit: int = 10, skip: int = 0, sort: str = None, user: auth_schema.TokenData  = Depends(get_current_user),patient_service: PatientService = Depends(get_patient_service), study_Service: StudyService = Depends(get_study_service)) -> List[study_schema.Study]:
+def read_patient_studies(patient_id: int, response: Response, status: StatusEnum = None, limit: int = 10, skip: int = 0, sort: str = None, cursor: Optional[str] = None, user: auth_schema.TokenData  = Depends(get_current_user),patient_service: PatientService = Depends(get_patient_service), study_Service: StudyService = Depends(get_study_service)) -> List[study_schema.Study]:
     """
     Retrieve studies assigned to a patient.
 
@@ -141,6 +142,7 @@ async def read_patient_studies(patient_id: int,status: StatusEnum = None, limit:
         limit (int): Limit the number of studies returned (default is 10).
         skip (int): Number of studies to skip (default is 0).
         sort (str): Sort the studies by a specific field.
+        cursor (Optional[str]): The cursor from the X-Next-Cursor header of the previous page, to continue after it.
         user (auth_schema.TokenData): Current authenticated user.
         patient_service (PatientService): Dependency for patient operations.
         study_Service (StudyService): Dependency for study operations.
@@ -156,5 +158,6 @@ async def read_patient_studies(patient_id: int,status: StatusEnum = None, limit:
     if not patient:
         raise HTTPException(status_code=404, detail=f"Patient with id {id} not found")
     
-    studies = study_Service.get_patient_studies(patient_id,status, limit, skip, sort)
+    studies = study_Service.get_patient_studies(patient_id,status, limit, skip, sort, cursor)
+    set_next_cursor(response, studies, sort, limit)
     return studies
@@ -1,15 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException, Security, File, UploadFile, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Security, File, UploadFile, Request, Response
 from app.models import database
 from app.models.enums import StatusEnum, ResultTypeEnum
 from app.schemas import study as study_schema, authentication as auth_schema, result as result_schema
 from app.schemas import patient_study as patient_study_schema
 from app.services.study import StudyService
 from app.services.ai import AIService
-from typing import List
+from typing import List, Optional
 from sqlalchemy.orm import Session
 from app.dependencies import get_study_service, get_ai_service
 from app.middleware.authentication import get_current_user, security
 from fastapi.responses import FileResponse, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+from app.core.file_response import file_response
+from app.core.pagination import set_next_cursor
+from app.core.events import event_broker
+from app.core.config import configs
+import asyncio
+import json
+import os
 import io
 # Create a new APIRouter instance
 router = APIRouter(
@@ -19,7 +27,7 @@ router = APIRouter(
 
 # Results endpoints
 @router.get("/", dependencies=[Security(security)])
-async def get_results( user: auth_schema.TokenData = Depends(get_current_user), ai_service: AIService = Depends(get_ai_service),type: ResultTypeEnum = None, limit: int = 10, skip: int = 0, sort: str = None) -> List[result_schema.ResultShow]:
+def get_results(response: Response, user: auth_schema.TokenData = Depends(get_current_user), ai_service: AIService = Depends(get_ai_service),type: ResultTypeEnum = None, limit: int = 10, skip: int = 0, sort: str = None, cursor: Optional[str] = None) -> List[result_schema.ResultShow]:
     """
     Retrieve a list of results with optional filtering and pagination.
 
@@ -30,14 +38,17 @@ async def get_results( user: auth_schema.TokenData = Depends(get_current_user),
         limit (int): Maximum number of results to return (default is 10).
         skip (int): Number of results to skip (default is 0).
         sort (str): Sorting criteria for results.
+        cursor (Optional[str]): The cursor from the X-Next-Cursor header of the previous page, to continue after it.
 
     Returns:
-        List[result_schema.ResultShow]: A list of results.
+        List[result_schema.ResultShow]: A list of results, with the cursor of the next page in the X-Next-Cursor header.
     """
-    return ai_service.get_all(type, limit, skip, sort)
+    results = ai_service.get_all(type, limit, skip, sort, cursor)
+    set_next_cursor(response, results, sort, limit)
+    return results
 
 @router.post("/", dependencies=[Security(security)])
-async def create_result(request: result_schema.ResultCreate, user: auth_schema.TokenData = Depends(get_current_user), ai_service: AIService = Depends(get_ai_service)) -> result_schema.ResultShow:
+def create_result(request: result_schema.ResultCreate, user: auth_schema.TokenData = Depends(get_current_user), ai_service: AIService = Depends(get_ai_service)) -> result_schema.ResultShow:
     """
     Create a new result.
 
@@ -53,22 +64,28 @@ async def create_result(request: result_schema.ResultCreate, user: auth_schema.T
 
 # get file with file_path
 @router.get("/download_file", dependencies=[Security(security)])
-async def download_file(file_path: str, user: auth_schema.TokenData = Depends(get_current_user)) -> FileResponse:
+def download_file(file_path: str, request: Request, user: auth_schema.TokenData = Depends(get_current_user)) -> FileResponse:
     """
     Download a file from a specified file path.
 
     Args:
-        file_path (str): The path of the file to download.
+        file_path (str): The path of the file to download, under the static directory.
+        request (Request): The incoming request, for its conditional and range headers.
         user (auth_schema.TokenData): Current authenticated user.
 
     Returns:
         FileResponse: The requested file for download.
+
+    Raises:
+        HTTPException: If the file is not found or outside the static directory.
     """
-    print("file_path", file_path)
-    return FileResponse(file_path)
+    static_dir = os.path.realpath("static")
+    if not os.path.realpath(file_path).startswith(static_dir + os.sep):
+        raise HTTPException(status_code=404, detail="File not found")
+    return file_response(request, file_path)
 
 @router.get("/{result_id}", dependencies=[Security(security)])
-async def get_result(result_id: int, user: auth_schema.TokenData = Depends(get_current_user), ai_service: AIService = Depends(get_ai_service)) -> result_schema.ResultShow:
+def get_result(result_id: int, user: auth_schema.TokenData = Depends(get_current_user), ai_service: AIService = Depends(get_ai_service)) -> result_schema.ResultShow:
     """
     Retrieve a result by its ID.
 
@@ -88,8 +105,81 @@ async def get_result(result_id: int, user: auth_schema.TokenData = Depends(get_c
         raise HTTPException(status_code=404, detail="Result not found")
     return result
 
+@router.get("/{result_id}/regions", dependencies=[Security(security)])
+def get_regions(result_id: int, user: auth_schema.TokenData = Depends(get_current_user), ai_service: AIService = Depends(get_ai_service)) -> result_schema.ResultRegions:
+    """
+    Retrieve the regions (labels and boxes), region sentences and report text
+    of a result in one response, instead of downloading and parsing the
+    region, sentence and report files.
+
+    Args:
+        result_id (int): The ID of the result.
+        user (auth_schema.TokenData): Current authenticated user.
+        ai_service (AIService): Dependency for AI operations.
+
+    Returns:
+        result_schema.ResultRegions: The regions, sentences and report text.
+
+    Raises:
+        HTTPException: If the result is not found.
+    """
+    result = ai_service.show(result_id)
+    if not result:
+        raise HTTPException(status_code=404, detail="Result not found")
+    return ai_service.get_regions(result)
+
+@router.get("/{result_id}/events", dependencies=[Security(security)])
+async def get_result_events(result_id: int, user: auth_schema.TokenData = Depends(get_current_user), ai_service: AIService = Depends(get_ai_service)) -> StreamingResponse:
+    """
+    Stream the job state transitions of a result as server-sent events,
+    instead of polling the result until it is ready.
+
+    The first event is the current state, then one event per transition:
+    queued, running, sent (to the AI model), stored, completed and failed.
+    Each event is a JSON object with result_id, state, job_type and at
+    (failed ones also carry detail). Idle streams get a keep-alive comment
+    every configs.EVENTS_HEARTBEAT_INTERVAL seconds; the client closes the
+    stream once it has what it waits for.
+
+    Args:
+        result_id (int): The ID of the result.
+        user (auth_schema.TokenData): Current authenticated user.
+        ai_service (AIService): Dependency for AI operations.
+
+    Returns:
+        StreamingResponse: The text/event-stream of the result.
+
+    Raises:
+        HTTPException: If the result is not found.
+    """
+    # subscribe before reading the state so no transition falls in between
+    queue = event_broker.subscribe(result_id)
+    try:
+        state = await run_in_threadpool(ai_service.get_state, result_id)
+    except BaseException:
+        event_broker.unsubscribe(result_id, queue)
+        raise
+    if state is None:
+        event_broker.unsubscribe(result_id, queue)
+        raise HTTPException(status_code=404, detail="Result not found")
+
+    async def stream():
+        try:
+            yield f"retry: 3000\ndata: {json.dumps(state)}\n\n"
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=float(configs.EVENTS_HEARTBEAT_INTERVAL))
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"data: {json.dumps(event)}\n\n"
+        finally:
+            event_broker.unsubscribe(result_id, queue)
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
 @router.put("/{result_id}", dependencies=[Security(security)])
-async def update_result(result_id: int, request: result_schema.ResultUpdate, user: auth_schema.TokenData = Depends(get_current_user), ai_service: AIService = Depends(get_ai_service)) -> result_schema.ResultShow:
+def update_result(result_id: int, request: result_schema.ResultUpdate, user: auth_schema.TokenData = Depends(get_current_user), ai_service: AIService = Depends(get_ai_service)) -> result_schema.ResultShow:
     """
     Update an existing result by its ID.
 
@@ -105,7 +195,7 @@ async def update_result(result_id: int, request: result_schema.ResultUpdate, use
     return ai_service.update(result_id,request.dict())
 
 @router.delete("/{result_id}", dependencies=[Security(security)])
-async def delete_result( result_id: int, user: auth_schema.TokenData = Depends(get_current_user), ai_service: AIService = Depends(get_ai_service)) -> bool:
+def delete_result( result_id: int, user: auth_schema.TokenData = Depends(get_current_user), ai_service: AIService = Depends(get_ai_service)) -> bool:
     """
     Delete a result by its ID.
 
@@ -120,7 +210,7 @@ async def delete_result( result_id: int, user: auth_schema.TokenData = Depends(g
     return ai_service.destroy(result_id)
 
 @router.post("/{result_id}/upload_report", dependencies=[Security(security)])
-async def upload_report(result_id: int, report: UploadFile = File(...), user: auth_schema.TokenData = Depends(get_current_user), ai_service: AIService = Depends(get_ai_service)) -> result_schema.ResultShow:
+def upload_report(result_id: int, report: UploadFile = File(...), user: auth_schema.TokenData = Depends(get_current_user), ai_service: AIService = Depends(get_ai_service)) -> result_schema.ResultShow:
     """
     Upload a report for a specific result.
 
@@ -144,7 +234,7 @@ async def upload_report(result_id: int, report: UploadFile = File(...), user: au
     return ai_service.upload_report(result, report)
 
 @router.post("/{result_id}/upload_boxes", dependencies=[Security(security)])
-async def upload_boxes(result_id: int, boxes: UploadFile = File(...), user: auth_schema.TokenData = Depends(get_current_user), ai_service: AIService = Depends(get_ai_service)) -> result_schema.ResultShow:
+def upload_boxes(result_id: int, boxes: UploadFile = File(...), user: auth_schema.TokenData = Depends(get_current_user), ai_service: AIService = Depends(get_ai_service)) -> result_schema.ResultShow:
     """
     Upload bounding boxes for a specific result.
 
@@ -168,7 +258,7 @@ async def upload_boxes(result_id: int, boxes: UploadFile = File(...), user: auth
     return ai_service.upload_boxes(result, boxes)
 
 @router.post("/{result_id}/upload_boxes_sentences", dependencies=[Security(security)])
-async def upload_boxes_sentences(result_id: int, sentences: UploadFile = File(...), user: auth_schema.TokenData = Depends(get_current_user), ai_service: AIService = Depends(get_ai_service)) -> result_schema.ResultShow:
+def upload_boxes_sentences(result_id: int, sentences: UploadFile = File(...), user: auth_schema.TokenData = Depends(get_current_user), ai_service: AIService = Depends(get_ai_service)) -> result_schema.ResultShow:
     """
     Upload sentences associated with bounding boxes for a specific result.
 
@@ -195,13 +285,17 @@ async def upload_boxes_sentences(result_id: int, sentences: UploadFile = File(..
 @router.get("/{result_id}/get_heatmap/{label}", dependencies=[Security(security)],
             # responses={200: {"content": {"image/png": {}}}},
             response_class=FileResponse)
-async def get_heatmap(result_id: int, label: int, user: auth_schema.TokenData = Depends(get_current_user), ai_service: AIService = Depends(get_ai_service)) -> FileResponse:
+def get_heatmap(result_id: int, label: int, request: Request, user: auth_schema.TokenData = Depends(get_current_user), ai_service: AIService = Depends(get_ai_service)) -> FileResponse:
     """
     Retrieve a heatmap for a specific result and label.
 
+    The overlay is precomputed and served with ETag/Last-Modified, so a
+    repeated request answers 304 Not Modified.
+
     Args:
         result_id (int): The ID of the result to retrieve the heatmap for.
         label (int): The label for which to generate the heatmap (0-7).
+        request (Request): The incoming request, for its conditional headers.
         user (auth_schema.TokenData): Current authenticated user.
         ai_service (AIService): Dependency for AI operations.
 
@@ -217,5 +311,5 @@ async def get_heatmap(result_id: int, label: int, user: auth_schema.TokenData =
     heatmap = ai_service.get_heatmap(result_id, label) # (224,224,3)
 
     # return heatmap image as bytes
-    return FileResponse(heatmap)
+    return file_response(request, heatmap, media_type="image/png")
     
\ No newline at end of file
@@ -1,15 +1,19 @@
-from fastapi import APIRouter, Depends, HTTPException, Security, File, UploadFile, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, Security, File, UploadFile, Response, Request
 from app.models import database
-from app.models.enums import StatusEnum, ResultTypeEnum
+from app.models.enums import StatusEnum, ResultTypeEnum, JobTypeEnum
 from app.schemas import study as study_schema, authentication as auth_schema, result as result_schema
 from app.schemas import patient_study as patient_study_schema
 from app.services.study import StudyService
 from app.services.ai import AIService
-from typing import List
+from app.services.job import JobService
+from typing import List, Optional
 from sqlalchemy.orm import Session
-from app.dependencies import get_study_service, get_ai_service, get_result_repository
+from app.dependencies import get_study_service, get_ai_service, get_result_repository, get_job_service
 from app.middleware.authentication import get_current_user, security
 from fastapi.responses import FileResponse, StreamingResponse
+from app.core.pagination import set_next_cursor
+from app.core.file_response import file_response
+from app.core.config import configs
 
 # Create a new APIRouter instance
 router = APIRouter(
@@ -19,7 +23,7 @@ router = APIRouter(
 
 # Define a route for the employee list
 @router.get("/", dependencies=[Security(security)])
-async def read_studies(user: auth_schema.TokenData  = Depends(get_current_user),status: StatusEnum = StatusEnum.new, limit: int = 10, skip: int = 0, sort: str = None, study_Service: StudyService = Depends(get_study_service) ) -> List[study_schema.StudyShow]:
+def read_studies(response: Response, user: auth_schema.TokenData  = Depends(get_current_user),status: StatusEnum = StatusEnum.new, limit: int = 10, skip: int = 0, sort: str = None, cursor: Optional[str] = None, study_Service: StudyService = Depends(get_study_service) ) -> List[study_schema.StudyShow]:
     """
     Retrieve a list of studies based on status, limit, skip, and sort parameters.
 
@@ -29,17 +33,19 @@ async def read_studies(user: auth_schema.TokenData  = Depends(get_current_user),
     - limit (int): The maximum number of studies to return (default is 10).
     - skip (int): The number of studies to skip (default is 0).
     - sort (str): The sorting parameter.
+    - cursor (Optional[str]): The cursor from the X-Next-Cursor header of the previous page, to continue after it.
 
     Returns:
-    - List[study_schema.StudyShow]: A list of studies.
+    - List[study_schema.StudyShow]: A list of studies, with the cursor of the next page in the X-Next-Cursor header.
     """
-    studies = study_Service.get_all(status, limit, skip, sort)
+    studies = study_Service.get_all(status, limit, skip, sort, cursor)
+    set_next_cursor(response, studies, sort, limit)
     return studies
 
 
 # Define a route for creating a new employee
 @router.post("/", dependencies=[Security(security)])
-async def create_studies(request: study_schema.StudyCreate, user: auth_schema.TokenData = Depends(get_current_user), study_Service: StudyService = Depends(get_study_service)) -> study_schema.StudyShow:
+def create_studies(request: study_schema.StudyCreate, user: auth_schema.TokenData = Depends(get_current_user), study_Service: StudyService = Depends(get_study_service)) -> study_schema.StudyShow:
     """
     Create a new study.
 
@@ -57,7 +63,7 @@ async def create_studies(request: study_schema.StudyCreate, user: auth_schema.To
 
 # define a route for getting assigned studies
 @router.get("/assigned", dependencies=[Security(security)])
-async def get_assigned_studies(user: auth_schema.TokenData = Depends(get_current_user),status: StatusEnum = None, limit: int = 10, skip: int = 0, sort: str = None, study_Service: StudyService = Depends(get_study_service)) -> List[study_schema.StudyShow]:
+def get_assigned_studies(response: Response, user: auth_schema.TokenData = Depends(get_current_user),status: StatusEnum = None, limit: int = 10, skip: int = 0, sort: str = None, cursor: Optional[str] = None, study_Service: StudyService = Depends(get_study_service)) -> List[study_schema.StudyShow]:
     """
     Retrieve a list of assigned studies.
 
@@ -67,32 +73,49 @@ async def get_assigned_studies(user: auth_schema.TokenData = Depends(get_current
     - limit (int): The maximum number of studies to return (default is 10).
     - skip (int): The number of studies to skip (default is 0).
     - sort (str): The sorting parameter.
+    - cursor (Optional[str]): The cursor from the X-Next-Cursor header of the previous page, to continue after it.
 
     Returns:
-    - List[study_schema.StudyShow]: A list of assigned studies.
+    - List[study_schema.StudyShow]: A list of assigned studies, with the cursor of the next page in the X-Next-Cursor header.
     """
-    return study_Service.get_assigned_studies(user.id, status, limit, skip, sort)
+    studies = study_Service.get_assigned_studies(user.id, status, limit, skip, sort, cursor)
+    set_next_cursor(response, studies, sort, limit)
+    return studies
+
+# declared before /{study_id} so "stats" is not taken for a study id
+@router.get("/stats", dependencies=[Security(security)])
+def get_studies_stats(user: auth_schema.TokenData = Depends(get_current_user), study_Service: StudyService = Depends(get_study_service)) -> study_schema.StudyStats:
+    """
+    Retrieve all the dashboard counters in one request.
+
+    Args:
+    - user (auth_schema.TokenData): The current authenticated user.
+    - study_Service (StudyService): The study service dependency.
+
+    Returns:
+    - study_schema.StudyStats: The new and incomplete counts, the pending and completed counts of the current doctor, and the counts per status and per doctor.
+    """
+    return study_Service.get_stats(user.id if user.type == "doctor" else None)
 
 @router.post("/run_backgroud", dependencies=[Security(security)])
-async def run_background(user: auth_schema.TokenData = Depends(get_current_user), ai_service: AIService = Depends(get_ai_service) , background: BackgroundTasks = BackgroundTasks()) -> dict:
+def run_background(user: auth_schema.TokenData = Depends(get_current_user), job_service: JobService = Depends(get_job_service)) -> dict:
     """
-    Run a background task to calculate severities.
+    Queue a job to calculate severities.
 
     Args:
     - user (auth_schema.TokenData): The current authenticated user.
-    - ai_service (AIService): The AI service dependency.
-    - background (BackgroundTasks): The background tasks dependency.
+    - job_service (JobService): The job service dependency.
 
     Returns:
-    - dict: A response indicating the task is running.
+    - dict: A response indicating the task is queued.
     """
-    background.add_task(ai_service.calculate_severities)
-    # return a response indicating the task is running
-    return {"detail": "Task is running in the background"}
+    job_service.enqueue(JobTypeEnum.severities)
+    # return a response indicating the task is queued for the worker
+    return {"detail": "Task is queued for the worker"}
 
 # Define a route for getting a single employee
 @router.get("/{study_id}", dependencies=[Security(security)])
-async def read_study(study_id: int,user: auth_schema.TokenData = Depends(get_current_user), study_Service: StudyService = Depends(get_study_service)) -> patient_study_schema.PatientStudy:
+def read_study(study_id: int,user: auth_schema.TokenData = Depends(get_current_user), study_Service: StudyService = Depends(get_study_service)) -> patient_study_schema.PatientStudy:
     """
     Retrieve a single study by its ID.
 
@@ -114,7 +137,7 @@ async def read_study(study_id: int,user: auth_schema.TokenData = Depends(get_cur
 
 # Define a route for updating an employee
 @router.put("/{study_id}", dependencies=[Security(security)])
-async def update_study(study_id: int, request: study_schema.StudyUpdate, user: auth_schema.TokenData = Depends(get_current_user),study_Service: StudyService = Depends(get_study_service)) -> study_schema.StudyShow:
+def update_study(study_id: int, request: study_schema.StudyUpdate, user: auth_schema.TokenData = Depends(get_current_user),study_Service: StudyService = Depends(get_study_service)) -> study_schema.StudyShow:
     """
     Update a study by its ID.
 
@@ -132,7 +155,7 @@ async def update_study(study_id: int, request: study_schema.StudyUpdate, user: a
 
 # Define a route for deleting an employee
 @router.delete("/{study_id}", dependencies=[Security(security)])
-async def delete_study(study_id: int, user: auth_schema.TokenData = Depends(get_current_user), study_Service: StudyService = Depends(get_study_service)) -> bool:
+def delete_study(study_id: int, user: auth_schema.TokenData = Depends(get_current_user), study_Service: StudyService = Depends(get_study_service)) -> bool:
     """
     Delete a study by its ID.
 
@@ -153,15 +176,18 @@ async def delete_study(study_id: int, user: auth_schema.TokenData = Depends(get_
     return deleted
 
 @router.post("/{study_id}/upload_image", dependencies=[Security(security)])
-async def upload_image(study_id: int, file: UploadFile = File(...), user: auth_schema.TokenData = Depends(get_current_user), study_Service: StudyService = Depends(get_study_service)) -> study_schema.StudyShow:
+def upload_image(study_id: int, file: UploadFile = File(...), user: auth_schema.TokenData = Depends(get_current_user), study_Service: StudyService = Depends(get_study_service),
+                 job_service: JobService = Depends(get_job_service)) -> study_schema.StudyShow:
     """
-    Upload an image for a specific study.
+    Upload an image for a specific study and queue the generation of its
+    image pyramid.
 
     Args:
     - study_id (int): The ID of the study.
     - file (UploadFile): The image file to upload.
     - user (auth_schema.TokenData): The current authenticated user.
     - study_Service (StudyService): The study service dependency.
+    - job_service (JobService): The job service dependency.
 
     Returns:
     - study_schema.StudyShow: The updated study with the uploaded image.
@@ -172,15 +198,22 @@ async def upload_image(study_id: int, file: UploadFile = File(...), user: auth_s
     study = study_Service.show(study_id,False)
     if not study:
         raise HTTPException(status_code=404, detail=f"Study with id {study_id} not found")
-    return study_Service.upload_image(study, file)
+    study = study_Service.upload_image(study, file)
+
+    # the worker resizes the X-ray once, downloads then serve the stored files
+    job_service.enqueue_once(JobTypeEnum.derivatives, xray_path=study.xray_path, study_id=study.id)
+    return study
 
 @router.get("/{study_id}/download_resized_image", dependencies=[Security(security)])
-async def download_image(study_id: int, user: auth_schema.TokenData = Depends(get_current_user), study_Service: StudyService = Depends(get_study_service)) -> FileResponse:
+def download_image(request: Request, study_id: int, size: str = "512", v: Optional[str] = None, user: auth_schema.TokenData = Depends(get_current_user), study_Service: StudyService = Depends(get_study_service)) -> FileResponse:
     """
     Download a resized image for a specific study.
 
     Args:
+    - request (Request): The incoming request, for its conditional headers.
     - study_id (int): The ID of the study.
+    - size (str): The pyramid level, 224, 512, 1024 or full (default is 512).
+    - v (Optional[str]): The X-ray SHA-256, makes the response cacheable as immutable.
     - user (auth_schema.TokenData): The current authenticated user.
     - study_Service (StudyService): The study service dependency.
 
@@ -188,20 +221,66 @@ async def download_image(study_id: int, user: auth_schema.TokenData = Depends(ge
     - FileResponse: The resized image file response.
 
     Raises:
-    - HTTPException: If the study is not found or the X-ray image is missing.
+    - HTTPException: If the study is not found, the size is invalid or the X-ray image is missing, 409 while its derivatives job is pending.
     """
     study = study_Service.show(study_id,False)
     if not study:
         raise HTTPException(status_code=404, detail=f"Study with id {study_id} not found")
-    if study.xray_path is None:
-        raise HTTPException(status_code=400, detail="X-ray image is required to download resized image")
-    resized_path = study_Service.resize_image(study)
+    resized_path = study_Service.pyramid_path(study, size)
+    validators = study_Service.cache_validators(study, None if size == "full" else size, v)
 
     # add path of resized image to response headers
-    return FileResponse(resized_path, headers={"resized_xray_path": resized_path})
+    return file_response(request, resized_path, headers={"resized_xray_path": resized_path}, **validators)
+
+@router.get("/{study_id}/tiles", dependencies=[Security(security)])
+def read_tiles(study_id: int, user: auth_schema.TokenData = Depends(get_current_user), study_Service: StudyService = Depends(get_study_service)) -> study_schema.StudyTiles:
+    """
+    Describe the deep zoom tile pyramid of the X-ray of a specific study.
+
+    Args:
+    - study_id (int): The ID of the study.
+    - user (auth_schema.TokenData): The current authenticated user.
+    - study_Service (StudyService): The study service dependency.
+
+    Returns:
+    - study_schema.StudyTiles: The image size, tile size, tile format and number of levels.
+
+    Raises:
+    - HTTPException: If the study is not found or the X-ray image is missing, 409 while its derivatives job is pending.
+    """
+    study = study_Service.show(study_id,False)
+    if not study:
+        raise HTTPException(status_code=404, detail=f"Study with id {study_id} not found")
+    return study_Service.tiles_descriptor(study)
+
+@router.get("/{study_id}/tiles/{level}/{x}_{y}.jpg", dependencies=[Security(security)])
+def download_tile(request: Request, study_id: int, level: int, x: int, y: int, v: Optional[str] = None, user: auth_schema.TokenData = Depends(get_current_user), study_Service: StudyService = Depends(get_study_service)) -> FileResponse:
+    """
+    Download a 256x256 deep zoom tile of the X-ray of a specific study.
+
+    Args:
+    - request (Request): The incoming request, for its conditional headers.
+    - study_id (int): The ID of the study.
+    - level (int): The pyramid level, 0 to max_level (full resolution).
+    - x (int): The tile column.
+    - y (int): The tile row.
+    - v (Optional[str]): The version from the descriptor, makes the response cacheable as immutable.
+    - user (auth_schema.TokenData): The current authenticated user.
+    - study_Service (StudyService): The study service dependency.
+
+    Returns:
+    - FileResponse: The tile image file response.
+
+    Raises:
+    - HTTPException: If the study, its X-ray image or the tile is not found, 409 while its derivatives job is pending.
+    """
+    # a viewer fetches tiles by the dozen, only the descriptor request counts as a view
+    study = study_Service.show(study_id, False, track_view=False)
+    validators = study_Service.cache_validators(study, f"tile-{level}-{x}-{y}", v)
+    return file_response(request, study_Service.tile_path(study, level, x, y), media_type="image/jpeg", **validators)
 
 @router.post("/{study_id}/archive", dependencies=[Security(security)])
-async def archive_study(study_id: int, user: auth_schema.TokenData = Depends(get_current_user), study_Service: StudyService = Depends(get_study_service)) -> bool:
+def archive_study(study_id: int, user: auth_schema.TokenData = Depends(get_current_user), study_Service: StudyService = Depends(get_study_service)) -> bool:
     """
     Archive a study by its ID.
 
@@ -223,7 +302,7 @@ async def archive_study(study_id: int, user: auth_schema.TokenData = Depends(get
     return study_Service.archive(study_id, user.id)
 
 @router.post("/{study_id}/unarchive", dependencies=[Security(security)])
-async def unarchive_study(study_id: int, user: auth_schema.TokenData = Depends(get_current_user), study_Service: StudyService = Depends(get_study_service)) -> bool:
+def unarchive_study(study_id: int, user: auth_schema.TokenData = Depends(get_current_user), study_Service: StudyService = Depends(get_study_service)) -> bool:
     """
     Unarchive a study by its ID.
 
@@ -245,7 +324,7 @@ async def unarchive_study(study_id: int, user: auth_schema.TokenData = Depends(g
     return study_Service.unarchive(study_id, user.id)
 
 @router.post("/{study_id}/assign", dependencies=[Security(security)]) 
-async def assign_doctor(study_id: int, user: auth_schema.TokenData = Depends(get_current_user), study_Service: StudyService = Depends(get_study_service)) -> bool:
+def assign_doctor(study_id: int, user: auth_schema.TokenData = Depends(get_current_user), study_Service: StudyService = Depends(get_study_service)) -> bool:
     """
     Assign a doctor to a study by its ID.
 
@@ -268,7 +347,7 @@ async def assign_doctor(study_id: int, user: auth_schema.TokenData = Depends(get
     return study_Service.assign_doctor(study_id, user.id)
 
 @router.post("/{study_id}/unassign", dependencies=[Security(security)])
-async def unassign_doctor(study_id: int, user: auth_schema.TokenData = Depends(get_current_user), study_Service: StudyService = Depends(get_study_service)) -> bool:
+def unassign_doctor(study_id: int, user: auth_schema.TokenData = Depends(get_current_user), study_Service: StudyService = Depends(get_study_service)) -> bool:
     """
     Unassign a doctor from a study by its ID.
 
@@ -290,7 +369,7 @@ async def unassign_doctor(study_id: int, user: auth_schema.TokenData = Depends(g
 
 # define a route for gettinng count of new studies
 @router.get("/new/count", dependencies=[Security(security)])
-async def get_new_studies_count(user: auth_schema.TokenData = Depends(get_current_user), study_Service: StudyService = Depends(get_study_service)) -> study_schema.countStudy:
+def get_new_studies_count(user: auth_schema.TokenData = Depends(get_current_user), study_Service: StudyService = Depends(get_study_service)) -> study_schema.countStudy:
     """
     Retrieve the count of new studies.
 
@@ -305,7 +384,7 @@ async def get_new_studies_count(user: auth_schema.TokenData = Depends(get_curren
 
 # define a route for getting count of incomplete studies
 @router.get("/incomplete/count", dependencies=[Security(security)])
-async def get_incomplete_studies_count(user: auth_schema.TokenData = Depends(get_current_user), study_Service: StudyService = Depends(get_study_service)) -> study_schema.countStudy:
+def get_incomplete_studies_count(user: auth_schema.TokenData = Depends(get_current_user), study_Service: StudyService = Depends(get_study_service)) -> study_schema.countStudy:
     """
     Retrieve the count of incomplete studies.
 
@@ -320,7 +399,7 @@ async def get_incomplete_studies_count(user: auth_schema.TokenData = Depends(get
 
 # define a route for getting count of my pending studies
 @router.get("/pending/count", dependencies=[Security(security)])
-async def get_pending_studies_count(user: auth_schema.TokenData = Depends(get_current_user), study_Service: StudyService = Depends(get_study_service)) -> study_schema.countStudy:
+def get_pending_studies_count(user: auth_schema.TokenData = Depends(get_current_user), study_Service: StudyService = Depends(get_study_service)) -> study_schema.countStudy:
     """
     Retrieve the count of pending studies assigned to the current doctor.
 
@@ -340,7 +419,7 @@ async def get_pending_studies_count(user: auth_schema.TokenData = Depends(get_cu
 
 # define a route for getting count of my completed studies
 @router.get("/completed/count", dependencies=[Security(security)])
-async def get_completed_studies_count(user: auth_schema.TokenData = Depends(get_current_user), study_Service: StudyService = Depends(get_study_service)) ->study_schema.countStudy:
+def get_completed_studies_count(user: auth_schema.TokenData = Depends(get_current_user), study_Service: StudyService = Depends(get_study_service)) ->study_schema.countStudy:
     """
     Retrieve the count of completed studies assigned to the current doctor.
 
@@ -360,7 +439,7 @@ async def get_completed_studies_count(user: auth_schema.TokenData = Depends(get_
 
 
 @router.get("/{study_id}/results", dependencies=[Security(security)])
-async def get_results(study_id: int, user: auth_schema.TokenData = Depends(get_current_user), ai_service: AIService = Depends(get_ai_service)) -> List[result_schema.ResultShow]:
+def get_results(study_id: int, user: auth_schema.TokenData = Depends(get_current_user), ai_service: AIService = Depends(get_ai_service)) -> List[result_schema.ResultShow]:
     """
     Retrieve the results of a specific study by its ID.
 
@@ -375,11 +454,11 @@ async def get_results(study_id: int, user: auth_schema.TokenData = Depends(get_c
     return ai_service.get_results(study_id)
 
 @router.post("/{study_id}/run_llm")
-async def run_llm(study_id: int,
+def run_llm(study_id: int,
                   user: auth_schema.TokenData = Depends(get_current_user),
                   study_Service: StudyService = Depends(get_study_service),
                   ai_service: AIService = Depends(get_ai_service),
-                  background: BackgroundTasks = BackgroundTasks()) -> result_schema.ResultShow:
+                  job_service: JobService = Depends(get_job_service)) -> result_schema.ResultShow:
     
     """
     Run the LLM model for a specific study by its ID.
@@ -389,7 +468,7 @@ async def run_llm(study_id: int,
     - user (auth_schema.TokenData): The current authenticated user.
     - study_Service (StudyService): The study service dependency.
     - ai_service (AIService): The AI service dependency.
-    - background (BackgroundTasks): The background tasks dependency.
+    - job_service (JobService): The job service dependency.
 
     Returns:
     - result_schema.ResultShow: The result of the LLM model run.
@@ -429,19 +508,23 @@ async def run_llm(study_id: int,
 
         result = ai_service.create(result)
 
-    # Add the task to the background tasks queue
-    background.add_task(ai_service.run_llm, result.id, study.xray_path)
-    background.add_task(ai_service.denoise, result.id, study.xray_path)
+    # Queue the jobs for the worker, the combined one uploads the X-ray once for the report and the denoised image
+    # a job already pending for the result is reused, a double click does not call the model twice
+    if configs.AI_COMBINED_INFERENCE:
+        job_service.enqueue_once(JobTypeEnum.analyze, result.id, study.xray_path)
+    else:
+        job_service.enqueue_once(JobTypeEnum.llm, result.id, study.xray_path)
+        job_service.enqueue_once(JobTypeEnum.denoise, result.id, study.xray_path)
     
-    # Return a response indicating the task is running
-    return result
+    # Return the result, its job_status tracks the queued jobs
+    return ai_service.result_repo.show(result.id)
 
 @router.post("/{study_id}/run_heatmap")
-async def run_heatmap(study_id: int,
+def run_heatmap(study_id: int,
                       user: auth_schema.TokenData = Depends(get_current_user),
                       study_Service: StudyService = Depends(get_study_service),
                       ai_service: AIService = Depends(get_ai_service),
-                      background: BackgroundTasks = BackgroundTasks()) -> result_schema.ResultShow:
+                      job_service: JobService = Depends(get_job_service)) -> result_schema.ResultShow:
     """
     Run the heatmap model for a specific study by its ID.
 
@@ -450,7 +533,7 @@ async def run_heatmap(study_id: int,
     - user (auth_schema.TokenData): The current authenticated user.
     - study_Service (StudyService): The study service dependency.
     - ai_service (AIService): The AI service dependency.
-    - background (BackgroundTasks): The background tasks dependency.
+    - job_service (JobService): The job service dependency.
 
     Returns:
     - result_schema.ResultShow: The result of the heatmap model run.
@@ -490,8 +573,8 @@ async def run_heatmap(study_id: int,
         
         result = ai_service.create(result)
 
-    # Add the task to the background tasks queue
-    background.add_task(ai_service.run_heatmap, result.id, study.xray_path)
+    # Queue the job for the worker, unless one is already pending for the result
+    job_service.enqueue_once(JobTypeEnum.heatmap, result.id, study.xray_path)
 
-    # Return a response indicating the task is running
-    return result
+    # Return the result, its job_status tracks the queued job
+    return ai_service.result_repo.show(result.id)
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, Security, File, UploadFile
+from fastapi import APIRouter, Depends, HTTPException, Security, File, UploadFile, Request
 from app.models import database
 from app.schemas import template as template_schema, authentication as auth_schema
 from app.services.template import TemplateService
@@ -17,7 +17,7 @@ router = APIRouter(
 
 # Define a route for the employee list
 @router.get("/", dependencies=[Security(security)])
-async def read_templates(limit: int = 10, skip: int = 0, sort: str = None,user: auth_schema.TokenData  = Depends(get_current_user), template_service: TemplateService = Depends(get_template_service) ) -> List[template_schema.Template]:
+def read_templates(limit: int = 10, skip: int = 0, sort: str = None,user: auth_schema.TokenData  = Depends(get_current_user), template_service: TemplateService = Depends(get_template_service) ) -> List[template_schema.Template]:
     """
     Retrieve a list of templates with optional pagination and sorting.
 
@@ -36,7 +36,7 @@ async def read_templates(limit: int = 10, skip: int = 0, sort: str = None,user:
 
 # Define a route for creating a new employee
 @router.post("/", dependencies=[Security(security)])
-async def create_templates(request: template_schema.TemplateCreate,user: auth_schema.TokenData  = Depends(get_current_user), template_service: TemplateService = Depends(get_template_service)) -> template_schema.Template:
+def create_templates(request: template_schema.TemplateCreate,user: auth_schema.TokenData  = Depends(get_current_user), template_service: TemplateService = Depends(get_template_service)) -> template_schema.Template:
     """
     Create a new template.
 
@@ -53,7 +53,7 @@ async def create_templates(request: template_schema.TemplateCreate,user: auth_sc
 
 # Define a route for getting a single employee
 @router.get("/{template_id}", dependencies=[Security(security)])
-async def read_template(template_id: int,user: auth_schema.TokenData  = Depends(get_current_user), template_service: TemplateService = Depends(get_template_service)) -> template_schema.Template:
+def read_template(template_id: int,user: auth_schema.TokenData  = Depends(get_current_user), template_service: TemplateService = Depends(get_template_service)) -> template_schema.Template:
     """
     Retrieve a template by its ID.
 
@@ -75,7 +75,7 @@ async def read_template(template_id: int,user: auth_schema.TokenData  = Depends(
 
 # Define a route for updating an employee
 @router.put("/{template_id}", dependencies=[Security(security)])
-async def update_template(template_id: int, request: template_schema.TemplateUpdate,user: auth_schema.TokenData  = Depends(get_current_user), template_service: TemplateService = Depends(get_template_service)) -> template_schema.Template:
+def update_template(template_id: int, request: template_schema.TemplateUpdate,user: auth_schema.TokenData  = Depends(get_current_user), template_service: TemplateService = Depends(get_template_service)) -> template_schema.Template:
     """
     Update an existing template by its ID.
 
@@ -93,7 +93,7 @@ async def update_template(template_id: int, request: template_schema.TemplateUpd
 
 # Define a route for deleting an employee
 @router.delete("/{template_id}", dependencies=[Security(security)])
-async def delete_template(template_id: int,user: auth_schema.TokenData  = Depends(get_current_user), template_service: TemplateService = Depends(get_template_service)) -> bool:
+def delete_template(template_id: int,user: auth_schema.TokenData  = Depends(get_current_user), template_service: TemplateService = Depends(get_template_service)) -> bool:
     """
     Delete a template by its ID.
 
@@ -114,7 +114,7 @@ async def delete_template(template_id: int,user: auth_schema.TokenData  = Depend
     return deleted
 
 @router.post("/{template_id}/upload_template", dependencies=[Security(security)])
-async def upload_template(template_id: int, file: UploadFile = File(...), user: auth_schema.TokenData  = Depends(get_current_user), template_service: TemplateService = Depends(get_template_service)) -> template_schema.Template:
+def upload_template(template_id: int, file: UploadFile = File(...), user: auth_schema.TokenData  = Depends(get_current_user), template_service: TemplateService = Depends(get_template_service)) -> template_schema.Template:
     """
     Upload a new template file for a specific template ID.
 
@@ -137,12 +137,13 @@ async def upload_template(template_id: int, file: UploadFile = File(...), user:
 
 # return actual file
 @router.get("/{template_id}/download_template", dependencies=[Security(security)])
-async def download_template(template_id: int, user: auth_schema.TokenData  = Depends(get_current_user), template_service: TemplateService = Depends(get_template_service)) -> FileResponse:
+def download_template(template_id: int, request: Request, user: auth_schema.TokenData  = Depends(get_current_user), template_service: TemplateService = Depends(get_template_service)) -> FileResponse:
     """
     Download a specific template file by its ID.
 
     Args:
         template_id (int): The ID of the template to download.
+        request (Request): The incoming request, for its conditional and range headers.
         user (auth_schema.TokenData): Current authenticated user.
         template_service (TemplateService): Dependency for template operations.
 
@@ -155,4 +156,4 @@ async def download_template(template_id: int, user: auth_schema.TokenData  = Dep
     template = template_service.show(template_id)
     if not template:
         raise HTTPException(status_code=404, detail=f"Template with id {template_id} not found")
-    return template_service.download_template(template)
\ No newline at end of file
+    return template_service.download_template(template, request)
\ No newline at end of file
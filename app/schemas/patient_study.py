@@ -15,6 +15,10 @@ class PatientStudy(BaseModel):
     xray_path: Optional[str] = None
     resized_xray_path: Optional[str] = None
     xray_type: Optional[str] = None
+    xray_sha256: Optional[str] = None
+    xray_size: Optional[int] = None
+    xray_width: Optional[int] = None
+    xray_height: Optional[int] = None
     severity: Optional[float] = 0
     is_archived: Optional[bool] =False
     patient_id: Optional[int] = None
@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Optional, List, Union
 from datetime import datetime
 from app.models.enums import ResultTypeEnum
 
@@ -30,6 +30,7 @@ class Result(ResultBase):
     heatmap_path: Optional[str] = None
     report_path: Optional[str] = None
     region_sentence_path: Optional[str] = None
+    job_status: Optional[str] = None
     class Config:
         # allow population of ORM model
         orm_mode = True
@@ -37,3 +38,17 @@ class Result(ResultBase):
 
 class ResultShow(Result):
     pass
+
+class Region(BaseModel):
+    # class index, or the class name when the model returns one
+    label: Union[int, str]
+    x: float
+    y: float
+    width: float
+    height: float
+
+class ResultRegions(BaseModel):
+    result_id: int
+    regions: List[Region] = []
+    sentences: List[str] = []
+    report_text: Optional[str] = None
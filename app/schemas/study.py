@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional
+from typing import Dict, Optional
 from datetime import datetime
 from app.models.enums import StatusEnum
 
@@ -29,6 +29,10 @@ class StudyUpdate(StudyBase):
 class Study(StudyBase):
     id: int
     doctor_id: Optional[int] = None
+    xray_sha256: Optional[str] = None
+    xray_size: Optional[int] = None
+    xray_width: Optional[int] = None
+    xray_height: Optional[int] = None
     class Config:
         # allow population of ORM model
         orm_mode = True
@@ -37,6 +41,26 @@ class Study(StudyBase):
 class StudyShow(Study):
     pass
 
+class StudyTiles(BaseModel):
+    # deep zoom descriptor, tiles are served from /studies/{id}/tiles/{level}/{x}_{y}.jpg
+    width: int
+    height: int
+    tile_size: int
+    overlap: int
+    format: str
+    max_level: int
+    # pass as ?v= to get tiles cached as immutable
+    version: Optional[str] = None
+
 class countStudy(BaseModel):
     count: int
+
+class StudyStats(BaseModel):
+    new: int = 0
+    incomplete: int = 0
+    # only for doctors, their own studies
+    pending: Optional[int] = None
+    completed: Optional[int] = None
+    by_status: Dict[str, int] = {}
+    by_doctor: Dict[int, Dict[str, int]] = {}
     pass
\ No newline at end of file
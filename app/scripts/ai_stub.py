@@ -0,0 +1,77 @@
+import base64
+import hashlib
+import uvicorn
+import numpy as np
+from fastapi import FastAPI, File, UploadFile
+from fastapi.responses import Response
+from typing import List
+
+# Local stand-in for the AI model server (configs.AI_MODEL_URL) so the API and
+# the worker can be exercised without GPUs. Outputs are deterministic per image.
+app = FastAPI()
+
+NUM_LABELS = 8
+
+
+def fake_heatmap_output(data: bytes) -> dict:
+    seed = int.from_bytes(hashlib.sha256(data).digest()[:4], "big")
+    rng = np.random.default_rng(seed)
+    confidence = rng.random(NUM_LABELS)
+    return {
+        "heatmap": rng.random((NUM_LABELS, 7, 7)).tolist(),
+        "labels": (confidence > 0.5).astype(int).tolist(),
+        "confidence": confidence.tolist(),
+        "severity": float(confidence.mean()),
+        "report": "No acute cardiopulmonary abnormality.",
+    }
+
+
+def fake_report_output(data: bytes) -> dict:
+    return {
+        "bounding_boxes": [[10.0, 20.0, 110.0, 220.0], [300.0, 40.0, 420.0, 260.0]],
+        "report_text": "The lungs are clear. The heart size is normal.",
+        "detected_classes": [1, 4],
+        "lm_sentences_decoded": ["The right lung is clear.", "The heart size is normal."],
+    }
+
+
+@app.post("/heatmap/generate_heatmap")
+async def generate_heatmap(image: UploadFile = File(...)) -> dict:
+    return fake_heatmap_output(await image.read())
+
+
+@app.post("/heatmap/generate_heatmap_batch")
+async def generate_heatmap_batch(images: List[UploadFile] = File(...)) -> dict:
+    # one output per uploaded image, in upload order
+    return {"results": [fake_heatmap_output(await image.read()) for image in images]}
+
+
+@app.post("/x_reporto/report")
+async def report(image: UploadFile = File(...)) -> dict:
+    return fake_report_output(await image.read())
+
+
+@app.post("/x_reporto/analyze")
+async def analyze(image: UploadFile = File(...)) -> dict:
+    # the report and the denoised image (echoed back, base64) of a single upload
+    data = await image.read()
+    return {
+        **fake_report_output(data),
+        "denoised_image": base64.b64encode(data).decode(),
+        "denoised_media_type": image.content_type or "image/jpeg",
+    }
+
+
+@app.post("/x_reporto/denoise")
+async def denoise(image: UploadFile = File(...)) -> Response:
+    # echo the image back, the API decodes and re-encodes it
+    return Response(content=await image.read(), media_type=image.content_type or "image/jpeg")
+
+
+if __name__ == "__main__":
+    uvicorn.run(app, host="127.0.0.1", port=8001)
+
+'''
+Run the stub model server with:
+python -m app.scripts.ai_stub
+'''
@@ -0,0 +1,49 @@
+import argparse
+import os
+from app.models import database
+from app.models.study import Study
+from app.models.job import Job
+from app.models.enums import JobTypeEnum
+from app.repository.job import JobRepository
+from app.repository.study import StudyRepository
+
+# Queues a derivatives job for every study with an X-ray but no image pyramid
+# or tiles, uploaded before the derivatives job existed or whose files are
+# gone. The worker (python -m app.worker) generates them, the API never does.
+
+
+def missing_derivatives(study: Study) -> bool:
+    paths = study.pyramid_paths
+    if not paths or not os.path.isdir(paths.get("tiles", "")):
+        return True
+    return any(not os.path.isfile(path) for size, path in paths.items() if size != "tiles")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Queue the derivatives jobs of the studies without an image pyramid")
+    parser.add_argument("--dry-run", action="store_true", help="only count the studies")
+    args = parser.parse_args()
+
+    database.create_database_if_not_exists()
+    db = database.SessionLocal()
+    try:
+        job_repo, study_repo = JobRepository(db), StudyRepository(db)
+        studies = db.query(Study).filter(Study.xray_path.isnot(None), Study.is_deleted == False).order_by(Study.id).all()
+        pending = [study for study in studies if missing_derivatives(study)]
+        print(f"{len(pending)} of {len(studies)} studies have no image pyramid")
+        if not args.dry_run:
+            queued = 0
+            for study in pending:
+                # a study whose job is already queued or running keeps it
+                if study_repo.has_pending_job(study.id, JobTypeEnum.derivatives):
+                    continue
+                job_repo.create_once(Job(type=JobTypeEnum.derivatives, xray_path=study.xray_path, study_id=study.id))
+                queued += 1
+            print(f"Queued the derivatives jobs of {queued} studies, the others have one pending")
+    finally:
+        db.close()
+
+'''
+Run once after deploying, next to a running worker:
+python -m app.scripts.backfill_derivatives [--dry-run]
+'''
@@ -0,0 +1,57 @@
+import argparse
+from sqlalchemy import or_, and_, func
+from app.models import database
+from app.models.result import Result
+from app.services.ai import AIService
+from app.repository.study import StudyRepository
+from app.repository.result import ResultRepository
+from app.repository.activity import ActivityRepository
+
+# Stores the parsed region, region sentence and report files on the results
+# saved before the regions, region_sentences and report_text columns existed,
+# so GET /results/{id}/regions reads the row instead of parsing the files.
+
+
+def unset(column):
+    # JSONB columns set to None by the ORM hold a JSON null rather than NULL
+    return func.coalesce(func.jsonb_typeof(column), "null") == "null"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Store the parsed region files of the results saved before the region columns")
+    parser.add_argument("--batch", type=int, default=500, help="results committed at once")
+    parser.add_argument("--dry-run", action="store_true", help="only count the results")
+    args = parser.parse_args()
+
+    database.create_database_if_not_exists()
+    db = database.SessionLocal()
+    try:
+        ai_service = AIService(StudyRepository(db), ResultRepository(db), ActivityRepository(db))
+        results = db.query(Result).filter(or_(
+            and_(unset(Result.regions), Result.region_path.isnot(None)),
+            and_(unset(Result.region_sentences), Result.region_sentence_path.isnot(None)),
+            and_(Result.report_text.is_(None), Result.report_path.isnot(None)),
+        )).order_by(Result.id).all()
+        print(f"{len(results)} results have files not stored on the row")
+
+        stored = 0
+        for i, result in enumerate(results, 1):
+            parsed = ai_service.read_region_files(result)
+            for key, value in parsed.items():
+                setattr(result, key, value)
+            stored += bool(parsed)
+            if not args.dry_run and i % args.batch == 0:
+                db.commit()
+        if args.dry_run:
+            db.rollback()
+            print(f"{stored} results would be stored, the others have their files missing")
+        else:
+            db.commit()
+            print(f"Stored {stored} results, the others have their files missing")
+    finally:
+        db.close()
+
+'''
+Run once after deploying:
+python -m app.scripts.backfill_regions [--dry-run]
+'''
@@ -0,0 +1,82 @@
+import argparse
+import multiprocessing
+import statistics
+import time
+import tracemalloc
+import albumentations as A
+import cv2
+import numpy as np
+from app.core.images import decode_image
+
+# Compares the decode + resize to 224 (heatmap overlay) and 512 (preview) of
+# an X-ray between the full resolution BGR decode the services used and
+# app.core.images.decode_image (reduced JPEG decode, grayscale for grayscale
+# sources). Reports the median time and the peak array memory of each path,
+# measured in a fresh process, and how far apart the outputs are.
+
+
+def resize(img: np.ndarray, size: int) -> np.ndarray:
+    transform = A.Compose([
+        A.LongestMaxSize(max_size=size, interpolation=cv2.INTER_AREA),
+        A.PadIfNeeded(min_height=size, min_width=size, border_mode=cv2.BORDER_CONSTANT),
+    ])
+    return transform(image=img)["image"]
+
+
+def full_decode(path: str, size: int) -> np.ndarray:
+    return resize(cv2.imread(path, cv2.IMREAD_COLOR), size)
+
+
+def reduced_decode(path: str, size: int) -> np.ndarray:
+    return resize(decode_image(path, size, color=True), size)
+
+
+def measure(path: str, size: int, reduced: bool, runs: int, queue) -> None:
+    function = reduced_decode if reduced else full_decode
+    # OpenCV allocates its output arrays through numpy, which reports to tracemalloc
+    tracemalloc.start()
+    function(path, size)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        function(path, size)
+        timings.append((time.perf_counter() - start) * 1000)
+    queue.put((statistics.median(timings), peak / (1024 * 1024)))
+
+
+def run(path: str, size: int, reduced: bool, runs: int) -> tuple:
+    # a fresh process per path so caches and allocator state do not carry over
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=measure, args=(path, size, reduced, runs, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def main(args) -> None:
+    print(f"{args.path}, {args.runs} runs")
+    for size in args.sizes:
+        full_ms, full_mb = run(args.path, size, False, args.runs)
+        reduced_ms, reduced_mb = run(args.path, size, True, args.runs)
+        difference = np.abs(full_decode(args.path, size).astype(np.int16) - reduced_decode(args.path, size).astype(np.int16))
+        print(f"{size}px: full decode {full_ms:.1f} ms / peak {full_mb:.1f} MB, "
+              f"reduced decode {reduced_ms:.1f} ms / peak {reduced_mb:.1f} MB, "
+              f"output mean abs difference {difference.mean():.2f} (max {difference.max()})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the reduced JPEG decode against the full resolution decode")
+    parser.add_argument("--path", default="static/studies/2/xray.jpg")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[224, 512])
+    parser.add_argument("--runs", type=int, default=20)
+    main(parser.parse_args())
+
+'''
+Run with:
+python -m app.scripts.bench_decode --path static/studies/2/xray.jpg
+'''
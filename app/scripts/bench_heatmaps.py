@@ -0,0 +1,67 @@
+import argparse
+import os
+import statistics
+import tempfile
+import time
+import numpy as np
+from app.core import heatmap_store
+
+# Compares the float64 heatmap stacks written by np.save with the float16
+# app.core.heatmap_store: bytes on disk, the latency of reading one label
+# (whole file load, memory map, read at the label offset) and the precision
+# lost, over synthetic (8, 7, 7) stacks.
+
+
+def timed(function, paths: list, label: int) -> float:
+    timings = []
+    for path in paths:
+        start = time.perf_counter()
+        function(path, label)
+        timings.append((time.perf_counter() - start) * 1e6)
+    return statistics.median(timings)
+
+
+def read_float64(path: str, label: int) -> np.ndarray:
+    # what get_heatmap did: load the whole stack to take one label
+    return np.load(path)[label]
+
+
+def read_mmap(path: str, label: int) -> np.ndarray:
+    return np.array(heatmap_store.load(path)[label], dtype=np.float32)
+
+
+def main(args) -> None:
+    rng = np.random.default_rng(0)
+    stacks = [rng.random((8, 7, 7)) for _ in range(args.count)]
+    with tempfile.TemporaryDirectory() as directory:
+        float64_paths, float16_paths = [], []
+        for i, stack in enumerate(stacks):
+            path = os.path.join(directory, f"{i}_float64_heatmap.npy")
+            np.save(path, stack)
+            float64_paths.append(path)
+            float16_paths.append(heatmap_store.save(os.path.join(directory, f"{i}_heatmap"), stack))
+
+        float64_bytes = sum(os.path.getsize(path) for path in float64_paths)
+        float16_bytes = sum(os.path.getsize(path) for path in float16_paths)
+        error = max(np.abs(heatmap_store.load(path).astype(np.float64) - stack).max() for path, stack in zip(float16_paths, stacks))
+
+        print(f"{args.count} stacks of (8, 7, 7)")
+        print(f"on disk: float64 {float64_bytes / args.count:.0f} B/stack, float16 {float16_bytes / args.count:.0f} B/stack")
+        print(f"read one label (median): float64 np.load {timed(read_float64, float64_paths, args.label):.1f} us, "
+              f"float16 mmap {timed(read_mmap, float16_paths, args.label):.1f} us, "
+              f"float16 load_label {timed(heatmap_store.load_label, float16_paths, args.label):.1f} us")
+        check = all(np.array_equal(heatmap_store.load_label(path, label), read_mmap(path, label)) for path in float16_paths[:10] for label in range(8))
+        print(f"load_label matches the memory map: {check}")
+        print(f"max abs error of float16: {error:.5f} (colormap step {1 / 255:.5f})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the float16 memory mapped heatmap store")
+    parser.add_argument("--count", type=int, default=2000)
+    parser.add_argument("--label", type=int, default=7)
+    main(parser.parse_args())
+
+'''
+Run with:
+python -m app.scripts.bench_heatmaps
+'''
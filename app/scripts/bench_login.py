@@ -0,0 +1,68 @@
+import argparse
+import asyncio
+import time
+import httpx
+from app.scripts.load_test import percentile
+
+# Measures POST /login throughput with concurrent clients against a running API
+# (python -m app) seeded with python -m app.scripts.seeds, and the latency
+# of GET /studies served alongside. Rejected logins (503 from the bounded
+# password pool) are counted separately.
+
+
+async def log_in(client: httpx.AsyncClient, username: str, password: str, latencies: list, counts: dict, stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        start = time.perf_counter()
+        response = await client.post("/login", json={"username": username, "password": password})
+        if response.status_code == 503:
+            counts["rejected"] += 1
+            await asyncio.sleep(float(response.headers.get("retry-after", 1)))
+            continue
+        response.raise_for_status()
+        counts["ok"] += 1
+        latencies.append((time.perf_counter() - start) * 1000)
+
+
+async def read_studies(client: httpx.AsyncClient, token: str, latencies: list, stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        start = time.perf_counter()
+        response = await client.get("/studies/", params={"limit": 10}, headers={"Authorization": f"Bearer {token}"})
+        response.raise_for_status()
+        latencies.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(0.1)
+
+
+async def main(args) -> None:
+    limits = httpx.Limits(max_connections=args.clients + 1)
+    async with httpx.AsyncClient(base_url=args.url, timeout=120, limits=limits) as client:
+        response = await client.post("/login", json={"username": args.username, "password": args.password})
+        response.raise_for_status()
+        token = response.json()["access_token"]
+
+        login_latencies, read_latencies = [], []
+        counts = {"ok": 0, "rejected": 0}
+        stop = asyncio.Event()
+        tasks = [asyncio.create_task(log_in(client, args.username, args.password, login_latencies, counts, stop)) for _ in range(args.clients)]
+        tasks.append(asyncio.create_task(read_studies(client, token, read_latencies, stop)))
+        await asyncio.sleep(args.duration)
+        stop.set()
+        await asyncio.gather(*tasks)
+
+    print(f"{args.clients} clients, {args.duration:.0f} s: {counts['ok'] / args.duration:.1f} logins/s, {counts['rejected']} rejected")
+    print(f"login: p50 {percentile(login_latencies, 50):.0f} ms, p95 {percentile(login_latencies, 95):.0f} ms, p99 {percentile(login_latencies, 99):.0f} ms")
+    print(f"GET /studies meanwhile: p50 {percentile(read_latencies, 50):.0f} ms, p95 {percentile(read_latencies, 95):.0f} ms, p99 {percentile(read_latencies, 99):.0f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark login throughput with concurrent clients")
+    parser.add_argument("--url", default="http://127.0.0.1:8000/api/v1")
+    parser.add_argument("--username", default="sabry")
+    parser.add_argument("--password", default="Aa123456*")
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=20.0)
+    asyncio.run(main(parser.parse_args()))
+
+'''
+Run against a running API with:
+python -m app.scripts.bench_login --clients 50 --duration 30
+'''
@@ -0,0 +1,37 @@
+import argparse
+import glob
+import os
+from app.core import heatmap_store
+
+# Rewrites the heatmap stacks saved before app.core.heatmap_store (float64
+# .npy files written by np.save) as float16. The paths do not change, so
+# Result.heatmap_path stays valid, and converted files are skipped on a rerun.
+
+
+def main(args) -> None:
+    converted, before, after = 0, 0, 0
+    for path in sorted(glob.glob(os.path.join(args.directory, "*_heatmap.npy"))):
+        size = os.path.getsize(path)
+        if args.dry_run:
+            rewritten = heatmap_store.load(path).dtype != heatmap_store.HEATMAP_DTYPE
+        else:
+            rewritten = heatmap_store.convert(path)
+        if rewritten:
+            converted += 1
+            before += size
+            after += os.path.getsize(path) if not args.dry_run else size
+            print(f"{'would convert' if args.dry_run else 'converted'} {path}")
+    print(f"{converted} heatmaps {'to convert' if args.dry_run else 'converted'}"
+          + ("" if args.dry_run else f", {before} -> {after} bytes"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert the float64 heatmap stacks to float16")
+    parser.add_argument("--directory", default="static/heatmaps")
+    parser.add_argument("--dry-run", action="store_true")
+    main(parser.parse_args())
+
+'''
+Run once after deploying with:
+python -m app.scripts.convert_heatmaps
+'''
@@ -0,0 +1,89 @@
+import argparse
+import asyncio
+import time
+import httpx
+
+# Measures GET /studies latency alone and while X-ray uploads and resizes run
+# concurrently, against a running API (python -m app) and worker
+# (python -m app.worker) seeded with python -m app.scripts.seeds.
+
+
+def percentile(values: list, p: float) -> float:
+    values = sorted(values)
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))
+    return values[index]
+
+
+async def login(client: httpx.AsyncClient, username: str, password: str) -> str:
+    response = await client.post("/login", json={"username": username, "password": password})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+async def read_studies(client: httpx.AsyncClient, latencies: list, stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        start = time.perf_counter()
+        response = await client.get("/studies/", params={"limit": 10})
+        response.raise_for_status()
+        latencies.append((time.perf_counter() - start) * 1000)
+
+
+async def upload_and_resize(client: httpx.AsyncClient, study_id: int, image: bytes, stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        response = await client.post(f"/studies/{study_id}/upload_image", files={"file": ("xray.jpg", image, "image/jpeg")})
+        response.raise_for_status()
+        # the resized image is made by the worker, 409 until it is ready
+        response = await client.get(f"/studies/{study_id}/download_resized_image")
+        while response.status_code == 409 and not stop.is_set():
+            await asyncio.sleep(float(response.headers.get("retry-after", 1)))
+            response = await client.get(f"/studies/{study_id}/download_resized_image")
+        if response.status_code != 409:
+            response.raise_for_status()
+
+
+async def run_phase(client: httpx.AsyncClient, readers: int, uploaders: int, study_id: int, image: bytes, duration: float) -> list:
+    latencies = []
+    stop = asyncio.Event()
+    tasks = [asyncio.create_task(read_studies(client, latencies, stop)) for _ in range(readers)]
+    tasks += [asyncio.create_task(upload_and_resize(client, study_id, image, stop)) for _ in range(uploaders)]
+    await asyncio.sleep(duration)
+    stop.set()
+    await asyncio.gather(*tasks)
+    return latencies
+
+
+def report(name: str, latencies: list) -> None:
+    print(f"{name}: {len(latencies)} requests, "
+          f"p50 {percentile(latencies, 50):.1f} ms, p95 {percentile(latencies, 95):.1f} ms, p99 {percentile(latencies, 99):.1f} ms")
+
+
+async def main(args) -> None:
+    with open(args.image, "rb") as f:
+        image = f.read()
+
+    async with httpx.AsyncClient(base_url=args.url, timeout=120) as client:
+        token = await login(client, args.username, args.password)
+        client.headers["Authorization"] = f"Bearer {token}"
+
+        report("GET /studies alone", await run_phase(client, args.readers, 0, args.study_id, image, args.duration))
+        report(f"GET /studies with {args.uploaders} uploaders", await run_phase(client, args.readers, args.uploaders, args.study_id, image, args.duration))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load test GET /studies while uploads and resizes run")
+    parser.add_argument("--url", default="http://127.0.0.1:8000/api/v1")
+    parser.add_argument("--username", default="sabry")
+    parser.add_argument("--password", default="Aa123456*")
+    parser.add_argument("--image", default="static/studies/1/xray.jpg")
+    parser.add_argument("--study-id", type=int, default=1)
+    parser.add_argument("--readers", type=int, default=10)
+    parser.add_argument("--uploaders", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=20.0)
+    asyncio.run(main(parser.parse_args()))
+
+'''
+Run against a running API with:
+python -m app.scripts.load_test --uploaders 10 --duration 30
+'''
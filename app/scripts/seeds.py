@@ -5,6 +5,7 @@ from app.models.employee import Employee
 from app.models.result import Result
 from app.models.template import Template
 from app.models.activity import Activity
+from app.models.job import Job
 from app.models.enums import GenderEnum, RoleEnum, ResultTypeEnum, StatusEnum, OccupationEnum
 from app.core.config import configs
 import bcrypt
@@ -17,7 +17,7 @@ class ActivityService:
     def __init__(self, activity_repo: ActivityRepository):
         self.activity_repo = activity_repo
     
-    def get_all(self, doctor_id: int,activity_type: ActivityEnum, limit: int, skip: int , sort: str) -> List[Activity]:
+    def get_all(self, doctor_id: int,activity_type: ActivityEnum, limit: int, skip: int , sort: str, cursor: Optional[str] = None) -> List[Activity]:
         """
         Retrieve a list of activities for a specific doctor.
 
@@ -27,11 +27,12 @@ class ActivityService:
             limit (int): The maximum number of activities to return.
             skip (int): The number of activities to skip for pagination.
             sort (str): The sorting criteria for the activities.
+            cursor (Optional[str]): Cursor returned with the previous page, to continue after it.
 
         Returns:
             List[Activity]: A list of activities matching the criteria.
         """
-        return self.activity_repo.get_all(doctor_id,activity_type, limit, skip, sort)
+        return self.activity_repo.get_all(doctor_id,activity_type, limit, skip, sort, cursor)
     
     def create(self,activity: dict) -> Activity:
         """
@@ -6,14 +6,22 @@ from app.repository.result import ResultRepository
 from app.models.study import Study
 from app.models.activity import Activity
 from app.models.result import Result
-from app.models.enums import StatusEnum, ActivityEnum, ResultTypeEnum
-from typing import List, Optional
+from app.models.enums import StatusEnum, ActivityEnum, ResultTypeEnum, JobStatusEnum
+from typing import List, Optional, Tuple, Union
 from datetime import datetime
 from app.core.config import configs
+from app.core.ai_client import ai_client, ModelResponseError
+from app.core.inference_cache import inference_cache
+from app.core.uploads import save_upload
+from app.core.images import save_decoded, render_heatmap_overlays, resize_and_pad_transform
+from app.core.image_pool import image_pool
+from app.core import heatmap_store, events
+from app.core.metrics import metrics
+from app.services.view_tracker import view_tracker
+import asyncio
+import base64
 import os
-import requests
 import cv2
-import albumentations as A
 import numpy as np
 
 
@@ -32,8 +40,29 @@ class AIService:
         self.study_repo = study_repo
         self.activity_repo = activity_repo
         self.result_repo = result_repo
+        # created on first use, on the event loop of the worker
+        self.session_lock: Optional[asyncio.Lock] = None
+
+    async def in_thread(self, function, *args):
+        """
+        Run the blocking database and file work of a job off the event loop.
+
+        The repositories share one session, so the calls of the jobs of a
+        batch take turns using it.
+
+        Args:
+            function (Callable): The blocking function.
+            *args: Its arguments.
+
+        Returns:
+            Any: The function result.
+        """
+        if self.session_lock is None:
+            self.session_lock = asyncio.Lock()
+        async with self.session_lock:
+            return await asyncio.to_thread(function, *args)
     
-    def get_all(self,type: ResultTypeEnum , limit: int, skip: int , sort: str) -> List[Result]:
+    def get_all(self,type: ResultTypeEnum , limit: int, skip: int , sort: str, cursor: Optional[str] = None) -> List[Result]:
         """
         Retrieve all results based on result type and pagination.
 
@@ -42,11 +71,12 @@ class AIService:
             limit (int): Maximum number of results to retrieve.
             skip (int): Number of results to skip for pagination.
             sort (str): Sorting order for the results.
+            cursor (Optional[str]): Cursor returned with the previous page, to continue after it.
 
         Returns:
             List[Result]: A list of results matching the criteria.
         """
-        return self.result_repo.get_all(type, limit, skip, sort)
+        return self.result_repo.get_all(type, limit, skip, sort, cursor)
     
     def create(self,result: dict) -> Result:
         """
@@ -103,7 +133,7 @@ class AIService:
         
     def show(self,id:int) ->  Optional[Result]:
         """
-        Retrieve a single result by its ID.
+        Retrieve a single result by its ID and record the view.
 
         Args:
             id (int): The ID of the result to retrieve.
@@ -111,8 +141,34 @@ class AIService:
         Returns:
             Optional[Result]: The retrieved result object, or None if not found.
         """
-        return self.result_repo.show(id)
+        result = self.result_repo.show(id)
+        if result:
+            view_tracker.track_result(id)
+        return result
     
+    def get_state(self, id: int) -> Optional[dict]:
+        """
+        Read the current job state of a result, sent first on its event stream.
+
+        Args:
+            id (int): The ID of the result.
+
+        Returns:
+            Optional[dict]: The result_id, state (job status) and is_ready, or None if not found.
+        """
+        result = self.result_repo.show(id)
+        if not result:
+            return None
+        state = {
+            "result_id": id,
+            "state": result.job_status.value if result.job_status else None,
+            "is_ready": bool(result.is_ready),
+            "at": datetime.utcnow().isoformat(),
+        }
+        # end the read transaction, an open stream holds no pooled connection
+        self.result_repo.db.close()
+        return state
+
     def get_results(self,study_id: int) -> List[Result]:
         """
         Retrieve all results associated with a specific study.
@@ -141,15 +197,34 @@ class AIService:
             return None
         return result
     
-    def calculate_severities(self) -> None:
+    async def calculate_severities(self) -> None:
         """
         Fetch new studies and calculate severity for each study
         that does not have an associated result or existing severity.
+        The heatmaps are requested in batches of configs.HEATMAP_BATCH_SIZE.
+        """
+        pending = await self.in_thread(self.pending_severities)
+
+        # calculate the severities
+        for i in range(0, len(pending), configs.HEATMAP_BATCH_SIZE):
+            try:
+                await self.run_heatmap_batch(pending[i:i + configs.HEATMAP_BATCH_SIZE])
+            except Exception as e:
+                # the results are kept, the next run picks them up again
+                print(e)
+
+    def pending_severities(self) -> List[Tuple[int, str]]:
+        """
+        Find or create the template results of the new studies without a severity.
+
+        Returns:
+            List[Tuple[int, str]]: Pairs of (result_id, xray_path) to run the heatmap model on.
         """
         # fetch new studies
         studies = self.study_repo.get_all(StatusEnum.new, 100, 0, None)
         
-        # calculate severity
+        # collect the studies that still need a severity
+        pending = []
         for study in studies:
             try:
                 if study.xray_path is None:
@@ -160,20 +235,21 @@ class AIService:
                 # fetch template result for the study
                 template_result = self.result_repo.get_result_by_study_type(study.id, ResultTypeEnum.template)
                 if template_result:
+                    # a result left by a failed model call is retried, unless a job already holds it
+                    if not template_result.is_ready and template_result.job_status not in (JobStatusEnum.queued, JobStatusEnum.running):
+                        pending.append((template_result.id, template_result.xray_path))
                     continue
                 # create a new result
-                result = Result(result_name="Template", type=ResultTypeEnum.template, study_id=study.id)
+                result = Result(result_name="Template", type=ResultTypeEnum.template, study_id=study.id, xray_path=study.xray_path)
                 result = self.result_repo.create(result)
-                result.xray_path = study.xray_path
-                result.is_ready = True
-                # calculate the severity
-                self.run_heatmap(result.id, result.xray_path)
+                pending.append((result.id, result.xray_path))
             except Exception as e:
                 print(e)
                 continue
+        return pending
     
 
-    def run_heatmap(self , result_id: int, xray_path: str) -> Result:
+    async def run_heatmap(self , result_id: int, xray_path: str) -> Result:
         """
         Generate a heatmap using the AI model and save the results.
 
@@ -183,59 +259,171 @@ class AIService:
 
         Returns:
             Result: The updated result object.
+
+        Raises:
+            CircuitOpenError: If the model is known to be down, the result is kept for a retry.
+            httpx.TransportError: If the model could not be reached, the result is kept for a retry.
+            ModelResponseError: If the model answered with an error, retried only if transient.
         """
+        endpoint = "/heatmap/generate_heatmap"
+        # reuse the output of an identical image
+        digest = await asyncio.to_thread(inference_cache.file_digest, xray_path)
+        output = await asyncio.to_thread(inference_cache.get_json, endpoint, digest)
+        if output is not None:
+            return await self.save_heatmap(result_id, output)
+
         # send the xray image to the AI model
-        url = configs.AI_MODEL_URL+"/heatmap/generate_heatmap"
+        await asyncio.to_thread(events.publish, result_id, "sent", "heatmap")
+        response = await ai_client.post_files(endpoint, [xray_path])
+        if response.status_code != 200:
+            raise ModelResponseError(endpoint, response.status_code)
+
+        # save the heatmap
+        output = response.json()
+        await asyncio.to_thread(inference_cache.put_json, endpoint, digest, output)
+        return await self.save_heatmap(result_id, output)
+
+    async def run_heatmap_batch(self, items: List[Tuple[int, str]]) -> List[Optional[Result]]:
+        """
+        Generate heatmaps for several X-rays with a single AI model call.
+
+        Args:
+            items (List[Tuple[int, str]]): Pairs of (result_id, xray_path).
 
-        files = {'image': open(xray_path, 'rb')}
+        Returns:
+            List[Optional[Result]]: The updated results in the order of `items`,
+            None where saving failed.
 
+        Raises:
+            CircuitOpenError: If the model is known to be down, the results are kept for a retry.
+            httpx.TransportError: If the model could not be reached, the results are kept for a retry.
+            ModelResponseError: If the model answered with an error, retried only if transient.
+        """
+        if not items:
+            return []
+
+        # batch outputs are per image and identical to the single endpoint, share its cache entries
+        endpoint = "/heatmap/generate_heatmap"
+        # only send the images whose output is not cached
+        digests = [await asyncio.to_thread(inference_cache.file_digest, xray_path) for _, xray_path in items]
+        outputs = [await asyncio.to_thread(inference_cache.get_json, endpoint, digest) for digest in digests]
+        misses = [i for i, output in enumerate(outputs) if output is None]
+
+        if misses:
+            # send the missing xray images to the AI model in one multipart request
+            for i in misses:
+                await asyncio.to_thread(events.publish, items[i][0], "sent", "heatmap")
+            response = await ai_client.post_files("/heatmap/generate_heatmap_batch", [items[i][1] for i in misses], field="images")
+            if response.status_code != 200:
+                raise ModelResponseError("/heatmap/generate_heatmap_batch", response.status_code)
+
+            batch_outputs = response.json()["results"]
+            if len(batch_outputs) != len(misses):
+                # outputs cannot be matched to their images, the jobs retry them
+                print(f"Heatmap batch answered {len(batch_outputs)} outputs for {len(misses)} images")
+                metrics.inc("ai.heatmap.generate_heatmap_batch.mismatched")
+                return [None] * len(items)
+
+            # fan the per image outputs back to their results
+            for i, output in zip(misses, batch_outputs):
+                await asyncio.to_thread(inference_cache.put_json, endpoint, digests[i], output)
+                outputs[i] = output
+
+        # the overlays of the batch are rendered in parallel on the image pool
+        saved = await asyncio.gather(*[self.save_heatmap(result_id, output) for (result_id, _), output in zip(items, outputs)], return_exceptions=True)
+        results = []
+        for (result_id, _), result in zip(items, saved):
+            if isinstance(result, Exception):
+                # the result is kept, the job retries it
+                print(result)
+                result = None
+            results.append(result)
+        return results
+
+    async def save_heatmap(self, result_id: int, output: dict) -> Result:
+        """
+        Persist the heatmap model output of one X-ray to its result and study,
+        rendering its overlays on the image pool.
+
+        Args:
+            result_id (int): The ID of the result to update.
+            output (dict): The model output with heatmap, labels, confidence, severity and report.
+
+        Returns:
+            Result: The updated result object.
+        """
+        xray_path = await self.in_thread(self.write_heatmap, result_id, output)
+
+        # precompute the overlays so viewing a label is only a file send
         try:
-            response = requests.post(url, files=files, timeout=120)
-
-            print(response.status_code)
-
-            # if successful, save the heatmap
-            if response.status_code == 200:
-
-                response = response.json()
-                heatmap = response["heatmap"] # numpy array of shape(8.7,7)
-                labels = response["labels"] 
-                confidence = response["confidence"]
-                severity = response["severity"]
-                report = response["report"]
-
-                # save the heatmap of shape (8.7,7) in correct format
-                heatmap_path = f"static/heatmaps/{result_id}_heatmap"
-                os.makedirs(os.path.dirname(heatmap_path), exist_ok=True)
-                np.save(heatmap_path, heatmap)
-
-                # save the report
-                report_path = f"static/reports/{result_id}_report.txt"
-                os.makedirs(os.path.dirname(report_path), exist_ok=True)
-                with open(report_path, "w") as f:
-                    f.write(report)
-
-                # save the labels and confidence
-                result = self.result_repo.show(result_id)
-                result.confidence = confidence
-                result.labels = labels
-                result.heatmap_path = heatmap_path
-                result.report_path = report_path
-                result.last_edited_at = datetime.utcnow()
-                result.last_view_at = datetime.utcnow()
-                result.is_ready = True
-                # save severity in study of the result
-                study = self.study_repo.show(result.study_id)
-                study.severity = severity
-                self.study_repo.update(study)
-                self.result_repo.update(result)
-                print("Heatmap saved")
+            await self.render_heatmaps_async(result_id, xray_path, output["heatmap"])
         except Exception as e:
             print(e)
-            # delete the result
-            self.result_repo.destroy(result_id)
 
-    def denoise(self, result_id: int, xray_path: str) -> Result:
+        return await self.in_thread(self.store_heatmap, result_id, output)
+
+    def write_heatmap(self, result_id: int, output: dict) -> str:
+        """
+        Write the heatmap and report files of a heatmap model output.
+
+        Args:
+            result_id (int): The ID of the result.
+            output (dict): The model output.
+
+        Returns:
+            str: The X-ray path of the result, the overlays are drawn on it.
+        """
+        # save the heatmap of shape (8.7,7) as float16
+        heatmap_store.save(f"static/heatmaps/{result_id}_heatmap", output["heatmap"])
+
+        # save the report
+        report_path = f"static/reports/{result_id}_report.txt"
+        os.makedirs(os.path.dirname(report_path), exist_ok=True)
+        with open(report_path, "w") as f:
+            f.write(output["report"])
+
+        return self.result_repo.show(result_id).xray_path
+
+    def store_heatmap(self, result_id: int, output: dict) -> Result:
+        """
+        Record a heatmap model output, written by write_heatmap, on its result and study.
+
+        Args:
+            result_id (int): The ID of the result to update.
+            output (dict): The model output.
+
+        Returns:
+            Result: The updated result object.
+        """
+        labels = output["labels"]
+        confidence = output["confidence"]
+        severity = output["severity"]
+        report = output["report"]
+        heatmap_path = f"static/heatmaps/{result_id}_heatmap"
+        report_path = f"static/reports/{result_id}_report.txt"
+
+        result = self.result_repo.show(result_id)
+
+        # save the labels and confidence
+        result.confidence = confidence
+        result.labels = labels
+        result.heatmap_path = heatmap_path
+        result.report_path = report_path
+        result.report_text = report
+        result.last_edited_at = datetime.utcnow()
+        result.last_view_at = datetime.utcnow()
+        result.is_ready = True
+
+        # save severity in study of the result
+        study = self.study_repo.show(result.study_id)
+        study.severity = severity
+        self.study_repo.update(study)
+        self.result_repo.update(result)
+        events.publish(result_id, "stored", "heatmap")
+        print("Heatmap saved")
+        return result
+
+    async def denoise(self, result_id: int, xray_path: str) -> Result:
         """
         Denoise the X-ray image using the AI model.
 
@@ -245,44 +433,70 @@ class AIService:
 
         Returns:
             Result: The updated result object.
+
+        Raises:
+            CircuitOpenError: If the model is known to be down, the result is kept for a retry.
+            httpx.TransportError: If the model could not be reached, the result is kept for a retry.
+            ModelResponseError: If the model answered with an error, retried only if transient.
         """
+        endpoint = "/x_reporto/denoise"
+        # reuse the output of an identical image
+        digest = await asyncio.to_thread(inference_cache.file_digest, xray_path)
+        content = await asyncio.to_thread(inference_cache.get_bytes, endpoint, digest)
+        if content is not None:
+            return await self.save_denoised(result_id, content)
+
         # send the xray image to the AI model
-        url = configs.AI_MODEL_URL+"/x_reporto/denoise"
+        await asyncio.to_thread(events.publish, result_id, "sent", "denoise")
+        response = await ai_client.post_files(endpoint, [xray_path])
+        if response.status_code != 200:
+            raise ModelResponseError(endpoint, response.status_code)
 
-        files = {'image': open(xray_path, 'rb')}
+        # save the denoised image, the response is the encoded file
+        await asyncio.to_thread(inference_cache.put_bytes, endpoint, digest, response.content)
+        return await self.save_denoised(result_id, response.content)
 
-        try:
-            response = requests.post(url, files=files, timeout=120)
-
-            print(response.status_code)
-
-            # if successful, save the heatmap
-            if response.status_code == 200:
-                
-                # response is file like object
-                response = response.content
-                nparr = np.frombuffer(response, np.uint8)
-                denoised_image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-
-                # save the heatmap of shape (8.7,7) as an image
-                denoised_path = f"static/denoised/{result_id}_denoised.png"
-                os.makedirs(os.path.dirname(denoised_path), exist_ok=True)
-                cv2.imwrite(denoised_path, denoised_image)
-
-                # save the labels and confidence
-                result = self.result_repo.show(result_id)
-                result.xray_path = denoised_path
-                result.last_edited_at = datetime.utcnow()
-                result.last_view_at = datetime.utcnow()
-                result.is_ready = True
-
-                self.result_repo.update(result)
-                print("Denoised image saved")
-        except Exception as e:
-            print(e)
-            # delete the result
-            self.result_repo.destroy(result_id)
-    def run_llm(self , result_id: int, xray_path: str) -> Result:
+    async def save_denoised(self, result_id: int, content: bytes) -> Result:
+        """
+        Persist the denoised X-ray returned by the AI model to its result,
+        decoding and encoding it on the image pool.
+
+        Args:
+            result_id (int): The ID of the result to update.
+            content (bytes): The encoded denoised image.
+
+        Returns:
+            Result: The updated result object.
+        """
+        # save the denoised image
+        denoised_path = await image_pool.run_async(save_decoded, content, f"static/denoised/{result_id}_denoised.png")
+
+        return await self.in_thread(self.store_denoised, result_id, denoised_path)
+
+    def store_denoised(self, result_id: int, denoised_path: str) -> Result:
+        """
+        Record the path of the denoised X-ray on its result.
+
+        Args:
+            result_id (int): The ID of the result to update.
+            denoised_path (str): The path of the saved denoised image.
+
+        Returns:
+            Result: The updated result object.
+        """
+        # save the path of the denoised image
+        result = self.result_repo.show(result_id)
+        result.xray_path = denoised_path
+        result.last_edited_at = datetime.utcnow()
+        result.last_view_at = datetime.utcnow()
+        result.is_ready = True
+
+        self.result_repo.update(result)
+        events.publish(result_id, "stored", "denoise")
+        print("Denoised image saved")
+        return result
+
+    async def run_llm(self , result_id: int, xray_path: str) -> Result:
         """
         Run the large language model to generate a report from the X-ray image.
 
@@ -292,61 +506,145 @@ class AIService:
 
         Returns:
             Result: The updated result object.
+
+        Raises:
+            CircuitOpenError: If the model is known to be down, the result is kept for a retry.
+            httpx.TransportError: If the model could not be reached, the result is kept for a retry.
+            ModelResponseError: If the model answered with an error, retried only if transient.
         """
+        endpoint = "/x_reporto/report"
+        # reuse the output of an identical image
+        digest = await asyncio.to_thread(inference_cache.file_digest, xray_path)
+        output = await asyncio.to_thread(inference_cache.get_json, endpoint, digest)
+        if output is not None:
+            return await self.in_thread(self.save_report, result_id, output)
+
         # send the xray image to the AI model
-        url = configs.AI_MODEL_URL+"/x_reporto/report"
+        await asyncio.to_thread(events.publish, result_id, "sent", "llm")
+        response = await ai_client.post_files(endpoint, [xray_path])
+        if response.status_code != 200:
+            raise ModelResponseError(endpoint, response.status_code)
 
-        files = {'image': open(xray_path, 'rb')}
-        try:
-            response = requests.post(url, files=files, timeout=120)
-            print(response.status_code)
-
-            # if successful, save the report and heatmap
-            if response.status_code == 200:
-
-                response = response.json()
-                bounding_boxes = response["bounding_boxes"]
-                report_text = response["report_text"]
-                class_labels = response["detected_classes"]
-                boxes_sentences = response["lm_sentences_decoded"]
-
-
-                # save the report
-                report_path = f"static/reports/{result_id}_report.txt"
-                os.makedirs(os.path.dirname(report_path), exist_ok=True)
-                with open(report_path, "w") as f:
-                    f.write(report_text)
-
-                # save bounding boxes array of arrays of floats in region_path along with class labels in correct format that can be read in two arrays
-                region_path = f"static/regions/{result_id}_region.txt"
-                os.makedirs(os.path.dirname(region_path), exist_ok=True)
-                with open(region_path, "w") as f:
-                    for i, box in enumerate(bounding_boxes):
-                        f.write(f"{class_labels[i]} {box[0]} {box[1]} {box[2] - box[0]} {box[3] - box[1]}\n")
-                
-                # save the boxes sentences
-                boxes_sentences_path = f"static/boxes_sentences/{result_id}_boxes_sentences.txt"
-                os.makedirs(os.path.dirname(boxes_sentences_path), exist_ok=True)
-                with open(boxes_sentences_path, "w") as f:
-                    for i, sentence in enumerate(boxes_sentences):
-                        f.write(f"{sentence}\n")
-                # fetch the result
-                result = self.result_repo.show(result_id)
-                # save path to report and region
-                result.report_path = report_path
-                result.region_path = region_path
-                result.region_sentence_path = boxes_sentences_path
-                result.last_edited_at = datetime.utcnow()
-                result.last_view_at = datetime.utcnow()
-
-                # save in the database
-                self.result_repo.update(result)
-
-                print("Report saved")
-        except Exception as e:
-            print(e)
-            # delete the result
-            self.result_repo.destroy(result_id)
+        # save the report and regions
+        output = response.json()
+        await asyncio.to_thread(inference_cache.put_json, endpoint, digest, output)
+        return await self.in_thread(self.save_report, result_id, output)
+
+    async def run_analysis(self, result_id: int, xray_path: str) -> Result:
+        """
+        Generate the report, regions, region sentences and denoised image of
+        an X-ray with a single AI model call, so the image is uploaded and
+        decoded by the model once instead of once for run_llm and once for
+        denoise. Model servers without the combined endpoint get the two
+        separate calls.
+
+        Args:
+            result_id (int): The ID of the result to update.
+            xray_path (str): The path to the X-ray image.
+
+        Returns:
+            Result: The updated result object.
+
+        Raises:
+            CircuitOpenError: If the model is known to be down, the result is kept for a retry.
+            httpx.TransportError: If the model could not be reached, the result is kept for a retry.
+            ModelResponseError: If the model answered with an error, retried only if transient.
+        """
+        # the outputs are cached under the separate endpoints, shared with run_llm and denoise
+        digest = await asyncio.to_thread(inference_cache.file_digest, xray_path)
+        output = await asyncio.to_thread(inference_cache.get_json, "/x_reporto/report", digest)
+        content = await asyncio.to_thread(inference_cache.get_bytes, "/x_reporto/denoise", digest)
+
+        if output is None or content is None:
+            endpoint = "/x_reporto/analyze"
+            response = None
+            if ai_client.supports(endpoint):
+                # send the xray image to the AI model once
+                await asyncio.to_thread(events.publish, result_id, "sent", "analyze")
+                response = await ai_client.post_files(endpoint, [xray_path])
+                if response.status_code in (404, 405):
+                    # remembered, the next analyses skip the failed round trip
+                    ai_client.mark_unsupported(endpoint)
+                    response = None
+                elif response.status_code != 200:
+                    raise ModelResponseError(endpoint, response.status_code)
+
+            if response is None:
+                # a model server without the combined endpoint
+                await self.run_llm(result_id, xray_path)
+                return await self.denoise(result_id, xray_path)
+
+            # the denoised image comes base64 encoded next to the report
+            output = response.json()
+            content = base64.b64decode(output.pop("denoised_image"))
+            output.pop("denoised_media_type", None)
+            await asyncio.to_thread(inference_cache.put_json, "/x_reporto/report", digest, output)
+            await asyncio.to_thread(inference_cache.put_bytes, "/x_reporto/denoise", digest, content)
+
+        await self.in_thread(self.save_report, result_id, output)
+        return await self.save_denoised(result_id, content)
+
+    def save_report(self, result_id: int, output: dict) -> Result:
+        """
+        Persist the report, regions and region sentences generated by the AI model.
+
+        Args:
+            result_id (int): The ID of the result to update.
+            output (dict): The model output with bounding_boxes, report_text,
+                detected_classes and lm_sentences_decoded.
+
+        Returns:
+            Result: The updated result object.
+        """
+        bounding_boxes = output["bounding_boxes"]
+        report_text = output["report_text"]
+        class_labels = output["detected_classes"]
+        boxes_sentences = output["lm_sentences_decoded"]
+
+        # build the regions first, a malformed output fails before any file is written
+        regions = [
+            {"label": self.region_label(class_labels[i]), "x": box[0], "y": box[1], "width": box[2] - box[0], "height": box[3] - box[1]}
+            for i, box in enumerate(bounding_boxes)
+        ]
+
+        # save the report
+        report_path = f"static/reports/{result_id}_report.txt"
+        os.makedirs(os.path.dirname(report_path), exist_ok=True)
+        with open(report_path, "w") as f:
+            f.write(report_text)
+
+        # save bounding boxes array of arrays of floats in region_path along with class labels in correct format that can be read in two arrays
+        region_path = f"static/regions/{result_id}_region.txt"
+        os.makedirs(os.path.dirname(region_path), exist_ok=True)
+        with open(region_path, "w") as f:
+            for region in regions:
+                f.write(f"{region['label']} {region['x']} {region['y']} {region['width']} {region['height']}\n")
+        
+        # save the boxes sentences
+        boxes_sentences_path = f"static/boxes_sentences/{result_id}_boxes_sentences.txt"
+        os.makedirs(os.path.dirname(boxes_sentences_path), exist_ok=True)
+        with open(boxes_sentences_path, "w") as f:
+            for i, sentence in enumerate(boxes_sentences):
+                f.write(f"{sentence}\n")
+        # fetch the result
+        result = self.result_repo.show(result_id)
+        # save path to report and region
+        result.report_path = report_path
+        result.region_path = region_path
+        result.region_sentence_path = boxes_sentences_path
+        # the same content as structured columns, served by GET /results/{id}/regions
+        result.report_text = report_text
+        result.regions = regions
+        result.region_sentences = list(boxes_sentences)
+        result.last_edited_at = datetime.utcnow()
+        result.last_view_at = datetime.utcnow()
+
+        # save in the database
+        self.result_repo.update(result)
+        events.publish(result_id, "stored", "llm")
+
+        print("Report saved")
+        return result
     
     def upload_report(self,result: Result, report: UploadFile) -> Result:
         """
@@ -361,10 +659,12 @@ class AIService:
         """
         # save the report
         report_path = f"static/reports/{result.id}_report.txt"
-        with open(report_path, "wb") as f:
-            f.write(report.file.read())
+        save_upload(report, report_path, int(configs.MAX_UPLOAD_SIZE))
         
         result.report_path = report_path
+        # stored parsed, GET /results/{id}/regions is a read
+        with open(report_path, errors="replace") as f:
+            result.report_text = f.read()
         result.last_edited_at = datetime.utcnow()
         result.last_view_at = datetime.utcnow()
         return self.result_repo.update(result)
@@ -387,11 +687,6 @@ class AIService:
         - blended_image: numpy.ndarray
             The blended image of size (224, 224, 3) in BGR format, which is a weighted sum of the resized image and the heatmap.
         '''
-        resize_and_pad_transform = A.Compose([
-            A.LongestMaxSize(max_size=224, interpolation=cv2.INTER_AREA),
-            A.PadIfNeeded(min_height=224, min_width=224, border_mode=cv2.BORDER_CONSTANT, value=0)
-        ])
-
         # Resize Image to be HEAT_MAP_IMAGE_SIZExHEAT_MAP_IMAGE_SIZEx3 (224x224x3)
         # image_resized = cv2.resize(image, (HEAT_MAP_IMAGE_SIZE, HEAT_MAP_IMAGE_SIZE)) #(224, 224, 3)
         image_resized = resize_and_pad_transform(image=image)["image"]
@@ -414,20 +709,74 @@ class AIService:
 
         return image_resized,heatmap_resized,blended_image
 
-    def get_heatmap(self,result_id: int, label: int) -> np.ndarray:
+    def blended_heatmap_path(self, result_id: int, label: int) -> str:
         """
-        Overlays a heatmap onto an image.
+        Path of the precomputed overlay of one heatmap label.
 
         Args:
-            image (np.ndarray): Original BGR image of shape (2544, 3056, 3).
-            heat_map (np.ndarray): Heatmap of shape (7, 7) with normalized values [0, 1].
+            result_id (int): The ID of the result.
+            label (int): The heatmap label (0-7).
+
+        Returns:
+            str: The path of the blended PNG.
+        """
+        return f"static/heatmaps/{result_id}_blended_{label}.png"
+
+    def render_heatmaps(self, result_id: int, xray_path: str, heatmaps) -> List[str]:
+        """
+        Blend every heatmap label onto the X-ray and save the overlays, on the
+        image pool (see app.core.images.render_heatmap_overlays).
+
+        Args:
+            result_id (int): The ID of the result the heatmaps belong to.
+            xray_path (str): The path to the X-ray image.
+            heatmaps: The heatmap stack of shape (8, 7, 7) with values in [0, 1].
+
+        Returns:
+            List[str]: The paths of the blended images, indexed by label.
+        """
+        paths = [self.blended_heatmap_path(result_id, label) for label in range(len(heatmaps))]
+        return image_pool.run(render_heatmap_overlays, xray_path, heatmaps, paths)
+
+    async def render_heatmaps_async(self, result_id: int, xray_path: str, heatmaps) -> List[str]:
+        """
+        Same as render_heatmaps, without blocking the event loop.
+
+        Args:
+            result_id (int): The ID of the result the heatmaps belong to.
+            xray_path (str): The path to the X-ray image.
+            heatmaps: The heatmap stack of shape (8, 7, 7) with values in [0, 1].
 
         Returns:
-            tuple: A tuple containing:
-                - image_resized (np.ndarray): The resized original image (224, 224, 3).
-                - heatmap_resized (np.ndarray): The resized heatmap (224, 224, 3).
-                - blended_image (np.ndarray): The blended image (224, 224, 3).
+            List[str]: The paths of the blended images, indexed by label.
         """
+        paths = [self.blended_heatmap_path(result_id, label) for label in range(len(heatmaps))]
+        return await image_pool.run_async(render_heatmap_overlays, xray_path, heatmaps, paths)
+
+    def get_heatmap(self,result_id: int, label: int) -> str:
+        """
+        Get the overlay of one heatmap label on the X-ray.
+
+        The overlays are rendered when the heatmap result is saved, results
+        saved before that are rendered on first access.
+
+        Args:
+            result_id (int): The ID of the result.
+            label (int): The heatmap label (0-7).
+
+        Returns:
+            str: The path of the blended image (224, 224, 3).
+
+        Raises:
+            HTTPException: If the label is invalid, or the result, its heatmap or the label is not found.
+        """
+        if label < 0:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,detail="Invalid label")
+
+        blended_path = self.blended_heatmap_path(result_id, label)
+        if os.path.exists(blended_path):
+            return blended_path
+
         # get the result
         result = self.result_repo.show(result_id)
         if not result:
@@ -437,20 +786,11 @@ class AIService:
         if not result.heatmap_path:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,detail="Heatmap not found")
         
-        # load the heatmap
-        heatmap = np.load(result.heatmap_path+".npy")
-
-        # load image
-        xray = cv2.imread(result.xray_path, cv2.IMREAD_COLOR)
-
-        # project the heatmap on the xray
-        _, _, blended_image = self.project_heatmap(xray, heatmap[label])
-
-        #save the blended image
-        blended_path = f"static/heatmaps/{result_id}_blended_{label}.png"
-        cv2.imwrite(blended_path, blended_image)
-
-        return blended_path
+        # load the heatmap and render all the overlays
+        heatmap = heatmap_store.load(result.heatmap_path)
+        if label >= len(heatmap):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,detail=f"Heatmap label {label} not found")
+        return self.render_heatmaps(result_id, result.xray_path, heatmap)[label]
 
     def upload_boxes(self,result: Result, boxes: UploadFile) -> Result:
         """
@@ -465,10 +805,11 @@ class AIService:
         """
         # save the boxes
         region_path = f"static/regions/{result.id}_region.txt"
-        with open(region_path, "wb") as f:
-            f.write(boxes.file.read())
+        save_upload(boxes, region_path, int(configs.MAX_UPLOAD_SIZE))
         
         result.region_path = region_path
+        # stored parsed, GET /results/{id}/regions is a read
+        result.regions = self.read_regions_file(region_path)
         result.last_edited_at = datetime.utcnow()
         result.last_view_at = datetime.utcnow()
         return self.result_repo.update(result)
@@ -486,10 +827,103 @@ class AIService:
         """
         # save the boxes
         boxes_sentences_path = f"static/boxes_sentences/{result.id}_boxes_sentences.txt"
-        with open(boxes_sentences_path, "wb") as f:
-            f.write(sentences.file.read())
+        save_upload(sentences, boxes_sentences_path, int(configs.MAX_UPLOAD_SIZE))
         
         result.region_sentence_path = boxes_sentences_path
+        # stored parsed, GET /results/{id}/regions is a read
+        result.region_sentences = self.read_lines_file(boxes_sentences_path)
         result.last_edited_at = datetime.utcnow()
         result.last_view_at = datetime.utcnow()
-        return self.result_repo.update(result)
\ No newline at end of file
+        return self.result_repo.update(result)
+
+    def get_regions(self, result: Result) -> dict:
+        """
+        Get the regions, region sentences and report text of a result.
+
+        They are stored on the row when the AI model output is saved or the
+        files are uploaded. Results saved before that have their files parsed
+        here without writing, app/scripts/backfill_regions.py stores them.
+
+        Args:
+            result (Result): The result to get the regions of.
+
+        Returns:
+            dict: The result ID, regions (label and box), sentences and report text.
+        """
+        parsed = self.read_region_files(result)
+        return {
+            "result_id": result.id,
+            "regions": parsed.get("regions", result.regions) or [],
+            "sentences": parsed.get("region_sentences", result.region_sentences) or [],
+            "report_text": parsed.get("report_text", result.report_text),
+        }
+
+    def read_region_files(self, result: Result) -> dict:
+        """
+        Parse the region, region sentence and report files of a result whose
+        content is not stored on the row.
+
+        Args:
+            result (Result): The result to read the files of.
+
+        Returns:
+            dict: The parsed regions, region_sentences and report_text, only those missing on the row.
+        """
+        parsed = {}
+        if result.regions is None and result.region_path and os.path.exists(result.region_path):
+            parsed["regions"] = self.read_regions_file(result.region_path)
+        if result.region_sentences is None and result.region_sentence_path and os.path.exists(result.region_sentence_path):
+            parsed["region_sentences"] = self.read_lines_file(result.region_sentence_path)
+        if result.report_text is None and result.report_path and os.path.exists(result.report_path):
+            with open(result.report_path, errors="replace") as f:
+                parsed["report_text"] = f.read()
+        return parsed
+
+    def read_regions_file(self, path: str) -> List[dict]:
+        """
+        Parse a region file of "label x y width height" lines.
+
+        Args:
+            path (str): The path of the region file.
+
+        Returns:
+            List[dict]: The regions, malformed lines are skipped.
+        """
+        regions = []
+        with open(path, errors="replace") as f:
+            for line in f:
+                fields = line.split()
+                try:
+                    label, x, y, width, height = self.region_label(fields[0]), *map(float, fields[1:5])
+                except (ValueError, IndexError):
+                    continue
+                regions.append({"label": label, "x": x, "y": y, "width": width, "height": height})
+        return regions
+
+    def region_label(self, label: Union[int, float, str]) -> Union[int, str]:
+        """
+        Normalize a region class label, numeric labels become ints.
+
+        Args:
+            label (Union[int, float, str]): The label as returned by the model or read from a file.
+
+        Returns:
+            Union[int, str]: The label as an int if it is numeric, else unchanged.
+        """
+        try:
+            return int(float(label))
+        except (TypeError, ValueError, OverflowError):
+            return label
+
+    def read_lines_file(self, path: str) -> List[str]:
+        """
+        Parse a file of one sentence per line.
+
+        Args:
+            path (str): The path of the file.
+
+        Returns:
+            List[str]: The sentences, without their line breaks.
+        """
+        with open(path, errors="replace") as f:
+            return [line.rstrip("\n") for line in f]
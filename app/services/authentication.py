@@ -9,7 +9,7 @@ from app.schemas.authentication import TokenData
 from fastapi import HTTPException, Security
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from app.core.config import configs
-import bcrypt
+from app.core.password_pool import password_pool
 
 
 security = HTTPBearer()
@@ -90,19 +90,23 @@ class AuthenticationService:
     
     def encrypt_password(self, password: str) -> str:
         """
-        Encrypt a password using bcrypt.
+        Encrypt a password using bcrypt, on the bounded password pool.
 
         Args:
             password (str): The password to encrypt.
 
         Returns:
             str: The hashed password.
+
+        Raises:
+            HTTPException: 503 if the password pool is saturated.
         """
-        return bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
+        self._release_connection()
+        return password_pool.hash(password)
     
     def verify_password(self, password: str, hashed_password: str) -> bool:
         """
-        Verify a password against a hashed password.
+        Verify a password against a hashed password, on the bounded password pool.
 
         Args:
             password (str): The plaintext password.
@@ -110,12 +114,23 @@ class AuthenticationService:
 
         Returns:
             bool: True if the passwords match, otherwise False.
+
+        Raises:
+            HTTPException: 503 if the password pool is saturated.
         """
+        self._release_connection()
         try:
-            return bcrypt.checkpw(password.encode(), hashed_password.encode())
+            return password_pool.verify(password, hashed_password)
+        except HTTPException:
+            raise
         except:
             return False
 
+    def _release_connection(self) -> None:
+        # return the pooled connection (and end the read transaction) before a slow hash,
+        # loaded objects stay usable and the session reconnects on its next query
+        self.employee_repo.db.close()
+
     @staticmethod
     def decrypt_token(token: str) -> dict:
         """
@@ -3,6 +3,7 @@ from fastapi import HTTPException,status
 from app.repository.employee import EmployeeRepository
 from app.models.employee import Employee
 from app.models.enums import OccupationEnum
+from app.core.cache import employee_cache
 from typing import List, Optional
 
 
@@ -18,7 +19,7 @@ class EmployeeService:
     def __init__(self, employee_repo: EmployeeRepository):
         self.employee_repo = employee_repo
     
-    def get_all(self,type: OccupationEnum, limit: int, skip: int, sort: str) -> List[Employee]:
+    def get_all(self,type: OccupationEnum, limit: int, skip: int, sort: str, cursor: Optional[str] = None) -> List[Employee]:
         """
         Retrieve all employees based on occupation type and pagination.
 
@@ -27,11 +28,12 @@ class EmployeeService:
             limit (int): The maximum number of employees to retrieve.
             skip (int): The number of employees to skip for pagination.
             sort (str): The sorting order for the employees.
+            cursor (Optional[str]): Cursor returned with the previous page, to continue after it.
 
         Returns:
             List[Employee]: A list of all employees matching the criteria.
         """
-        return self.employee_repo.get_all(type, limit, skip, sort)
+        return self.employee_repo.get_all(type, limit, skip, sort, cursor)
     
     def create(self,employee: dict) -> Employee:
         """
@@ -57,7 +59,9 @@ class EmployeeService:
         Returns:
             bool: True if the deletion was successful, otherwise False.
         """
-        return self.employee_repo.destroy(id)
+        deleted = self.employee_repo.destroy(id)
+        employee_cache.delete(id)
+        return deleted
     
     def update(self,id:int,employee_data:dict) -> Employee:
         """
@@ -81,6 +85,8 @@ class EmployeeService:
             setattr(employee,key,value)
             
         self.employee_repo.update(employee)
+        # the role or type may have changed
+        employee_cache.delete(id)
         return employee
     
     def show(self,id:int) -> Optional[Employee]:
@@ -0,0 +1,66 @@
+from fastapi import HTTPException,status
+from app.repository.job import JobRepository
+from app.models.job import Job
+from app.models.enums import JobTypeEnum
+from typing import Optional
+
+
+
+class JobService:
+    """
+    Service layer for queueing AI inference and image processing jobs that are executed
+    by the worker process (python -m app.worker).
+
+    Attributes:
+        job_repo (JobRepository): Repository for job operations.
+    """
+    def __init__(self, job_repo: JobRepository):
+        self.job_repo = job_repo
+
+    def enqueue(self, type: JobTypeEnum, result_id: Optional[int] = None, xray_path: Optional[str] = None, study_id: Optional[int] = None) -> Job:
+        """
+        Persist a new queued job for the worker to pick up.
+
+        Args:
+            type (JobTypeEnum): The kind of inference to run.
+            result_id (Optional[int]): The result the job fills in, if any.
+            xray_path (Optional[str]): The path to the X-ray image.
+            study_id (Optional[int]): The study the job works on, if any.
+
+        Returns:
+            Job: The queued job.
+        """
+        job = Job(type=type, result_id=result_id, xray_path=xray_path, study_id=study_id)
+        return self.job_repo.create(job)
+
+    def enqueue_once(self, type: JobTypeEnum, result_id: Optional[int] = None, xray_path: Optional[str] = None, study_id: Optional[int] = None) -> Job:
+        """
+        Queue a job unless the same work is already pending.
+
+        A queued or running job of the type for the result, or a queued job
+        of the type for the study, is returned instead of queueing another
+        one, so double clicks and client retries do not call the model twice.
+
+        Args:
+            type (JobTypeEnum): The kind of inference to run.
+            result_id (Optional[int]): The result the job fills in, if any.
+            xray_path (Optional[str]): The path to the X-ray image.
+            study_id (Optional[int]): The study the job works on, if any.
+
+        Returns:
+            Job: The pending or newly queued job.
+        """
+        job = Job(type=type, result_id=result_id, xray_path=xray_path, study_id=study_id)
+        return self.job_repo.create_once(job)
+
+    def show(self, id: int) -> Optional[Job]:
+        """
+        Retrieve a single job by its ID.
+
+        Args:
+            id (int): The ID of the job to retrieve.
+
+        Returns:
+            Optional[Job]: The retrieved job, or None if not found.
+        """
+        return self.job_repo.show(id)
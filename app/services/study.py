@@ -2,17 +2,21 @@ from sqlalchemy.orm import Session
 from fastapi import HTTPException,status
 from app.repository.study import StudyRepository
 from app.repository.activity import ActivityRepository
+from app.repository.job import JobRepository
 from app.models.study import Study
+from app.models.job import Job
 from app.models.activity import Activity
-from app.models.enums import StatusEnum, ActivityEnum
+from app.models.enums import StatusEnum, ActivityEnum, JobTypeEnum
 from typing import List, Optional
 from datetime import datetime
-import albumentations as A
-import cv2
+from app.services.view_tracker import view_tracker
+from app.core.uploads import save_upload
+from app.core.images import build_derivatives, tile_max_level, PYRAMID_SIZES, TILE_SIZE
+from app.core.image_pool import image_pool
+from app.core.config import configs
 import os
 
 
-
 class StudyService:
     """
     Service layer for managing Study operations, handling business logic
@@ -21,12 +25,14 @@ class StudyService:
     Attributes:
         study_repo (StudyRepository): Repository for study operations.
         activity_repo (ActivityRepository): Repository for activity operations.
+        job_repo (JobRepository): Repository for the derivatives jobs.
     """
-    def __init__(self, study_repo: StudyRepository, activity_repo: ActivityRepository):
+    def __init__(self, study_repo: StudyRepository, activity_repo: ActivityRepository, job_repo: JobRepository):
         self.study_repo = study_repo
         self.activity_repo = activity_repo
+        self.job_repo = job_repo
     
-    def get_all(self,status: StatusEnum, limit: int, skip: int , sort: str) -> List[Study]:
+    def get_all(self,status: StatusEnum, limit: int, skip: int , sort: str, cursor: Optional[str] = None) -> List[Study]:
         """
         Retrieve all studies with specified filters.
 
@@ -35,11 +41,12 @@ class StudyService:
             limit (int): Maximum number of studies to return.
             skip (int): Number of studies to skip for pagination.
             sort (str): Sorting criteria for the studies.
+            cursor (Optional[str]): Cursor returned with the previous page, to continue after it.
 
         Returns:
             List[Study]: A list of studies matching the criteria.
         """
-        return self.study_repo.get_all(status, limit, skip, sort)
+        return self.study_repo.get_all(status, limit, skip, sort, cursor)
     
     def create(self,study: dict) -> Study:
         """
@@ -126,13 +133,15 @@ class StudyService:
         self.activity_repo.create(activity)
         return study
     
-    def show(self,id:int, is_doctor: bool = True) -> Optional[Study]:
+    def show(self,id:int, is_doctor: bool = True, track_view: bool = True) -> Optional[Study]:
         """
-        Retrieve a single study by its ID.
+        Retrieve a single study by its ID. The view is recorded by the
+        view tracker, so this is a pure read.
 
         Args:
             id (int): The ID of the study to retrieve.
             is_doctor (bool): Flag to indicate if the requester is a doctor.
+            track_view (bool): Record the view, False for the tile requests of a viewer.
 
         Returns:
             Optional[Study]: The retrieved study object.
@@ -144,24 +153,14 @@ class StudyService:
         if not study:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,detail=f"Study with id {id} not found")
         
-        # update the last view time
-        study.last_view_at =  datetime.utcnow()
-        self.study_repo.update(study)
-
-        if study.doctor_id and is_doctor:
-            # create a new activity
-            activity = {
-                "employee_id": study.doctor_id,
-                "study_id": id,
-                "activity_type": ActivityEnum.view
-            }
-
-            activity = Activity(**activity)
-            
-            self.activity_repo.create(activity)
+        # update the last view time and log a view activity for the assigned doctor
+        if track_view and study.doctor_id and is_doctor:
+            view_tracker.track_study(id, study.doctor_id)
+        elif track_view:
+            view_tracker.track_study(id)
         return study
     
-    def get_patient_studies(self,patient_id:int, status: StatusEnum, limit: int, skip: int, sort: str) -> List[Study]:
+    def get_patient_studies(self,patient_id:int, status: StatusEnum, limit: int, skip: int, sort: str, cursor: Optional[str] = None) -> List[Study]:
         """
         Retrieve studies for a specific patient.
 
@@ -171,15 +170,17 @@ class StudyService:
             limit (int): Maximum number of studies to return.
             skip (int): Number of studies to skip for pagination.
             sort (str): Sorting criteria for the studies.
+            cursor (Optional[str]): Cursor returned with the previous page, to continue after it.
 
         Returns:
             List[Study]: A list of studies associated with the patient.
         """
-        return self.study_repo.get_patient_studies(patient_id,status, limit, skip, sort)
+        return self.study_repo.get_patient_studies(patient_id,status, limit, skip, sort, cursor)
     
     def upload_image(self,study: Study,file) -> Study:
         """
-        Upload an image file for a study and save it to the filesystem.
+        Upload an image file for a study and stream it to the filesystem,
+        recording its SHA-256, size and dimensions.
 
         Args:
             study (Study): The study to upload the image for.
@@ -189,7 +190,7 @@ class StudyService:
             Study: The updated study object with the image path.
 
         Raises:
-            HTTPException: If the file type is invalid.
+            HTTPException: If the file type is invalid or the file is too large.
         """
         # check if file is an image or dicom file
         if not file.content_type.startswith("image"):
@@ -198,54 +199,192 @@ class StudyService:
         # save the image to the file system and update the study xray_path
         xray_path = f"static/studies/{study.id}/xray.jpg"
 
-        # create the file path and nested directories
-        os.makedirs(os.path.dirname(xray_path), exist_ok=True)
-        with open(xray_path, "wb") as buffer:
-            buffer.write(file.file.read())
-        
+        # copy in chunks to a temporary file renamed over the previous X-ray
+        upload = save_upload(file, xray_path, int(configs.MAX_UPLOAD_SIZE))
+
         study.xray_path = xray_path
+        study.xray_sha256 = upload.sha256
+        study.xray_size = upload.size
+        study.xray_width = upload.width
+        study.xray_height = upload.height
         study.xray_type = "image"
+        # the derivatives job regenerates the pyramid of the new X-ray
+        study.pyramid_paths = None
+        study.resized_xray_path = None
         study.last_edited_at =  datetime.utcnow()
         study.last_view_at =  datetime.utcnow()
         self.study_repo.update(study)
         return study
     
-    def resize_image(self, study: Study):
+    def generate_derivatives(self, study: Study) -> dict:
         """
-        Resize the X-ray image associated with a study.
+        Generate the image pyramid and the deep zoom tiles of the study X-ray
+        on the image process pool and record their paths.
 
         Args:
             study (Study): The study containing the X-ray image.
 
         Returns:
-            str: The path of the resized image.
+            dict: The path of each pyramid level keyed by size, "full" for the X-ray
+                itself and "tiles" for the tiles directory.
 
         Raises:
-            HTTPException: If the image processing fails.
+            HTTPException: If the X-ray image cannot be read.
         """
-        # read image
-        img = cv2.imread(study.xray_path)
+        derivatives = image_pool.run(build_derivatives, study.xray_path)
+        if derivatives is None:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="X-ray image could not be read")
 
-        transform =  A.Compose(
-                        [
-                            A.LongestMaxSize(max_size=512, interpolation=cv2.INTER_AREA),
-                            A.PadIfNeeded(min_height=512, min_width=512,border_mode= cv2.BORDER_CONSTANT,value=0),
+        study.xray_width, study.xray_height = derivatives["width"], derivatives["height"]
+        study.pyramid_paths = derivatives["paths"]
+        study.resized_xray_path = derivatives["paths"]["512"]
+        self.study_repo.update(study)
+        return derivatives["paths"]
 
-                        ])
-        
-        # apply transformation
-        img = transform(image=img)["image"]
+    def wait_for_derivatives(self, study: Study) -> None:
+        """
+        Tell the client to retry while the derivatives of the study X-ray are
+        generated by the worker, queueing their job unless one is pending.
 
-        # save resized image in new path
-        new_path = study.xray_path.replace("xray.jpg", "resized_xray.jpg")
+        Studies uploaded before the derivatives job, or whose files are gone,
+        get their job queued here, see app/scripts/backfill_derivatives.py
+        to queue them all at once. Concurrent requests share the queued job.
 
-        cv2.imwrite(new_path, img)
+        Args:
+            study (Study): The study containing the X-ray image.
 
-        study.resized_xray_path = new_path
+        Raises:
+            HTTPException: Always, 409 with Retry-After.
+        """
+        if not self.study_repo.has_pending_job(study.id, JobTypeEnum.derivatives):
+            self.job_repo.create_once(Job(type=JobTypeEnum.derivatives, xray_path=study.xray_path, study_id=study.id))
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="X-ray derivatives are being generated, please retry",
+            headers={"Retry-After": str(configs.DERIVATIVES_RETRY_AFTER)},
+        )
 
-        self.study_repo.update(study)
+    def tiles_descriptor(self, study: Study) -> dict:
+        """
+        Describe the deep zoom tile pyramid of the study X-ray.
+
+        Args:
+            study (Study): The study containing the X-ray image.
+
+        Returns:
+            dict: The image size, tile size, tile format, number of levels and
+                the version to request immutable tiles with.
 
-        return new_path
+        Raises:
+            HTTPException: If the X-ray image is missing.
+        """
+        self.tiles_dir(study)
+        return {
+            "width": study.xray_width,
+            "height": study.xray_height,
+            "tile_size": TILE_SIZE,
+            "overlap": 0,
+            "format": "jpg",
+            "max_level": tile_max_level(study.xray_width, study.xray_height),
+            "version": study.xray_sha256,
+        }
+
+    def tile_path(self, study: Study, level: int, x: int, y: int) -> str:
+        """
+        Get the path of a deep zoom tile of the study X-ray.
+
+        Args:
+            study (Study): The study containing the X-ray image.
+            level (int): The pyramid level, 0 to max_level.
+            x (int): The tile column.
+            y (int): The tile row.
+
+        Returns:
+            str: The path of the tile file.
+
+        Raises:
+            HTTPException: If the X-ray image is missing or the tile does not exist.
+        """
+        path = os.path.join(self.tiles_dir(study), str(level), f"{x}_{y}.jpg")
+        if level < 0 or x < 0 or y < 0 or not os.path.isfile(path):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Tile {level}/{x}_{y} not found")
+        return path
+
+    def tiles_dir(self, study: Study) -> str:
+        """
+        Get the tiles directory of the study X-ray, generated by the
+        derivatives job of the study.
+
+        Args:
+            study (Study): The study containing the X-ray image.
+
+        Returns:
+            str: The tiles directory.
+
+        Raises:
+            HTTPException: If the X-ray image is missing, or 409 until the tiles are generated.
+        """
+        if study.xray_path is None:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="X-ray image is required to view tiles")
+        paths = study.pyramid_paths
+        if not paths or not os.path.isdir(paths.get("tiles", "")):
+            self.wait_for_derivatives(study)
+        return paths["tiles"]
+
+    def pyramid_path(self, study: Study, size: str) -> str:
+        """
+        Get the path of a pyramid level of the study X-ray.
+
+        The levels are generated by the derivatives job of the study, clients
+        are told to retry until they exist. The full size is the X-ray itself.
+
+        Args:
+            study (Study): The study containing the X-ray image.
+            size (str): The pyramid level, one of PYRAMID_SIZES or "full".
+
+        Returns:
+            str: The path of the image file.
+
+        Raises:
+            HTTPException: If the size is unknown or the X-ray image is missing, or 409 until the level is generated.
+        """
+        if size != "full" and size not in map(str, PYRAMID_SIZES):
+            sizes = ", ".join([*map(str, PYRAMID_SIZES), "full"])
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Invalid size {size}, expected one of {sizes}")
+        if study.xray_path is None:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="X-ray image is required to download resized image")
+
+        if size == "full":
+            return study.xray_path
+
+        paths = study.pyramid_paths
+        if not paths or not os.path.isfile(paths.get(size, "")):
+            self.wait_for_derivatives(study)
+        return paths[size]
+
+    def cache_validators(self, study: Study, variant: Optional[str], version: Optional[str]) -> dict:
+        """
+        Get the cache validators of a file derived from the study X-ray.
+
+        The derivatives are a function of the X-ray content, so their ETag is
+        the X-ray SHA-256 recorded at upload plus the variant. A URL carrying
+        that hash as its version is content addressed and cached as immutable.
+
+        Args:
+            study (Study): The study containing the X-ray image.
+            variant (Optional[str]): The derivative name, None for the X-ray itself.
+            version (Optional[str]): The version query parameter of the request.
+
+        Returns:
+            dict: The digest and immutable arguments of file_response.
+        """
+        if not study.xray_sha256:
+            # uploaded before the hash was recorded, the file gets hashed instead
+            return {"digest": None, "immutable": False}
+        return {
+            "digest": study.xray_sha256 if variant is None else f"{study.xray_sha256}-{variant}",
+            "immutable": version == study.xray_sha256,
+        }
 
     def archive(self,id:int, doctor_id:int) -> bool:
         """
@@ -369,7 +508,7 @@ class StudyService:
 
         return True
     
-    def get_assigned_studies(self,employee_id: int, status: StatusEnum, limit: int, skip: int, sort: str) -> List[Study]:
+    def get_assigned_studies(self,employee_id: int, status: StatusEnum, limit: int, skip: int, sort: str, cursor: Optional[str] = None) -> List[Study]:
         """
         Retrieve studies assigned to a specific employee.
 
@@ -379,11 +518,12 @@ class StudyService:
             limit (int): Maximum number of studies to return.
             skip (int): Number of studies to skip for pagination.
             sort (str): Sorting criteria for the studies.
+            cursor (Optional[str]): Cursor returned with the previous page, to continue after it.
 
         Returns:
             List[Study]: A list of studies assigned to the employee.
         """
-        return self.study_repo.get_assigned_studies(employee_id, status, limit, skip, sort)
+        return self.study_repo.get_assigned_studies(employee_id, status, limit, skip, sort, cursor)
     
     def get_new_studies_count(self) -> dict:
         """
@@ -430,3 +570,34 @@ class StudyService:
         """
         count = self.study_repo.get_completed_studies_count(doctor_id)
         return {"count":count}
+
+    def get_stats(self, doctor_id: Optional[int] = None) -> dict:
+        """
+        Get all the dashboard counters from one query on the study counters.
+
+        Args:
+            doctor_id (Optional[int]): The ID of the current doctor, for the pending and completed counts.
+
+        Returns:
+            dict: The new, incomplete, pending and completed counts, and the counts per status and per doctor.
+        """
+        by_status = {status.value: 0 for status in StatusEnum}
+        by_doctor = {}
+        for row in self.study_repo.get_counts():
+            by_status[row.status.value] += row.count
+            if row.doctor_id:
+                by_doctor.setdefault(row.doctor_id, {status.value: 0 for status in StatusEnum})[row.status.value] = row.count
+
+        stats = {
+            "new": by_status[StatusEnum.new.value],
+            "incomplete": by_status[StatusEnum.in_progress.value],
+            "pending": None,
+            "completed": None,
+            "by_status": by_status,
+            "by_doctor": by_doctor,
+        }
+        if doctor_id is not None:
+            mine = by_doctor.get(doctor_id, {})
+            stats["pending"] = mine.get(StatusEnum.in_progress.value, 0)
+            stats["completed"] = mine.get(StatusEnum.completed.value, 0)
+        return stats
@@ -1,8 +1,11 @@
 from sqlalchemy.orm import Session
-from fastapi import HTTPException,status
-from fastapi.responses import FileResponse
+from fastapi import HTTPException,status, Request
+from fastapi.responses import Response
 from app.repository.template import TemplateRepository
 from app.models.template import Template
+from app.core.uploads import save_upload
+from app.core.file_response import file_response
+from app.core.config import configs
 from typing import List, Optional
 import datetime
 import os
@@ -105,30 +108,27 @@ class TemplateService:
             HTTPException: If the upload fails.
         """
         # save the file to the file system and update the template file_path
-        file_path = f"static/templates/{template.id}/{file.filename}"
-
-        # create the file path and nested directories
-        os.makedirs(os.path.dirname(file_path), exist_ok=True)
-        with open(file_path, "wb") as buffer:
-            buffer.write(file.file.read())
+        file_path = f"static/templates/{template.id}/{os.path.basename(file.filename)}"
+        save_upload(file, file_path, int(configs.MAX_UPLOAD_SIZE))
         
         template.template_path = file_path
         template.last_edited_at = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         self.template_repo.update(template)
         return template
-    def download_template(self,template: Template) -> FileResponse:
+    def download_template(self,template: Template, request: Request) -> Response:
         """
         Download the template file associated with a template.
 
         Args:
             template (Template): The template to download the file from.
+            request (Request): The incoming request, for its conditional and range headers.
 
         Returns:
-            FileResponse: The response containing the template file.
+            Response: The template file, or 304 Not Modified when the client copy is fresh.
 
         Raises:
             HTTPException: If the template file is not found.
         """
         if not template.template_path:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,detail="Template file not found")
-        return FileResponse(template.template_path)
\ No newline at end of file
+        return file_response(request, template.template_path)
\ No newline at end of file
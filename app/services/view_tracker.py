@@ -0,0 +1,127 @@
+import threading
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+from sqlalchemy import bindparam
+from app.models.database import SessionLocal
+from app.models.study import Study
+from app.models.result import Result
+from app.models.activity import Activity
+from app.models.enums import ActivityEnum
+from app.core.config import configs
+from app.core.metrics import metrics
+
+
+class ViewTracker:
+    """
+    Coalesces view tracking writes off the request path.
+
+    Detail GETs only record the view in memory. A background thread flushes
+    every configs.VIEW_FLUSH_INTERVAL seconds: one batched UPDATE of
+    last_view_at per table and at most one view Activity per study/employee
+    in each window.
+
+    Attributes:
+        study_views (Dict[int, datetime]): Latest view time per study.
+        result_views (Dict[int, datetime]): Latest view time per result.
+        activities (Dict[Tuple[int, int], datetime]): First view time per (study, employee).
+    """
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.study_views: Dict[int, datetime] = {}
+        self.result_views: Dict[int, datetime] = {}
+        self.activities: Dict[Tuple[int, int], datetime] = {}
+        self.stopped = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+
+    def track_study(self, study_id: int, employee_id: Optional[int] = None) -> None:
+        """
+        Record a view of a study.
+
+        Args:
+            study_id (int): The ID of the viewed study.
+            employee_id (Optional[int]): The employee to log a view activity for, if any.
+        """
+        now = datetime.utcnow()
+        with self.lock:
+            self.study_views[study_id] = now
+            if employee_id is not None:
+                self.activities.setdefault((study_id, employee_id), now)
+
+    def track_result(self, result_id: int) -> None:
+        """
+        Record a view of a result.
+
+        Args:
+            result_id (int): The ID of the viewed result.
+        """
+        with self.lock:
+            self.result_views[result_id] = datetime.utcnow()
+
+    def flush(self) -> None:
+        """
+        Write the views recorded since the last flush in one transaction.
+        """
+        with self.lock:
+            study_views, self.study_views = self.study_views, {}
+            result_views, self.result_views = self.result_views, {}
+            activities, self.activities = self.activities, {}
+
+        if not (study_views or result_views or activities):
+            return
+
+        db = SessionLocal()
+        try:
+            if study_views:
+                studies = Study.__table__
+                db.execute(
+                    studies.update().where(studies.c.id == bindparam("view_id")).values(last_view_at=bindparam("view_at")),
+                    [{"view_id": id, "view_at": at} for id, at in study_views.items()],
+                )
+            if result_views:
+                results = Result.__table__
+                db.execute(
+                    results.update().where(results.c.id == bindparam("view_id")).values(last_view_at=bindparam("view_at")),
+                    [{"view_id": id, "view_at": at} for id, at in result_views.items()],
+                )
+            db.add_all([
+                Activity(study_id=study_id, employee_id=employee_id, activity_type=ActivityEnum.view, created_at=at)
+                for (study_id, employee_id), at in activities.items()
+            ])
+            db.commit()
+            metrics.inc("view_tracker.flushes")
+            metrics.inc("view_tracker.views", len(study_views) + len(result_views))
+        except Exception as e:
+            # views are best effort, never let them break the flusher
+            db.rollback()
+            print(e)
+        finally:
+            db.close()
+
+    def run(self) -> None:
+        while not self.stopped.wait(self.interval):
+            self.flush()
+
+    def start(self) -> None:
+        """
+        Start the background flusher, called once from the application lifespan.
+        """
+        if self.thread is not None:
+            return
+        self.stopped.clear()
+        self.thread = threading.Thread(target=self.run, name="view-tracker", daemon=True)
+        self.thread.start()
+
+    def stop(self) -> None:
+        """
+        Stop the background flusher and write the remaining views.
+        """
+        if self.thread is None:
+            return
+        self.stopped.set()
+        self.thread.join()
+        self.thread = None
+        self.flush()
+
+
+view_tracker = ViewTracker(float(configs.VIEW_FLUSH_INTERVAL))
@@ -0,0 +1,339 @@
+import asyncio
+import signal
+import time
+import httpx
+from typing import Optional
+from app.models import patient, employee, study, result, template, activity, job
+from app.models.database import SessionLocal, create_database_if_not_exists
+from app.models.enums import JobTypeEnum
+from app.repository.job import JobRepository
+from app.repository.study import StudyRepository
+from app.repository.result import ResultRepository
+from app.repository.activity import ActivityRepository
+from app.services.ai import AIService
+from app.services.study import StudyService
+from app.core.config import configs
+from app.core.ai_client import ai_client, CircuitOpenError, ModelResponseError
+from app.core.image_pool import image_pool
+from app.core.metrics import metrics
+
+
+stopping = False
+
+
+async def run_job(job_id: int) -> None:
+    """
+    Execute a single claimed job on its own database session and record the outcome.
+
+    Args:
+        job_id (int): The ID of the job to execute.
+    """
+    # the session is only used from worker threads, a slow query or pool wait
+    # must not stall the other jobs sharing the event loop
+    db = SessionLocal()
+    try:
+        job_repo = JobRepository(db)
+        job = await asyncio.to_thread(job_repo.show, job_id)
+        # read before any commit expires them
+        type, result_id, xray_path, study_id = job.type, job.result_id, job.xray_path, job.study_id
+        ai_service = AIService(StudyRepository(db), ResultRepository(db), ActivityRepository(db))
+
+        error = None
+        try:
+            if type == JobTypeEnum.heatmap:
+                outcome = await ai_service.run_heatmap(result_id, xray_path)
+            elif type == JobTypeEnum.llm:
+                outcome = await ai_service.run_llm(result_id, xray_path)
+            elif type == JobTypeEnum.denoise:
+                outcome = await ai_service.denoise(result_id, xray_path)
+            elif type == JobTypeEnum.analyze:
+                outcome = await ai_service.run_analysis(result_id, xray_path)
+            elif type == JobTypeEnum.derivatives:
+                outcome = await asyncio.to_thread(generate_derivatives, StudyService(StudyRepository(db), ActivityRepository(db), job_repo), study_id)
+            elif type == JobTypeEnum.severities:
+                await ai_service.calculate_severities()
+                outcome = True
+            else:
+                raise ValueError(f"Unknown job type {type}")
+        except Exception as e:
+            print(f"Job {job_id} failed: {e}")
+            outcome, error = None, e
+
+        status = await asyncio.to_thread(finish_job, db, job_repo, job, outcome, error)
+        print(f"Job {job_id} ({type.value}) finished with status {status}")
+    finally:
+        await asyncio.to_thread(db.close)
+
+
+def finish_job(db, job_repo: JobRepository, job, outcome, error: Optional[Exception] = None) -> str:
+    """
+    Record the outcome of a job, on a worker thread.
+
+    Args:
+        db (Session): The job session.
+        job_repo (JobRepository): The job repository of the job session.
+        job (Job): The finished job.
+        outcome (Any): The job result, None if it failed.
+        error (Optional[Exception]): The exception raised by the job, if any.
+
+    Returns:
+        str: The new status of the job.
+    """
+    if error is not None:
+        db.rollback()
+    if outcome is None:
+        retry_or_fail(job_repo, job, error)
+    else:
+        job_repo.complete(job)
+    return job.status.value
+
+
+def retry_or_fail(job_repo: JobRepository, job, error: Optional[Exception] = None) -> None:
+    """
+    Requeue a job that failed on the AI model with an exponential backoff,
+    or fail it once configs.JOB_MAX_ATTEMPTS is reached. Only connection
+    errors and transient statuses are retried, any other answer of the model
+    (a 4xx for bad input) fails the job right away. The result is kept
+    either way, running the model again on the study reuses it.
+
+    Args:
+        job_repo (JobRepository): The job repository of the job session.
+        job (Job): The failed job.
+        error (Optional[Exception]): The exception raised by the job, None if saving its output failed.
+    """
+    message = str(error) if error is not None else "AI model output could not be saved"
+    transient = error is None or isinstance(error, httpx.TransportError) or (isinstance(error, ModelResponseError) and error.transient)
+    if isinstance(error, CircuitOpenError):
+        # the model was not called, wait for the circuit to close without using up an attempt
+        job_repo.retry(job, message, max(error.retry_after, configs.WORKER_POLL_INTERVAL), count_attempt=False)
+        metrics.inc("jobs.deferred")
+    elif transient and (job.attempts or 0) < configs.JOB_MAX_ATTEMPTS:
+        job_repo.retry(job, message, configs.JOB_RETRY_BACKOFF * 2 ** ((job.attempts or 1) - 1))
+        metrics.inc("jobs.retried")
+    else:
+        job_repo.fail(job, message)
+        metrics.inc("jobs.failed")
+
+
+def generate_derivatives(study_service: StudyService, study_id: int) -> dict:
+    """
+    Generate the image pyramid of a study, off the event loop.
+
+    Args:
+        study_service (StudyService): The study service bound to the job session.
+        study_id (int): The ID of the study.
+
+    Returns:
+        dict: The pyramid paths.
+
+    Raises:
+        ValueError: If the study no longer exists or has no X-ray.
+    """
+    study = study_service.study_repo.show(study_id) if study_id is not None else None
+    if study is None or study.xray_path is None:
+        raise ValueError(f"Study {study_id} has no X-ray to resize")
+    return study_service.generate_derivatives(study)
+
+
+async def run_heatmap_batch(job_ids: list) -> None:
+    """
+    Execute claimed heatmap jobs with a single batched AI model call
+    and record the outcome of each job.
+
+    Args:
+        job_ids (list): The IDs of the heatmap jobs to execute.
+    """
+    db = SessionLocal()
+    try:
+        job_repo = JobRepository(db)
+        jobs, items = await asyncio.to_thread(load_heatmap_jobs, job_repo, job_ids)
+        ai_service = AIService(StudyRepository(db), ResultRepository(db), ActivityRepository(db))
+
+        try:
+            outcomes = await ai_service.run_heatmap_batch(items)
+        except Exception as e:
+            print(f"Heatmap batch {job_ids} failed: {e}")
+            for job in jobs:
+                await asyncio.to_thread(finish_job, db, job_repo, job, None, e)
+            return
+
+        for job, outcome in zip(jobs, outcomes):
+            await asyncio.to_thread(finish_job, db, job_repo, job, outcome)
+        print(f"Heatmap batch of {len(jobs)} jobs finished")
+    finally:
+        await asyncio.to_thread(db.close)
+
+
+def load_heatmap_jobs(job_repo: JobRepository, job_ids: list) -> tuple:
+    """
+    Load claimed heatmap jobs, failing the ones whose result was deleted while queued.
+
+    Args:
+        job_repo (JobRepository): The job repository of the batch session.
+        job_ids (list): The IDs of the heatmap jobs.
+
+    Returns:
+        tuple: The jobs to run and their (result_id, xray_path) pairs.
+    """
+    jobs = [job_repo.show(job_id) for job_id in job_ids]
+    for job in jobs:
+        if job.result_id is None:
+            job_repo.fail(job, "Result no longer exists")
+    jobs = [job for job in jobs if job.result_id is not None]
+    # read before any commit expires them
+    return jobs, [(job.result_id, job.xray_path) for job in jobs]
+
+
+def claim_jobs(limit: int, types: list = None) -> list:
+    """
+    Claim up to `limit` queued jobs for this worker.
+
+    Args:
+        limit (int): Maximum number of jobs to claim.
+        types (list): Only claim jobs of these types, all types if None.
+
+    Returns:
+        list: The IDs of the claimed jobs.
+    """
+    db = SessionLocal()
+    try:
+        jobs = JobRepository(db).claim(limit, types)
+        return [job.id for job in jobs]
+    finally:
+        db.close()
+
+
+async def collect_heatmap_batch() -> list:
+    """
+    Claim queued heatmap jobs, waiting up to configs.HEATMAP_BATCH_WINDOW
+    for the batch to fill up to configs.HEATMAP_BATCH_SIZE.
+
+    Returns:
+        list: The IDs of the claimed heatmap jobs, empty if none are queued.
+    """
+    job_ids = await asyncio.to_thread(claim_jobs, configs.HEATMAP_BATCH_SIZE, [JobTypeEnum.heatmap])
+    if not job_ids:
+        return []
+
+    deadline = time.monotonic() + configs.HEATMAP_BATCH_WINDOW
+    while len(job_ids) < configs.HEATMAP_BATCH_SIZE and time.monotonic() < deadline and not stopping:
+        await asyncio.sleep(min(0.1, configs.HEATMAP_BATCH_WINDOW))
+        job_ids += await asyncio.to_thread(claim_jobs, configs.HEATMAP_BATCH_SIZE - len(job_ids), [JobTypeEnum.heatmap])
+    return job_ids
+
+
+def requeue_stale_jobs() -> None:
+    """
+    Requeue jobs left running by a worker that died mid-job, or fail them
+    once they used up configs.JOB_MAX_ATTEMPTS.
+    """
+    db = SessionLocal()
+    try:
+        requeued, failed = JobRepository(db).requeue_stale(configs.JOB_STALE_TIMEOUT, configs.JOB_MAX_ATTEMPTS)
+        if requeued:
+            print(f"Requeued {requeued} stale jobs")
+        if failed:
+            print(f"Failed {failed} stale jobs, out of attempts or superseded")
+            metrics.inc("jobs.failed", failed)
+    finally:
+        db.close()
+
+
+def heartbeat(job_ids: list) -> None:
+    """
+    Refresh the started_at of the jobs this worker is running, so slow jobs
+    are not taken for the jobs of a dead worker and run twice.
+
+    Args:
+        job_ids (list): The IDs of the running jobs.
+    """
+    db = SessionLocal()
+    try:
+        JobRepository(db).heartbeat(job_ids)
+    finally:
+        db.close()
+
+
+def stop() -> None:
+    global stopping
+    stopping = True
+
+
+async def main() -> None:
+    """
+    Poll the job table and run claimed jobs with bounded concurrency
+    until SIGINT/SIGTERM is received. All jobs share one pooled AI model client.
+    """
+    loop = asyncio.get_running_loop()
+    loop.add_signal_handler(signal.SIGINT, stop)
+    loop.add_signal_handler(signal.SIGTERM, stop)
+
+    create_database_if_not_exists()
+    print(f"Worker started with concurrency {configs.WORKER_CONCURRENCY}")
+
+    await ai_client.start()
+    running = set()
+    # the job IDs of each running task, for the heartbeat
+    running_jobs = {}
+    last_stale_check = 0.0
+    last_heartbeat = time.monotonic()
+    last_metrics_dump = 0.0
+
+    try:
+        while not stopping:
+            now = time.monotonic()
+            if now - last_stale_check > configs.JOB_STALE_TIMEOUT / 2:
+                await asyncio.to_thread(requeue_stale_jobs)
+                last_stale_check = now
+
+            # well within the stale timeout, so live jobs are never requeued
+            if now - last_heartbeat > configs.JOB_STALE_TIMEOUT / 4:
+                job_ids = [job_id for task in running for job_id in running_jobs[task]]
+                if job_ids:
+                    await asyncio.to_thread(heartbeat, job_ids)
+                last_heartbeat = now
+
+            # the worker has no HTTP server, publish its metrics for the API
+            if now - last_metrics_dump > configs.METRICS_DUMP_INTERVAL:
+                metrics.dump("worker")
+                last_metrics_dump = now
+
+            # heatmap jobs are coalesced into one model call that takes a single slot
+            if len(running) < configs.WORKER_CONCURRENCY:
+                batch = await collect_heatmap_batch()
+                if batch:
+                    task = asyncio.create_task(run_heatmap_batch(batch))
+                    running.add(task)
+                    running_jobs[task] = batch
+
+            free_slots = configs.WORKER_CONCURRENCY - len(running)
+            other_types = [type for type in JobTypeEnum if type != JobTypeEnum.heatmap]
+            job_ids = await asyncio.to_thread(claim_jobs, free_slots, other_types) if free_slots > 0 else []
+            for job_id in job_ids:
+                task = asyncio.create_task(run_job(job_id))
+                running.add(task)
+                running_jobs[task] = [job_id]
+
+            # either the queue is drained or every slot is busy, wait for a job to finish or the next poll
+            if running:
+                done, running = await asyncio.wait(running, timeout=configs.WORKER_POLL_INTERVAL, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    running_jobs.pop(task, None)
+            else:
+                await asyncio.sleep(configs.WORKER_POLL_INTERVAL)
+
+        print("Worker stopping, waiting for running jobs")
+        if running:
+            await asyncio.wait(running)
+    finally:
+        await ai_client.close()
+        image_pool.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
+
+'''
+Run the worker next to the API with:
+python -m app.worker
+'''
@@ -0,0 +1,48 @@
+import os
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+from fastapi.testclient import TestClient
+from app.core.config import configs
+
+# The database tests run against the development database of DATABASE_URL,
+# seeded with python -m app.scripts.seeds, and are skipped without one. They
+# clean up the rows they add.
+
+USERNAME = os.getenv("TEST_USERNAME", "sabry")
+PASSWORD = os.getenv("TEST_PASSWORD", "Aa123456*")
+
+
+@pytest.fixture(scope="session")
+def engine():
+    if configs.ENV == "production":
+        pytest.skip("Cannot run the database tests in production")
+    from app.models import database
+    try:
+        with database.engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+    except OperationalError:
+        pytest.skip("No database at DATABASE_URL")
+    return database.engine
+
+
+@pytest.fixture
+def db(engine):
+    from app.models import database
+    db = database.SessionLocal()
+    yield db
+    db.rollback()
+    db.close()
+
+
+@pytest.fixture(scope="session")
+def client(engine):
+    # the app is used without its lifespan, nothing runs in the background
+    from app.main import app
+
+    client = TestClient(app)
+    response = client.post(f"{configs.API_V1_STR}/login", json={"username": USERNAME, "password": PASSWORD})
+    if response.status_code != 200:
+        pytest.skip(f"Cannot log in as {USERNAME}, seed the database with python -m app.scripts.seeds")
+    client.headers["Authorization"] = f"Bearer {response.json()['access_token']}"
+    return client
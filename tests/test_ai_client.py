@@ -0,0 +1,128 @@
+import asyncio
+import os
+import httpx
+import pytest
+from types import SimpleNamespace
+from app.core.config import configs
+from app.core.ai_client import AIModelClient, CircuitOpenError, ModelResponseError
+from app.worker import retry_or_fail
+
+# Checks the retries and the circuit breaker of AIModelClient against a mock
+# transport, and which failures retry_or_fail requeues, without a model
+# server or a database.
+
+ENDPOINT = "/x_reporto/report"
+
+
+class MockModel:
+    def __init__(self):
+        self.answers = []
+        self.calls = []
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.calls.append(request.url.path)
+        answer = self.answers.pop(0) if self.answers else 200
+        if isinstance(answer, Exception):
+            raise answer
+        if answer is None:
+            # a model that never answers
+            await asyncio.sleep(60)
+        return httpx.Response(answer, json={})
+
+
+@pytest.fixture
+def model(monkeypatch):
+    monkeypatch.setattr(configs, "AI_RETRIES", 2)
+    monkeypatch.setattr(configs, "AI_RETRY_BACKOFF", 0.001)
+    monkeypatch.setattr(configs, "AI_BREAKER_THRESHOLD", 3)
+    monkeypatch.setattr(configs, "AI_BREAKER_COOLDOWN", 0.05)
+    return MockModel()
+
+
+@pytest.fixture
+def path(tmp_path):
+    path = os.path.join(tmp_path, "xray.png")
+    with open(path, "wb") as file:
+        file.write(b"\x89PNG\r\n\x1a\n")
+    return path
+
+
+def run(model: MockModel, scenario) -> None:
+    async def main():
+        client = AIModelClient()
+        client.client = httpx.AsyncClient(base_url="http://model", transport=httpx.MockTransport(model))
+        try:
+            await scenario(client)
+        finally:
+            await client.client.aclose()
+    asyncio.run(main())
+
+
+def test_transient_status_retried(model, path):
+    async def scenario(client):
+        model.answers[:] = [503]
+        response = await client.post_files(ENDPOINT, [path])
+        assert response.status_code == 200 and len(model.calls) == 2
+    run(model, scenario)
+
+
+def test_circuit_opens_and_closes(model, path, tmp_path):
+    async def scenario(client):
+        model.answers[:] = [httpx.ConnectError("refused")] * 3
+        with pytest.raises(httpx.ConnectError):
+            await client.post_files(ENDPOINT, [path])
+        assert len(model.calls) == 3
+
+        # an open circuit fails fast
+        model.calls.clear()
+        with pytest.raises(CircuitOpenError):
+            await client.post_files(ENDPOINT, [path])
+        assert not model.calls
+
+        # the probe never reaches the model: the file is missing
+        await asyncio.sleep(0.06)
+        with pytest.raises(FileNotFoundError):
+            await client.post_files(ENDPOINT, [os.path.join(tmp_path, "missing.png")])
+        assert not client.breakers[ENDPOINT].probing
+
+        # a probe cancelled by the worker shutdown
+        model.answers[:] = [None]
+        task = asyncio.create_task(client.post_files(ENDPOINT, [path]))
+        await asyncio.sleep(0.01)
+        assert client.breakers[ENDPOINT].probing
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        assert not client.breakers[ENDPOINT].probing
+
+        response = await client.post_files(ENDPOINT, [path])
+        assert response.status_code == 200 and client.breakers[ENDPOINT].opened_at is None
+    run(model, scenario)
+
+
+class JobRepositoryRecorder:
+    def __init__(self):
+        self.calls = []
+
+    def retry(self, job, error, delay, count_attempt=True):
+        self.calls.append(("retry", count_attempt))
+
+    def fail(self, job, error):
+        self.calls.append(("fail", None))
+
+
+@pytest.mark.parametrize("error, attempts, outcome", [
+    (None, 1, ("retry", True)),
+    (httpx.ConnectError("refused"), 1, ("retry", True)),
+    (httpx.ReadTimeout("timeout"), 1, ("retry", True)),
+    (ModelResponseError(ENDPOINT, 503), 1, ("retry", True)),
+    (ModelResponseError(ENDPOINT, 429), 1, ("retry", True)),
+    (ModelResponseError(ENDPOINT, 422), 1, ("fail", None)),
+    (ModelResponseError(ENDPOINT, 500), 1, ("fail", None)),
+    (ValueError("bad output"), 1, ("fail", None)),
+    (CircuitOpenError(ENDPOINT, 1.0), 1, ("retry", False)),
+    (ModelResponseError(ENDPOINT, 503), configs.JOB_MAX_ATTEMPTS, ("fail", None)),
+])
+def test_retry_or_fail(error, attempts, outcome):
+    job_repo = JobRepositoryRecorder()
+    retry_or_fail(job_repo, SimpleNamespace(attempts=attempts), error)
+    assert job_repo.calls == [outcome]
@@ -0,0 +1,68 @@
+import os
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from app.core.file_response import file_response, IMMUTABLE_CACHE_CONTROL
+
+# Checks the conditional (304) and range (206) handling of file_response on a
+# throwaway app, without a database.
+
+CONTENT = bytes(range(256)) * 64
+
+
+@pytest.fixture
+def path(tmp_path):
+    path = os.path.join(tmp_path, "file.bin")
+    with open(path, "wb") as file:
+        file.write(CONTENT)
+    return path
+
+
+@pytest.fixture
+def client(path):
+    app = FastAPI()
+
+    @app.get("/file")
+    def get_file(request: Request, immutable: bool = False):
+        return file_response(request, path, immutable=immutable)
+
+    return TestClient(app)
+
+
+def test_full_content(client):
+    response = client.get("/file")
+    assert response.status_code == 200 and response.content == CONTENT
+    # a strong ETag, revalidated by default
+    assert not response.headers["etag"].startswith("W/")
+    assert response.headers["cache-control"] == "no-cache"
+    assert client.get("/file", params={"immutable": True}).headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+
+
+def test_conditional_requests(client):
+    etag = client.get("/file").headers["etag"]
+    response = client.get("/file", headers={"If-None-Match": etag})
+    assert response.status_code == 304 and not response.content
+    assert response.headers.get("etag") == etag
+    assert client.get("/file", headers={"If-None-Match": '"stale"'}).status_code == 200
+    assert client.get("/file", headers={"If-Modified-Since": response.headers["last-modified"]}).status_code == 304
+
+
+def test_range_requests(client):
+    etag = client.get("/file").headers["etag"]
+    response = client.get("/file", headers={"Range": "bytes=100-199"})
+    assert response.status_code == 206 and response.content == CONTENT[100:200]
+    assert response.headers.get("content-range") == f"bytes 100-199/{len(CONTENT)}"
+    response = client.get("/file", headers={"Range": "bytes=-10"})
+    assert response.status_code == 206 and response.content == CONTENT[-10:]
+    assert client.get("/file", headers={"Range": "bytes=0-9", "If-Range": etag}).status_code == 206
+    assert client.get("/file", headers={"Range": "bytes=0-9", "If-Range": '"stale"'}).status_code == 200
+    assert client.get("/file", headers={"Range": f"bytes={len(CONTENT)}-"}).status_code == 416
+
+
+def test_new_etag_after_a_rewrite(client, path):
+    etag = client.get("/file").headers["etag"]
+    # rewriting the file changes its digest
+    with open(path, "wb") as file:
+        file.write(CONTENT[::-1])
+    os.utime(path, ns=(1, 1))
+    assert client.get("/file").headers["etag"] != etag
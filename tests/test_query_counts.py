@@ -0,0 +1,123 @@
+from datetime import datetime
+import pytest
+from sqlalchemy import event
+from app.models.study import Study
+from app.models.patient import Patient
+from app.models.result import Result
+from app.models.activity import Activity
+from app.models.employee import Employee
+from app.models.enums import StatusEnum, ResultTypeEnum, ActivityEnum, OccupationEnum
+from app.services.view_tracker import view_tracker
+from app.core.config import configs
+
+# Counts the statements the detail and worklist routes send through the API,
+# to check that none of them runs per row, that the detail GETs write nothing
+# and that the views they record are flushed in one batch.
+
+STUDIES = 5
+PREFIX = configs.API_V1_STR
+
+
+class StatementCounter:
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def count(self, run) -> int:
+        self.statements = []
+        run()
+        return len(self.statements)
+
+    def writes(self) -> list:
+        return [statement for statement in self.statements if statement.lstrip().split(None, 1)[0].upper() in ("INSERT", "UPDATE", "DELETE")]
+
+
+@pytest.fixture(scope="module")
+def study_ids(engine):
+    from app.models import database
+    db = database.SessionLocal()
+    patient = Patient(patient_name="test_query_counts")
+    db.add(patient)
+    db.flush()
+    employee_id = db.query(Employee.id).order_by(Employee.id).limit(1).scalar()
+    doctor_id = db.query(Employee.id).filter(Employee.type == OccupationEnum.doctor).order_by(Employee.id).limit(1).scalar()
+    studies = [
+        Study(study_name=f"test_query_counts {i}", status=StatusEnum.new, patient_id=patient.id, employee_id=employee_id, doctor_id=doctor_id)
+        for i in range(STUDIES)
+    ]
+    db.add_all(studies)
+    db.flush()
+    db.add_all([Result(result_name="test_query_counts", type=ResultTypeEnum.custom, study_id=study.id) for study in studies])
+    db.commit()
+    ids = [study.id for study in studies]
+    yield ids
+
+    db.rollback()
+    db.query(Activity).filter(Activity.study_id.in_(ids)).delete(synchronize_session=False)
+    db.query(Result).filter(Result.study_id.in_(ids)).delete(synchronize_session=False)
+    db.query(Study).filter(Study.id.in_(ids)).delete(synchronize_session=False)
+    db.query(Patient).filter(Patient.id == patient.id).delete(synchronize_session=False)
+    db.commit()
+    db.close()
+
+
+@pytest.fixture
+def counter(engine, client, study_ids):
+    # warm the per-process caches (current user, prepared lookups) first
+    get(client, f"/studies/{study_ids[0]}")()
+    get(client, "/studies/", limit=1, sort="-created_at")()
+    counter = StatementCounter()
+    event.listen(engine, "before_cursor_execute", counter)
+    yield counter
+    event.remove(engine, "before_cursor_execute", counter)
+
+
+def get(client, url, **params):
+    def run():
+        response = client.get(f"{PREFIX}{url}", params=params)
+        assert response.status_code == 200, f"GET {url}: {response.status_code}"
+    return run
+
+
+def test_study_detail_is_one_statement(client, counter, study_ids):
+    assert {counter.count(get(client, f"/studies/{id}")) for id in study_ids} == {1}
+
+
+def test_worklist_statements_do_not_depend_on_page_size(client, counter, study_ids):
+    # the seeded studies are the newest ones
+    one = counter.count(get(client, "/studies/", limit=1, sort="-created_at"))
+    many = counter.count(get(client, "/studies/", limit=STUDIES, sort="-created_at"))
+    assert one == many
+
+
+def test_patient_studies_statements_do_not_depend_on_page_size(client, counter, study_ids, db):
+    patient_id = db.get(Study, study_ids[0]).patient_id
+    one = counter.count(get(client, f"/patients/{patient_id}/studies", limit=1, sort="-created_at"))
+    many = counter.count(get(client, f"/patients/{patient_id}/studies", limit=STUDIES, sort="-created_at"))
+    assert one == many
+
+
+def test_detail_views_are_flushed_in_one_batch(client, counter, study_ids, db):
+    # views are only recorded in memory, twice each to be coalesced
+    view_tracker.flush()
+    since = datetime.utcnow()
+    result_ids = [id for (id,) in db.query(Result.id).filter(Result.study_id.in_(study_ids))]
+    for _ in range(2):
+        for id in study_ids:
+            counter.count(get(client, f"/studies/{id}"))
+            assert not counter.writes(), f"GET /studies/{id} writes"
+        for id in result_ids:
+            counter.count(get(client, f"/results/{id}"))
+            assert not counter.writes(), f"GET /results/{id} writes"
+            counter.count(get(client, f"/results/{id}/regions"))
+            assert not counter.writes(), f"GET /results/{id}/regions writes"
+
+    counter.count(view_tracker.flush)
+    assert len(counter.writes()) <= 3
+    db.expire_all()
+    assert all(study.last_view_at >= since for study in db.query(Study).filter(Study.id.in_(study_ids)))
+    assert all(result.last_view_at >= since for result in db.query(Result).filter(Result.id.in_(result_ids)))
+    activities = db.query(Activity).filter(Activity.study_id.in_(study_ids), Activity.activity_type == ActivityEnum.view, Activity.created_at >= since).count()
+    assert activities == STUDIES
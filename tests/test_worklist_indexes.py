@@ -0,0 +1,55 @@
+import pytest
+from sqlalchemy import event, text
+from app.models.study import Study
+from app.models.patient import Patient
+from app.models.employee import Employee
+from app.models.result import Result
+from app.models.template import Template
+from app.models.activity import Activity
+from app.models.job import Job
+from app.models.enums import StatusEnum, ResultTypeEnum, ActivityEnum
+from app.repository.study import StudyRepository
+from app.repository.result import ResultRepository
+from app.repository.activity import ActivityRepository
+
+# Checks with EXPLAIN that the worklist repository queries can be served by
+# the indexes of alembic/versions/0002_worklist_indexes.py. Sequential scans
+# are disabled, so a development database of any size plans with an index
+# when one applies and falls back to a Seq Scan only when none does.
+
+CHECKS = [
+    ("studies by status, newest first", lambda repos, ids: repos["studies"].get_all(StatusEnum.new, 10, 0, "-created_at")),
+    ("studies by status, by severity", lambda repos, ids: repos["studies"].get_all(StatusEnum.in_progress, 10, 0, "-severity")),
+    ("assigned studies", lambda repos, ids: repos["studies"].get_assigned_studies(ids["doctor"], StatusEnum.in_progress, 10, 0, "-created_at")),
+    ("patient studies", lambda repos, ids: repos["studies"].get_patient_studies(ids["patient"], None, 10, 0, "-created_at")),
+    ("pending count", lambda repos, ids: repos["studies"].get_pending_studies_count(ids["doctor"])),
+    ("result by study and type", lambda repos, ids: repos["results"].get_result_by_study_type(ids["study"], ResultTypeEnum.llm)),
+    ("activities of a doctor", lambda repos, ids: repos["activities"].get_all(ids["doctor"], None, 10, 0, "-created_at")),
+    ("activities of a doctor by type", lambda repos, ids: repos["activities"].get_all(ids["doctor"], ActivityEnum.edit, 10, 0, "-created_at")),
+]
+
+
+@pytest.mark.parametrize("name, run", CHECKS, ids=[name for name, run in CHECKS])
+def test_worklist_query_uses_an_index(engine, db, name, run):
+    ids = {
+        "doctor": db.execute(text("SELECT coalesce(min(doctor_id), 0) FROM studies")).scalar(),
+        "patient": db.execute(text("SELECT coalesce(min(patient_id), 0) FROM studies")).scalar(),
+        "study": db.execute(text("SELECT coalesce(min(study_id), 0) FROM results")).scalar(),
+    }
+    repos = {"studies": StudyRepository(db), "results": ResultRepository(db), "activities": ActivityRepository(db)}
+    db.execute(text("SET LOCAL enable_seqscan = off"))
+
+    # run the repository method and explain the last statement it sent
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        run(repos, ids)
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+    statement, parameters = statements[-1]
+    plan = "\n".join(row[0] for row in db.connection().exec_driver_sql("EXPLAIN " + statement, parameters))
+    assert "Seq Scan" not in plan, plan